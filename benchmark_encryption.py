@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark für Massen-Entschlüsselung (Export, Backup)
+Führen Sie aus: python benchmark_encryption.py [--documents 200] [--size-kb 256]
+
+Misst Dokumente/s für:
+- reines Lesen der Dateien (I/O-Untergrenze)
+- Entschlüsseln mit Schlüsselableitung und neuem Cipher pro Dokument
+- Entschlüsseln mit Schlüssel-Cache und wiederverwendetem Cipher
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from services.encryption import EncryptionService
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+
+def _create_documents(service: EncryptionService, key: bytes, target_dir: Path,
+                      count: int, size: int) -> list:
+    """Legt verschlüsselte Testdokumente an"""
+    documents = []
+    for i in range(count):
+        filename = f"Dokument_{i:04d}_Übersicht.pdf"
+        path = target_dir / f"{i:04d}.enc"
+        ciphertext, nonce = service.encrypt_file(os.urandom(size), filename, key=key)
+        path.write_bytes(ciphertext)
+        documents.append((path, nonce, filename))
+    return documents
+
+
+def _measure(label: str, documents: list, decrypt_one) -> float:
+    """Führt decrypt_one für alle Dokumente aus und gibt Dokumente/s aus"""
+    start = time.perf_counter()
+    total_bytes = 0
+    for path, nonce, filename in documents:
+        total_bytes += len(decrypt_one(path, nonce, filename))
+    elapsed = time.perf_counter() - start
+    rate = len(documents) / elapsed if elapsed else float("inf")
+    print(f"{label:<45} {rate:>10.1f} Dok/s  {total_bytes / elapsed / 1024 / 1024:>8.1f} MB/s")
+    return rate
+
+
+def run_benchmark(document_count: int, size_kb: int):
+    """Vergleicht Massen-Entschlüsselung mit und ohne Schlüssel-Cache"""
+    password = "benchmark-passwort"
+    salt = os.urandom(EncryptionService.SALT_SIZE)
+
+    service = EncryptionService(master_key=EncryptionService.generate_key())
+    key, _ = EncryptionService.derive_key_from_password(password, salt)
+
+    print("=" * 70)
+    print("MASSEN-ENTSCHLÜSSELUNG BENCHMARK")
+    print("=" * 70)
+    print(f"Dokumente: {document_count} à {size_kb} KB, PBKDF2-Iterationen: {EncryptionService.ITERATIONS}")
+    print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        documents = _create_documents(service, key, Path(tmp), document_count, size_kb * 1024)
+
+        io_rate = _measure("Nur Lesen (I/O)", documents, lambda path, nonce, name: path.read_bytes())
+
+        def decrypt_uncached(path, nonce, filename):
+            derived, _ = EncryptionService.derive_key_from_password(password, salt)
+            fresh = EncryptionService(master_key=derived, key_cache_ttl_seconds=0)
+            return fresh.decrypt_file(path.read_bytes(), nonce, filename)
+
+        # Ohne Cache nur eine Stichprobe - PBKDF2 dominiert ohnehin
+        sample = documents[:max(1, min(len(documents), 20))]
+        uncached_rate = _measure("Ableitung + neuer Cipher pro Dokument", sample, decrypt_uncached)
+
+        def decrypt_cached(path, nonce, filename):
+            derived, _ = service.derive_key(password, salt)
+            return service.decrypt_file(path.read_bytes(), nonce, filename, key=derived)
+
+        service.clear_key_cache()
+        cached_rate = _measure("Schlüssel-Cache + wiederverwendeter Cipher", documents, decrypt_cached)
+
+        setup_start = time.perf_counter()
+        for _ in range(1000):
+            AESGCM(key)
+        setup_us = (time.perf_counter() - setup_start) * 1000
+
+    print()
+    print(f"Cipher-Erzeugung: {setup_us:.1f} µs pro Kontext")
+    print(f"Beschleunigung durch Cache: {cached_rate / uncached_rate:.0f}x")
+    print(f"Anteil der I/O-Rate mit Cache: {cached_rate / io_rate * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark für Massen-Entschlüsselung")
+    parser.add_argument("--documents", type=int, default=200, help="Anzahl Testdokumente")
+    parser.add_argument("--size-kb", type=int, default=256, help="Größe je Dokument in KB")
+    args = parser.parse_args()
+    run_benchmark(args.documents, args.size_kb)
@@ -76,6 +76,15 @@ class Settings:
     google_drive_access_token: str = ""
     google_drive_token_expiry: str = ""  # ISO-Format DateTime
 
+    # OCR-Einstellungen
+    ocr_parallel_workers: int = 0  # Prozesse für Seiten-OCR (0 = automatisch, 1 = seriell)
+    ocr_memory_budget_mb: int = 512  # Max. RAM für gleichzeitig gerenderte Seiten
+
+    # Cloud-Sync Pipeline
+    cloud_sync_download_workers: int = 4  # Parallele Downloads pro Synchronisation
+    cloud_sync_process_workers: int = 0  # Threads für OCR/Analyse (0 = automatisch)
+    cloud_sync_commit_batch_size: int = 20  # Importierte Dateien pro DB-Commit
+
     # Text-to-Speech Einstellungen
     tts_voice: str = "nova"  # Standard-Stimme (alloy, echo, fable, onyx, nova, shimmer)
     tts_model: str = "tts-1"  # TTS-Modell (tts-1 oder tts-1-hd)
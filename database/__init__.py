@@ -3,7 +3,7 @@ from .models import (
     User, Document, Folder, Tag, DocumentTag,
     CalendarEvent, Contact, Email, SmartFolder,
     Cart, CartItem, Receipt, ReceiptGroup,
-    ReceiptGroupMember, ClassificationRule, SearchIndex,
+    ReceiptGroupMember, ClassificationRule, SearchIndex, DocumentContent,
     DocumentStatus, InvoiceStatus, EventType
 )
 
@@ -12,6 +12,6 @@ __all__ = [
     'User', 'Document', 'Folder', 'Tag', 'DocumentTag',
     'CalendarEvent', 'Contact', 'Email', 'SmartFolder',
     'Cart', 'CartItem', 'Receipt', 'ReceiptGroup',
-    'ReceiptGroupMember', 'ClassificationRule', 'SearchIndex',
+    'ReceiptGroupMember', 'ClassificationRule', 'SearchIndex', 'DocumentContent',
     'DocumentStatus', 'InvoiceStatus', 'EventType'
 ]
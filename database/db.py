@@ -27,9 +27,9 @@ logger = logging.getLogger(__name__)
 try:
     from .extended_models import (
         Warranty, Insurance, InsuranceClaim, Subscription,
-        InventoryItem, CloudSyncConnection, CloudSyncLog,
+        InventoryItem, CloudSyncConnection, CloudSyncLog, CloudSyncManifestEntry,
         DocumentVersion, DocumentTemplate, Vehicle, MileageTrip,
-        BackupLog, FamilyGroup, FamilyMember, SharedDocument, DocumentComment
+        BackupLog, KeyRotationJob, FamilyGroup, FamilyMember, SharedDocument, DocumentComment
     )
 except ImportError:
     # Extended models not available
@@ -173,6 +173,15 @@ def run_migrations():
                 except Exception:
                     pass
 
+            # ocr_content_id Spalte hinzufügen (OCR-Text im Content-Store)
+            if 'ocr_content_id' not in existing_columns:
+                try:
+                    conn.execute(text('ALTER TABLE documents ADD COLUMN ocr_content_id INTEGER REFERENCES document_contents(id)'))
+                    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_documents_ocr_content_id ON documents(ocr_content_id)'))
+                    conn.commit()
+                except Exception:
+                    pass
+
         # Migration 2: properties Tabelle erstellen (falls nicht existiert)
         if 'properties' not in existing_tables:
             try:
@@ -380,6 +389,25 @@ def run_migrations():
                 except Exception:
                     pass
 
+        # Migration 10: Sperre und Fortschritt für Cloud-Syncs
+        if 'cloud_sync_connections' in existing_tables:
+            existing_columns = [col['name'] for col in inspector.get_columns('cloud_sync_connections')]
+
+            for column_name, column_type in [
+                ('sync_owner', 'VARCHAR(255)'),
+                ('sync_started_at', 'TIMESTAMP'),
+                ('sync_heartbeat_at', 'TIMESTAMP'),
+                ('sync_progress', 'JSON'),
+                ('last_sync_attempt_at', 'TIMESTAMP'),
+                ('sync_failure_count', 'INTEGER DEFAULT 0'),
+            ]:
+                if column_name not in existing_columns:
+                    try:
+                        conn.execute(text(f'ALTER TABLE cloud_sync_connections ADD COLUMN {column_name} {column_type}'))
+                        conn.commit()
+                    except Exception:
+                        pass
+
 
 def create_indexes_safely(indexes_info: list):
     """Erstellt alle Indizes sicher mit IF NOT EXISTS"""
@@ -446,6 +474,34 @@ def init_db():
     except Exception:
         pass  # Migrationen fehlgeschlagen, aber App soll weiterlaufen
 
+    # Dashboard-Cache bei Änderungen an Dokumenten/Bons/Terminen verwerfen
+    try:
+        from services.dashboard_service import register_cache_invalidation
+        register_cache_invalidation()
+    except ImportError:
+        pass
+
+    # Dokumentanzahl der Smart Folders bei Änderungen inkrementell nachführen
+    try:
+        from services.smart_folder_service import register_count_maintenance
+        register_count_maintenance()
+    except ImportError:
+        pass
+
+    # OCR-Texte beim Speichern deduplizieren
+    try:
+        from services.document_content_service import register_content_deduplication
+        register_content_deduplication()
+    except ImportError:
+        pass
+
+    # Geladene Dokument-Bytes pro Seitenaufruf zählen
+    try:
+        from database.projections import register_fetch_instrumentation
+        register_fetch_instrumentation()
+    except ImportError:
+        pass
+
 
 def get_session() -> Session:
     """Gibt eine neue Datenbank-Session zurück"""
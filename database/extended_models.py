@@ -13,7 +13,7 @@ from datetime import datetime
 from typing import Optional
 from sqlalchemy import (
     Column, Integer, String, Text, DateTime, Boolean,
-    Float, ForeignKey, JSON, Enum as SQLEnum, Index
+    Float, ForeignKey, JSON, Enum as SQLEnum, Index, BigInteger
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -414,6 +414,14 @@ class CloudSyncConnection(Base):
     last_sync_error = Column(Text)
     last_cursor = Column(String(500))  # Für Delta-Sync
 
+    # Laufende Synchronisation (Sperre und Fortschritt, auch für Hintergrund-Syncs)
+    sync_owner = Column(String(255))  # Host/Prozess, der die Sperre hält
+    sync_started_at = Column(DateTime)
+    sync_heartbeat_at = Column(DateTime)  # Veraltete Sperren werden übernommen
+    sync_progress = Column(JSON)  # Letzter Fortschritt (Phase, Zähler, aktuelle Datei)
+    last_sync_attempt_at = Column(DateTime)  # Letzter Start, auch wenn fehlgeschlagen
+    sync_failure_count = Column(Integer, default=0)  # Fehlschläge in Folge (Backoff)
+
     # Statistik
     total_files_synced = Column(Integer, default=0)
     total_bytes_synced = Column(Integer, default=0)
@@ -427,6 +435,8 @@ class CloudSyncConnection(Base):
     user = relationship("User")
     local_folder = relationship("Folder")
     sync_logs = relationship("CloudSyncLog", back_populates="connection", cascade="all, delete-orphan")
+    manifest_entries = relationship("CloudSyncManifestEntry", back_populates="connection",
+                                    cascade="all, delete-orphan")
 
     __table_args__ = (
         Index('idx_cloud_sync_user', 'user_id'),
@@ -480,6 +490,42 @@ class CloudSyncLog(Base):
     )
 
 
+class CloudSyncManifestEntry(Base):
+    """Zuletzt gesehener Stand einer Remote-Datei (für inkrementelle Syncs)"""
+    __tablename__ = 'cloud_sync_manifest'
+
+    id = Column(Integer, primary_key=True)
+    connection_id = Column(Integer, ForeignKey('cloud_sync_connections.id'), nullable=False)
+
+    # Remote-Datei (ID bzw. Pfad bei Anbietern ohne stabile ID)
+    remote_file_id = Column(String(1000), nullable=False)
+    remote_file_path = Column(String(1000))
+
+    # Fingerabdruck: was der Anbieter liefert, wird verglichen
+    remote_rev = Column(String(255))  # Dropbox rev
+    remote_hash = Column(String(64))  # Dropbox content_hash / Drive md5Checksum
+    remote_size = Column(Integer)
+    remote_modified_at = Column(DateTime)
+
+    # Zieldokument
+    document_id = Column(Integer, ForeignKey('documents.id'))
+
+    # Status
+    is_deleted = Column(Boolean, default=False)  # Im letzten vollständigen Scan nicht mehr gefunden
+    first_seen_at = Column(DateTime, default=func.now())
+    last_seen_at = Column(DateTime, default=func.now())
+    synced_at = Column(DateTime)
+
+    # Beziehungen
+    connection = relationship("CloudSyncConnection", back_populates="manifest_entries")
+    document = relationship("Document")
+
+    __table_args__ = (
+        Index('idx_sync_manifest_connection', 'connection_id', 'remote_file_id'),
+        Index('idx_sync_manifest_hash', 'connection_id', 'remote_hash'),
+    )
+
+
 # ============== DOKUMENTEN-VERSIONIERUNG ==============
 
 class DocumentVersion(Base):
@@ -700,6 +746,41 @@ class BackupLog(Base):
     )
 
 
+class KeyRotationJob(Base):
+    """Checkpoint einer Schlüsselrotation (Neu-Verschlüsselung aller Dokumente)"""
+    __tablename__ = 'key_rotation_jobs'
+
+    id = Column(Integer, primary_key=True)
+
+    # Schlüssel nur als Fingerabdruck (SHA-256-Präfix), nie im Klartext
+    old_key_fingerprint = Column(String(64), nullable=False)
+    new_key_fingerprint = Column(String(64), nullable=False)
+
+    # Status
+    status = Column(String(50), default="running")  # running, interrupted, completed, failed
+    error_message = Column(Text)
+
+    # Checkpoint: alle Dokumente bis einschließlich dieser ID sind erledigt
+    last_document_id = Column(Integer, default=0)
+
+    # Fortschritt
+    documents_total = Column(Integer, default=0)
+    documents_done = Column(Integer, default=0)
+    documents_failed = Column(Integer, default=0)
+    documents_skipped = Column(Integer, default=0)
+    bytes_processed = Column(BigInteger, default=0)
+    failed_document_ids = Column(JSON)  # Erste fehlgeschlagene IDs zur Nachkontrolle
+
+    # Dauer
+    started_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    completed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('idx_key_rotation_keys', 'old_key_fingerprint', 'new_key_fingerprint'),
+    )
+
+
 # ============== FAMILIEN-FREIGABE ==============
 
 class FamilyGroup(Base):
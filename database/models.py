@@ -11,6 +11,8 @@ from sqlalchemy import (
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
 import enum
+import hashlib
+import zlib
 
 Base = declarative_base()
 
@@ -166,6 +168,48 @@ class Folder(Base):
     )
 
 
+class DocumentContent(Base):
+    """Komprimierter OCR-Volltext, über den Text-Hash dedupliziert"""
+    __tablename__ = 'document_contents'
+
+    COMPRESSION_LEVEL = 6
+
+    id = Column(Integer, primary_key=True)
+    text_hash = Column(String(64), unique=True, nullable=False)  # SHA-256 des Texts
+    compression = Column(String(10), default="zlib")
+    data = Column(LargeBinary, nullable=False)
+    original_size = Column(Integer)    # Bytes (UTF-8) unkomprimiert
+    compressed_size = Column(Integer)
+    created_at = Column(DateTime, default=func.now())
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_text(cls, text: str) -> "DocumentContent":
+        """Erzeugt einen (noch nicht deduplizierten) Eintrag für einen Text"""
+        raw = text.encode("utf-8")
+        data = zlib.compress(raw, cls.COMPRESSION_LEVEL)
+        return cls(
+            text_hash=hashlib.sha256(raw).hexdigest(),
+            compression="zlib",
+            data=data,
+            original_size=len(raw),
+            compressed_size=len(data)
+        )
+
+    @staticmethod
+    def decode(compression: Optional[str], data: bytes) -> str:
+        """Entpackt gespeicherte Daten (auch ohne geladenes Objekt nutzbar)"""
+        raw = zlib.decompress(data) if compression == "zlib" else data
+        return raw.decode("utf-8")
+
+    @property
+    def text(self) -> str:
+        return self.decode(self.compression, self.data)
+
+
 class Document(Base):
     """Hauptmodell für Dokumente"""
     __tablename__ = 'documents'
@@ -193,7 +237,10 @@ class Document(Base):
     processing_error = Column(Text)
 
     # OCR & Extraktion
-    ocr_text = Column(Text)  # Volltext aus OCR
+    # Volltext liegt komprimiert in document_contents (Zugriff über ocr_text);
+    # die alte Spalte wird nur noch für nicht migrierte Dokumente gelesen
+    ocr_text_legacy = Column("ocr_text", Text)
+    ocr_content_id = Column(Integer, ForeignKey('document_contents.id'), index=True)
     ocr_confidence = Column(Float)  # Konfidenz der OCR
 
     # Extrahierte Metadaten
@@ -244,6 +291,25 @@ class Document(Base):
     property_id = Column(Integer, ForeignKey('properties.id'))
     property_address = Column(String(500))  # Extrahierte Adresse aus Dokument (Leistungsort)
 
+    # Vor den Beziehungen definiert: dort bindet "property" die Immobilien-Relation
+    @property
+    def ocr_text(self) -> Optional[str]:
+        """Volltext aus OCR (wird erst beim Zugriff geladen)"""
+        if self.ocr_content is not None:
+            return self.ocr_content.text
+        return self.ocr_text_legacy
+
+    @ocr_text.setter
+    def ocr_text(self, value: Optional[str]):
+        self.ocr_text_legacy = None
+        self.ocr_content = DocumentContent.from_text(value) if value else None
+
+    @property
+    def has_ocr_text(self) -> bool:
+        """Ob OCR-Text vorhanden ist (ohne den Text zu laden)"""
+        return self.ocr_content_id is not None or self.ocr_content is not None \
+            or bool(self.ocr_text_legacy)
+
     # Beziehungen
     user = relationship("User", back_populates="documents")
     folder = relationship("Folder", back_populates="documents")
@@ -253,6 +319,7 @@ class Document(Base):
     calendar_events = relationship("CalendarEvent", back_populates="document")
     notes = relationship("DocumentNote", back_populates="document", cascade="all, delete-orphan")
     shares = relationship("DocumentShare", back_populates="document", cascade="all, delete-orphan")
+    ocr_content = relationship("DocumentContent")
 
     # Indizes für schnelle Suche
     __table_args__ = (
@@ -0,0 +1,142 @@
+"""
+Schlanke Projektionen für Listenansichten
+
+Listen (Dashboard, Dokumente, Smart Folders, Papierkorb) zeigen nur Titel,
+Absender, Datum, Betrag usw. an. Die Abfragen hier laden deshalb nur diese
+Spalten; OCR-Text, KI-Zusammenfassung und Verschlüsselungs-IV werden erst
+in der Detailansicht (session.get(Document, id)) gelesen.
+
+Zusätzlich zählt eine Instrumentierung pro Seitenaufruf, wie viele
+Dokument-Zeilen und wie viele Bytes an Spaltenwerten geladen wurden.
+"""
+import threading
+from typing import Any, Dict, Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import load_only
+
+# Große Spalten, die nur Detailansichten benötigen
+HEAVY_DOCUMENT_COLUMNS: Tuple[str, ...] = (
+    "ocr_text_legacy", "ai_summary", "sender_address", "processing_error", "encryption_iv"
+)
+
+# Spalten für Listenansichten
+DOCUMENT_LIST_COLUMNS: Tuple[str, ...] = (
+    "id", "user_id", "folder_id", "title", "filename", "file_size", "mime_type",
+    "status", "sender", "category", "document_date", "created_at",
+    "invoice_amount", "invoice_status", "invoice_due_date", "iban",
+    "contract_end", "is_deleted", "deleted_at", "previous_folder_id"
+)
+
+
+def document_list_options(*extra_columns: str):
+    """Loader-Option: nur Listenspalten (plus extra_columns) laden"""
+    from database.models import Document
+
+    columns = dict.fromkeys(DOCUMENT_LIST_COLUMNS + extra_columns)
+    return load_only(*(getattr(Document, name) for name in columns))
+
+
+def document_list_query(session, *extra_columns: str):
+    """
+    Dokument-Abfrage für Listenansichten.
+
+    Args:
+        session: Datenbank-Session
+        extra_columns: Zusätzlich benötigte Spalten (z.B. "file_path")
+
+    Returns:
+        Query auf Document ohne große Spalten
+    """
+    from database.models import Document
+
+    return session.query(Document).options(document_list_options(*extra_columns))
+
+
+# ==================== INSTRUMENTIERUNG ====================
+
+# Streamlit führt jeden Seitenaufruf in einem eigenen Thread aus
+_fetch_stats = threading.local()
+
+
+def reset_fetch_stats():
+    """Startet die Zählung für einen Seitenaufruf"""
+    _fetch_stats.active = True
+    _fetch_stats.rows = 0
+    _fetch_stats.bytes = 0
+    _fetch_stats.heavy_bytes = 0
+
+
+def get_fetch_stats() -> Dict[str, int]:
+    """Geladene Dokument-Zeilen und Bytes seit reset_fetch_stats()"""
+    if not getattr(_fetch_stats, "active", False):
+        return {"rows": 0, "bytes": 0, "heavy_bytes": 0}
+    return {
+        "rows": _fetch_stats.rows,
+        "bytes": _fetch_stats.bytes,
+        "heavy_bytes": _fetch_stats.heavy_bytes,
+    }
+
+
+def format_fetch_stats() -> str:
+    """Kurzbeschreibung für eine Caption"""
+    stats = get_fetch_stats()
+    text = f"📦 {stats['rows']} Dokumente geladen, {stats['bytes'] / 1024:.1f} KB"
+    if stats["heavy_bytes"]:
+        text += f" (davon {stats['heavy_bytes'] / 1024:.1f} KB große Spalten)"
+    return text
+
+
+def _value_size(value: Any) -> int:
+    """Geschätzte Größe eines Spaltenwerts in Bytes"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    return 8
+
+
+def _loaded_sizes(state, keys: Iterable[str]) -> Tuple[int, int]:
+    total = 0
+    heavy = 0
+    for key in keys:
+        size = _value_size(state.dict.get(key))
+        total += size
+        if key in HEAVY_DOCUMENT_COLUMNS:
+            heavy += size
+    return total, heavy
+
+
+def _count_load(target, context):
+    if not getattr(_fetch_stats, "active", False):
+        return
+    from sqlalchemy import inspect
+
+    state = inspect(target)
+    total, heavy = _loaded_sizes(state, (attr.key for attr in state.mapper.column_attrs))
+    _fetch_stats.rows += 1
+    _fetch_stats.bytes += total
+    _fetch_stats.heavy_bytes += heavy
+
+
+def _count_refresh(target, context, attrs):
+    """Nachgeladene Spalten (z.B. Detailansicht, Lazy-Load einer Spalte)"""
+    if not getattr(_fetch_stats, "active", False) or not attrs:
+        return
+    from sqlalchemy import inspect
+
+    total, heavy = _loaded_sizes(inspect(target), attrs)
+    _fetch_stats.bytes += total
+    _fetch_stats.heavy_bytes += heavy
+
+
+def register_fetch_instrumentation():
+    """Registriert die Lade-Hooks auf Document (idempotent)"""
+    from database.models import Document
+
+    if event.contains(Document, "load", _count_load):
+        return
+    event.listen(Document, "load", _count_load)
+    event.listen(Document, "refresh", _count_refresh)
@@ -69,6 +69,7 @@ def render_create_backup(service: BackupService):
     st.markdown("""
     **Backup-Typen:**
     - **Vollständig:** Alle Dokumente, Metadaten und Dateien
+    - **Inkrementell:** Wie vollständig, speichert aber nur neue/geänderte Dateien
     - **Nur Metadaten:** Schnelles Backup ohne Dateien
     - **Nur Dokumente:** Dateien ohne Datenbankexport
     """)
@@ -78,9 +79,10 @@ def render_create_backup(service: BackupService):
     with col1:
         backup_type = st.selectbox(
             "Backup-Typ",
-            options=["full", "metadata_only", "documents_only"],
+            options=["full", "incremental", "metadata_only", "documents_only"],
             format_func=lambda x: {
                 "full": "Vollständiges Backup",
+                "incremental": "Inkrementelles Backup",
                 "metadata_only": "Nur Metadaten",
                 "documents_only": "Nur Dokumente"
             }.get(x, x)
@@ -92,11 +94,20 @@ def render_create_backup(service: BackupService):
             disabled=backup_type == "metadata_only"
         )
 
+        from utils.zip_writer import zstd_available
+        use_zstd = False
+        if zstd_available() and backup_type != "incremental":
+            use_zstd = st.checkbox(
+                "zstd-Kompression",
+                value=False,
+                help="Schneller und kleiner als ZIP-Standard; Wiederherstellung erfordert Python 3.14+ bzw. 7-Zip"
+            )
+
     with col2:
         st.info("""
         **Empfehlung:**
         - Wöchentlich: Vollständiges Backup
-        - Täglich: Nur Metadaten (schnell)
+        - Täglich: Inkrementelles Backup (schnell)
         """)
 
     st.divider()
@@ -105,7 +116,8 @@ def render_create_backup(service: BackupService):
         with st.spinner("Backup wird erstellt..."):
             result = service.create_backup(
                 backup_type=backup_type,
-                include_files=include_files
+                include_files=include_files,
+                use_zstd=use_zstd
             )
 
             if result["success"]:
@@ -125,8 +137,15 @@ def render_create_backup(service: BackupService):
                         backup_file = Path(result["backup_path"])
                         st.markdown(f"**Datei:** `{backup_file.name}`")
 
-                # Download anbieten
-                if result["backup_path"]:
+                if backup_type == "incremental":
+                    st.caption(
+                        f"{result['files_new']} neue Dateien gespeichert, "
+                        f"{result['files_reused']} unverändert übernommen "
+                        f"({result['bytes_reused'] / (1024 * 1024):.1f} MB nicht erneut geschrieben)"
+                    )
+
+                # Download anbieten (inkrementelle Backups liegen im Backup-Speicher)
+                if result["backup_path"] and backup_type != "incremental":
                     backup_file = Path(result["backup_path"])
                     if backup_file.exists():
                         with open(backup_file, "rb") as f:
@@ -5,6 +5,7 @@ import streamlit as st
 from pathlib import Path
 import sys
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -56,8 +57,8 @@ def link_documents_to_property(session, user_id: int, property_id: int,
     documents = session.query(Document).filter(
         Document.user_id == user_id,
         Document.property_id.is_(None),  # Nur nicht-zugeordnete
-        Document.ocr_text.isnot(None)
-    ).all()
+        Document.ocr_content_id.isnot(None) | Document.ocr_text_legacy.isnot(None)
+    ).options(joinedload(Document.ocr_content)).all()
 
     for doc in documents:
         if not doc.ocr_text:
@@ -8,6 +8,7 @@ import json
 from database import get_db
 from database.db import get_current_user_id
 from database.models import Entity, EntityType, Folder, Document
+from services.document_classifier import invalidate_rule_set
 
 st.set_page_config(page_title="Entitäten", page_icon="👥", layout="wide")
 
@@ -65,6 +66,7 @@ def create_entity(entity_type: EntityType, name: str, display_name: str = None,
         )
         session.add(entity)
         session.commit()
+        invalidate_rule_set(user_id)
         return entity.id
 
 
@@ -78,6 +80,7 @@ def update_entity(entity_id: int, **kwargs):
                     setattr(entity, key, value)
             entity.updated_at = datetime.now()
             session.commit()
+            invalidate_rule_set(user_id)
 
 
 def delete_entity(entity_id: int):
@@ -87,6 +90,7 @@ def delete_entity(entity_id: int):
         if entity and entity.user_id == user_id:
             entity.is_active = False
             session.commit()
+            invalidate_rule_set(user_id)
 
 
 def get_entity_documents(entity_id: int):
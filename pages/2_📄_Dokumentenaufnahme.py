@@ -256,9 +256,6 @@ def save_document(file_data: bytes, filename: str, user_id: int) -> Document:
     # Content-Hash berechnen
     content_hash = calculate_content_hash(file_data)
 
-    # Datei verschlüsseln (verwendet intern auch NFC-Normalisierung)
-    encrypted_data, nonce = encryption.encrypt_file(file_data, filename)
-
     # Sicheren Dateinamen generieren (behält Umlaute bei)
     safe_filename = sanitize_filename(filename)
     timestamp = get_local_now().strftime("%Y%m%d_%H%M%S")
@@ -273,9 +270,9 @@ def save_document(file_data: bytes, filename: str, user_id: int) -> Document:
 
     file_path = DOCUMENTS_DIR / stored_filename
 
-    # Verschlüsselte Datei speichern
+    # Segmentweise verschlüsselt direkt in die Datei schreiben (verwendet intern auch NFC-Normalisierung)
     with open(file_path, 'wb') as f:
-        f.write(encrypted_data)
+        nonce = encryption.encrypt_stream(io.BytesIO(file_data), f, filename)
 
     # Mime-Type bestimmen
     mime_type = "application/pdf" if filename.lower().endswith('.pdf') else "image/jpeg"
@@ -381,12 +378,28 @@ def process_document(document_id: int, file_data: bytes, user_id: int) -> dict:
                         if is_debug:
                             debug_log("📑 PDF erkannt - extrahiere Text...", "info")
                         try:
-                            results = ocr.extract_text_from_pdf(file_data)
-                            if results:
-                                full_text = "\n\n".join(text for text, _ in results)
-                                confidence = sum(conf for _, conf in results) / len(results)
+                            # Seitenweise verarbeiten - nur Text wird gesammelt,
+                            # Seitenbilder werden sofort wieder freigegeben.
+                            # Cache-Prüfung über den bereits berechneten Inhalts-Hash
+                            page_texts = []
+                            confidence_sum = 0.0
+                            for page_no, page_text, page_conf in ocr.iter_text_from_pdf(
+                                file_data, content_hash=document.content_hash
+                            ):
+                                page_texts.append(page_text)
+                                confidence_sum += page_conf
+                                if is_debug and (page_no + 1) % 10 == 0:
+                                    debug_log(f"📄 {page_no + 1} Seiten verarbeitet...", "info")
+                            if page_texts:
+                                full_text = "\n\n".join(page_texts)
+                                confidence = confidence_sum / len(page_texts)
                                 if is_debug:
                                     debug_log(f"✅ OCR erfolgreich: {len(full_text)} Zeichen, Konfidenz: {confidence:.2f}", "success")
+                                    routes = ocr.get_page_route_stats()['last']
+                                    debug_log(
+                                        f"📊 Seiten: {routes['text']} Textebene, {routes['ocr']} OCR, "
+                                        f"{routes['cache']} Cache, {routes['error']} Fehler", "info"
+                                    )
                             else:
                                 if is_debug:
                                     debug_log("⚠️ Kein Text extrahiert (möglicherweise Bild-PDF)", "warning")
@@ -401,11 +414,9 @@ def process_document(document_id: int, file_data: bytes, user_id: int) -> dict:
                         if is_debug:
                             debug_log("🖼️ Bild erkannt - starte Bild-OCR...", "info")
                         try:
-                            from PIL import Image
-                            image = Image.open(io.BytesIO(file_data))
-                            if is_debug:
-                                debug_log(f"📐 Bildgröße: {image.size}", "info")
-                            full_text, confidence = ocr.extract_text_from_image(image)
+                            full_text, confidence = ocr.extract_text_from_image_bytes(
+                                file_data, content_hash=document.content_hash
+                            )
                             if is_debug:
                                 debug_log(f"✅ Bild-OCR erfolgreich: {len(full_text)} Zeichen", "success")
                         except Exception as img_err:
@@ -974,7 +985,9 @@ with tab_multi:
                         st.write(f"Erkannte Dokumentgrenzen: Seiten {[b+1 for b in boundaries]}")
 
                     # Automatisch trennen und Trennseiten entfernen
-                    split_pdfs = pdf_processor.split_and_remove_separators(file_data)
+                    split_pdfs = pdf_processor.split_and_remove_separators(
+                        file_data, boundaries, separator_pages
+                    )
                 else:
                     # Manuelle Bereiche parsen
                     page_ranges = []
@@ -1959,6 +1972,13 @@ with tab_cloud:
                             skipped = final_result.get("skipped_files", 0)
                             synced_files = final_result.get("synced_files", [])
 
+                            if final_result.get("files_unchanged"):
+                                st.caption(
+                                    f"⏭️ {final_result['files_unchanged']} unveränderte Dateien nicht erneut geladen "
+                                    f"({final_result.get('bytes_saved', 0) / (1024 * 1024):.1f} MB, "
+                                    f"{final_result.get('requests_saved', 0)} Anfragen gespart)"
+                                )
+
                             if new_files > 0:
                                 st.success(f"✅ **{new_files} Dateien erfolgreich importiert!**")
 
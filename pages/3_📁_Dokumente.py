@@ -11,15 +11,34 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from database.db import init_db, get_db, get_current_user_id
 from database.models import Document, Folder, DocumentStatus, InvoiceStatus
+from database.projections import document_list_query, reset_fetch_stats, format_fetch_stats
 from config.settings import DOCUMENT_CATEGORIES
 from services.encryption import get_encryption_service
 from services.document_classifier import get_classifier
 from services.search_service import get_search_service
+from services.document_content_service import find_documents_by_text
 from utils.helpers import format_currency, format_date, generate_share_link, truncate_text
 from utils.components import render_sidebar_cart, add_to_cart
 
 st.set_page_config(page_title="Dokumente", page_icon="📁", layout="wide")
 init_db()
+reset_fetch_stats()
+
+
+def get_folder_document_counts(session, user_id: int) -> dict:
+    """
+    Anzahl der Dokumente je Ordner mit einer gruppierten Abfrage.
+
+    Returns:
+        Dict folder_id -> Anzahl (Ordner ohne Dokumente fehlen)
+    """
+    from sqlalchemy import func
+
+    rows = session.query(Document.folder_id, func.count(Document.id)).filter(
+        Document.user_id == user_id,
+        Document.folder_id.isnot(None)
+    ).group_by(Document.folder_id).all()
+    return {folder_id: count for folder_id, count in rows}
 
 
 def build_folder_tree(session, user_id: int, include_root: bool = False) -> list:
@@ -125,42 +144,32 @@ with col_folders:
     current_folder_id = st.session_state.get('current_folder_id')
 
     # Ordnerdaten laden (als einfache Dicts, um DetachedInstanceError zu vermeiden)
-    folder_data = []
     with get_db() as session:
-        # Alle Ordner laden
-        folders = session.query(Folder).filter(
-            Folder.user_id == user_id,
-            Folder.parent_id.is_(None)  # Nur Root-Ordner
+        # Alle Ordner und alle Dokumentanzahlen mit je einer Abfrage
+        all_folders = session.query(Folder.id, Folder.name, Folder.parent_id).filter(
+            Folder.user_id == user_id
         ).order_by(Folder.name).all()
+        folder_counts = get_folder_document_counts(session, user_id)
 
-        # Ordnerdaten extrahieren während Session aktiv ist
-        for folder in folders:
-            doc_count = session.query(Document).filter(
-                Document.folder_id == folder.id
-            ).count()
-
-            # Unterordner laden
-            subfolders_data = []
-            subfolders = session.query(Folder).filter(
-                Folder.parent_id == folder.id
-            ).all()
-            for sub in subfolders:
-                sub_count = session.query(Document).filter(
-                    Document.folder_id == sub.id
-                ).count()
-                subfolders_data.append({
-                    'id': sub.id,
-                    'name': sub.name,
-                    'count': sub_count
-                })
-
-            folder_data.append({
+    subfolders_by_parent = {}
+    for folder in all_folders:
+        if folder.parent_id is not None:
+            subfolders_by_parent.setdefault(folder.parent_id, []).append({
                 'id': folder.id,
                 'name': folder.name,
-                'count': doc_count,
-                'subfolders': subfolders_data
+                'count': folder_counts.get(folder.id, 0)
             })
 
+    folder_data = [
+        {
+            'id': folder.id,
+            'name': folder.name,
+            'count': folder_counts.get(folder.id, 0),
+            'subfolders': subfolders_by_parent.get(folder.id, [])
+        }
+        for folder in all_folders if folder.parent_id is None
+    ]
+
     # "Alle Dokumente" Option
     if st.button("📄 Alle Dokumente", use_container_width=True,
                  type="primary" if current_folder_id is None else "secondary"):
@@ -286,7 +295,7 @@ with col_docs:
 
     # Dokumente laden
     with get_db() as session:
-        query = session.query(Document).filter(Document.user_id == user_id)
+        query = document_list_query(session).filter(Document.user_id == user_id)
 
         # Gelöschte Dokumente ausschließen (außer im Papierkorb-Modus)
         is_trash_view = False
@@ -315,9 +324,14 @@ with col_docs:
             if doc_ids:
                 query = query.filter(Document.id.in_(doc_ids))
             else:
-                # Fallback: einfache Textsuche
+                # Fallback: einfache Textsuche (OCR-Text aus dem Content-Store),
+                # beschränkt auf die bereits gefilterten Dokumente dieser Ansicht
+                text_ids = find_documents_by_text(
+                    session, user_id, search_query,
+                    scope=query.with_entities(Document.id).scalar_subquery()
+                )
                 query = query.filter(
-                    Document.ocr_text.ilike(f'%{search_query}%') |
+                    Document.id.in_(text_ids) |
                     Document.filename.ilike(f'%{search_query}%') |
                     Document.sender.ilike(f'%{search_query}%')
                 )
@@ -1019,3 +1033,5 @@ if 'delete_document_id' in st.session_state:
                 if st.button("Abbrechen"):
                     del st.session_state.delete_document_id
                     st.rerun()
+
+st.caption(format_fetch_stats())
@@ -5,21 +5,25 @@ import streamlit as st
 from pathlib import Path
 import sys
 import json
-from datetime import datetime, timedelta
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from database.db import init_db, get_db, get_current_user_id
+from database.projections import reset_fetch_stats, format_fetch_stats
 from database.models import (
     Document, Folder, SmartFolder, Cart, CartItem,
-    InvoiceStatus, DocumentStatus
+    DocumentStatus
 )
 from config.settings import DOCUMENT_CATEGORIES
 from utils.helpers import format_currency, format_date
 from utils.components import render_sidebar_cart, add_to_cart
+from services.smart_folder_service import (
+    SmartFolderService, folder_definition, SMART_FOLDER_PAGE_SIZE
+)
 
 st.set_page_config(page_title="Intelligente Ordner", page_icon="🔍", layout="wide")
 init_db()
+reset_fetch_stats()
 
 # Sidebar mit Aktentasche
 render_sidebar_cart()
@@ -47,7 +51,8 @@ with tab_smart:
             {
                 "name": "📬 Offene Rechnungen",
                 "rules": {"category": "Rechnung", "invoice_status": "OPEN"},
-                "highlight": ["invoice_amount", "iban"]
+                "highlight": ["invoice_amount", "iban"],
+                "aggregation_fields": ["sum:invoice_amount", "count:sender"]
             },
             {
                 "name": "⏰ Fristen diese Woche",
@@ -66,11 +71,16 @@ with tab_smart:
             }
         ]
 
+        smart_folder_service = SmartFolderService(user_id)
+
         # Benutzerdefinierte Smart Folders laden
         with get_db() as session:
-            custom_folders = session.query(SmartFolder).filter(
-                SmartFolder.user_id == user_id
-            ).all()
+            custom_folders = [
+                folder_definition(cf) for cf in session.query(SmartFolder).filter(
+                    SmartFolder.user_id == user_id
+                ).all()
+            ]
+        folder_counts = smart_folder_service.get_counts()
 
         st.markdown("**Vordefiniert**")
         for pf in predefined:
@@ -81,12 +91,10 @@ with tab_smart:
         st.markdown("**Benutzerdefiniert**")
 
         for cf in custom_folders:
-            if st.button(f"📂 {cf.name}", use_container_width=True, key=f"custom_{cf.id}"):
-                st.session_state.active_smart_folder = {
-                    "name": cf.name,
-                    "rules": cf.filter_rules,
-                    "highlight": []
-                }
+            count = folder_counts.get(cf["id"])
+            label = f"📂 {cf['name']}" + (f" ({count})" if count is not None else "")
+            if st.button(label, use_container_width=True, key=f"custom_{cf['id']}"):
+                st.session_state.active_smart_folder = {**cf, "highlight": []}
 
         # Neuen intelligenten Ordner erstellen
         with st.expander("➕ Neuer intelligenter Ordner"):
@@ -119,58 +127,66 @@ with tab_smart:
             sf = st.session_state.active_smart_folder
             st.subheader(sf["name"])
 
-            rules = sf["rules"]
             highlight_fields = sf.get("highlight", [])
 
-            # Dokumente nach Regeln filtern
-            with get_db() as session:
-                query = session.query(Document).filter(Document.user_id == user_id)
-
-                if rules.get("category"):
-                    query = query.filter(Document.category == rules["category"])
-
-                if rules.get("invoice_status") == "OPEN":
-                    query = query.filter(Document.invoice_status == InvoiceStatus.OPEN)
-                elif rules.get("invoice_status") == "PAID":
-                    query = query.filter(Document.invoice_status == InvoiceStatus.PAID)
-
-                if rules.get("contract_end_within_days"):
-                    days = rules["contract_end_within_days"]
-                    end_date = datetime.now() + timedelta(days=days)
-                    query = query.filter(
-                        Document.contract_end.isnot(None),
-                        Document.contract_end <= end_date
-                    )
+            # Anzahl, Aggregationen und aktuelle Seite in SQL
+            try:
+                total = folder_counts.get(sf.get("id"))
+                if total is None:
+                    total = smart_folder_service.count(sf)
+                aggregations = smart_folder_service.aggregate(sf, sf.get("aggregation_fields") or [])
+            except ValueError as e:
+                st.error(f"Ungültige Ordnerdefinition: {e}")
+                total, aggregations = 0, {}
+
+            page_count = max(1, -(-total // SMART_FOLDER_PAGE_SIZE))
+            page_key = f"smart_page_{sf.get('id') or sf['name']}"
+            page = st.number_input("Seite", min_value=1, max_value=page_count, value=1,
+                                   key=page_key) if page_count > 1 else 1
+
+            st.caption(f"{total} Dokumente" + (f" · Seite {page}/{page_count}" if page_count > 1 else ""))
+
+            if aggregations:
+                metric_cols = st.columns(len(aggregations))
+                for metric_col, (expression, value) in zip(metric_cols, aggregations.items()):
+                    with metric_col:
+                        if isinstance(value, dict):
+                            st.markdown(f"**{expression}**")
+                            for group, n in value.items():
+                                st.caption(f"{group}: {n}")
+                        elif expression.split(":")[-1] == "invoice_amount" and value is not None:
+                            st.metric(expression, format_currency(value))
+                        else:
+                            st.metric(expression, value if value is not None else "—")
+
+            documents = smart_folder_service.fetch_page(sf, page=page - 1) if total else []
+
+            for doc in documents:
+                with st.container():
+                    col1, col2, col3 = st.columns([3, 1, 1])
 
-                documents = query.order_by(Document.created_at.desc()).all()
-
-                st.caption(f"{len(documents)} Dokumente")
+                    with col1:
+                        st.markdown(f"**{doc['title'] or doc['filename']}**")
+                        st.caption(f"{doc['sender'] or 'Unbekannt'} | {format_date(doc['document_date'])}")
 
-                for doc in documents:
-                    with st.container():
-                        col1, col2, col3 = st.columns([3, 1, 1])
-
-                        with col1:
-                            st.markdown(f"**{doc.title or doc.filename}**")
-                            st.caption(f"{doc.sender or 'Unbekannt'} | {format_date(doc.document_date)}")
-
-                        with col2:
-                            # Hervorgehobene Felder
-                            if "invoice_amount" in highlight_fields and doc.invoice_amount:
-                                st.markdown(f"**:red[{format_currency(doc.invoice_amount)}]**")
-                            elif doc.invoice_amount:
-                                st.write(format_currency(doc.invoice_amount))
-
-                        with col3:
-                            if "iban" in highlight_fields and doc.iban:
-                                st.code(doc.iban)
-                            if st.button("📋", key=f"add_cart_{doc.id}", help="In Aktentasche"):
-                                if 'active_cart_items' not in st.session_state:
-                                    st.session_state.active_cart_items = []
-                                if doc.id not in st.session_state.active_cart_items:
-                                    st.session_state.active_cart_items.append(doc.id)
-
-                        st.divider()
+                    with col2:
+                        # Hervorgehobene Felder
+                        if "invoice_amount" in highlight_fields and doc['invoice_amount']:
+                            st.markdown(f"**:red[{format_currency(doc['invoice_amount'])}]**")
+                        elif doc['invoice_amount']:
+                            st.write(format_currency(doc['invoice_amount']))
+
+                    with col3:
+                        if "iban" in highlight_fields and doc['iban']:
+                            st.code(doc['iban'])
+                        if st.button("📋", key=f"add_cart_{doc['id']}", help="In Aktentasche"):
+                            if 'active_cart_items' not in st.session_state:
+                                st.session_state.active_cart_items = []
+                            if doc['id'] not in st.session_state.active_cart_items:
+                                st.session_state.active_cart_items.append(doc['id'])
+
+                    st.divider()
+            st.caption(format_fetch_stats())
         else:
             st.info("Wählen Sie einen intelligenten Ordner aus")
 
@@ -857,6 +857,8 @@ with tab_cloud:
 
         connections = cloud_service.get_connections()
         active_connections = [c for c in connections if c.is_active]
+        # Sperre/Fortschritt auch von Hintergrund-Syncs (services/sync_scheduler.py)
+        sync_statuses = {s["connection_id"]: s for s in cloud_service.get_sync_status()}
 
         if active_connections:
             for conn in active_connections:
@@ -879,6 +881,17 @@ with tab_cloud:
                         if conn.last_sync:
                             st.caption(f"Letzte Sync: {conn.last_sync.strftime('%d.%m.%Y %H:%M')}")
 
+                        bg_status = sync_statuses.get(conn.id)
+                        if bg_status and bg_status["is_running"] and not st.session_state.get(f"syncing_{conn.id}"):
+                            bg_progress = bg_status["progress"]
+                            st.caption(
+                                f"🔄 Synchronisiert im Hintergrund: "
+                                f"{bg_progress.get('files_processed') or 0}/{bg_progress.get('files_total') or '?'} Dateien, "
+                                f"{bg_status['files_saved'] or 0} gespeichert"
+                            )
+                        elif bg_status and bg_status["is_stale"]:
+                            st.caption("⚠️ Letzte Synchronisation wurde nicht beendet")
+
                     with col_actions:
                         action_cols = st.columns(2)
                         with action_cols[0]:
@@ -4,21 +4,36 @@ Erstellt und verwaltet Backups der Dokumente und Datenbank
 
 Enthält zwei Modi:
 1. Standard-Backup: Exportiert Metadaten als JSON + Dateien (für Benutzer-Backups)
+   - "incremental": Dateien landen in einem inhaltsadressierten Speicher
+     (store/blobs), jedes Backup ist ein Manifest (store/manifests) mit
+     Verweisen auf die Blobs. Geschrieben werden nur neue/geänderte Dateien.
 2. Entwickler-Snapshot: Kopiert die komplette Datenbank + alle Dateien (für Entwicklung)
 """
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from pathlib import Path
+import base64
+import hashlib
 import json
 import shutil
 import zipfile
 import tempfile
 import sqlite3
 import os
+import time
+
+from sqlalchemy.orm import selectinload
 
 from database.models import Document, Folder, Tag, get_session
 from database.extended_models import BackupLog
 from config.settings import DATABASE_PATH, DATA_DIR, DOCUMENTS_DIR, INDEX_DIR, CONFIG_FILE
+from utils.zip_writer import StreamingZipWriter
+
+# Format der Manifeste inkrementeller Backups
+INCREMENTAL_MANIFEST_VERSION = "2.0"
+# Laufende inkrementelle Backups ohne Lebenszeichen seit so vielen Stunden
+# gelten als abgebrochen und schützen ihre Blobs nicht mehr vor dem Aufräumen
+INCREMENTAL_RUNNING_STALE_HOURS = 24
 
 
 class BackupService:
@@ -31,7 +46,8 @@ class BackupService:
 
     def create_backup(self, backup_type: str = "full",
                       include_files: bool = True,
-                      encrypt: bool = False) -> Dict[str, Any]:
+                      encrypt: bool = False,
+                      use_zstd: bool = False) -> Dict[str, Any]:
         """
         Erstellt ein Backup
 
@@ -39,7 +55,12 @@ class BackupService:
             backup_type: "full", "incremental", "documents_only", "metadata_only"
             include_files: Ob Dateien eingeschlossen werden sollen
             encrypt: Ob das Backup verschlüsselt werden soll (TODO)
+            use_zstd: zstd statt Deflate für komprimierbare Dateien (falls
+                verfügbar; Wiederherstellung braucht dann Python 3.14+)
         """
+        if backup_type == "incremental":
+            return self._create_incremental_backup(include_files)
+
         result = {
             "success": False,
             "backup_path": None,
@@ -50,48 +71,37 @@ class BackupService:
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_name = f"backup_{self.user_id}_{backup_type}_{timestamp}"
-        backup_path = self.backup_dir / str(self.user_id) / backup_name
-        backup_path.mkdir(parents=True, exist_ok=True)
+        user_backup_dir = self.backup_dir / str(self.user_id)
+        user_backup_dir.mkdir(parents=True, exist_ok=True)
+        zip_path = user_backup_dir / f"{backup_name}.zip"
 
         try:
-            # Metadata exportieren
-            metadata = self._export_metadata()
-            metadata_path = backup_path / "metadata.json"
-            with open(metadata_path, "w", encoding="utf-8") as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False, default=str)
-
-            result["documents_count"] = len(metadata.get("documents", []))
+            # Direkt aus den Quelldateien ins ZIP schreiben (keine temporäre Kopie)
+            with StreamingZipWriter(zip_path, use_zstd=use_zstd) as zipw:
+                # Metadata exportieren
+                metadata = self._export_metadata()
+                zipw.add_bytes(
+                    json.dumps(metadata, indent=2, ensure_ascii=False, default=str).encode("utf-8"),
+                    "metadata.json"
+                )
 
-            # Dateien kopieren
-            if include_files and backup_type != "metadata_only":
-                files_path = backup_path / "files"
-                files_path.mkdir(exist_ok=True)
+                result["documents_count"] = len(metadata.get("documents", []))
 
-                with get_session() as session:
-                    docs = session.query(Document).filter(
-                        Document.user_id == self.user_id,
-                        Document.is_deleted == False
-                    ).all()
+                # Dateien hinzufügen
+                if include_files and backup_type != "metadata_only":
+                    with get_session() as session:
+                        docs = session.query(Document.id, Document.file_path).filter(
+                            Document.user_id == self.user_id,
+                            Document.is_deleted == False
+                        ).all()
 
                     for doc in docs:
                         if doc.file_path:
                             source = Path(doc.file_path)
                             if source.exists():
-                                dest = files_path / f"{doc.id}_{source.name}"
-                                shutil.copy2(source, dest)
+                                zipw.add_file(source, f"files/{doc.id}_{source.name}")
                                 result["total_size"] += source.stat().st_size
 
-            # ZIP erstellen
-            zip_path = backup_path.parent / f"{backup_name}.zip"
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in backup_path.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(backup_path)
-                        zipf.write(file_path, arcname)
-
-            # Temporäre Dateien aufräumen
-            shutil.rmtree(backup_path)
-
             result["success"] = True
             result["backup_path"] = str(zip_path)
 
@@ -106,6 +116,8 @@ class BackupService:
 
         except Exception as e:
             result["errors"].append(str(e))
+            if zip_path.exists():
+                zip_path.unlink()
             self._log_backup(
                 backup_type=backup_type,
                 status="failed",
@@ -138,6 +150,9 @@ class BackupService:
                 result["errors"].append("Backup-Datei nicht gefunden")
                 return result
 
+            if backup_file.suffix == ".json":
+                return self._restore_incremental_backup(backup_file, restore_files, merge)
+
             # ZIP entpacken
             with tempfile.TemporaryDirectory() as temp_dir:
                 temp_path = Path(temp_dir)
@@ -170,11 +185,300 @@ class BackupService:
 
         return result
 
+    # ==================== INKREMENTELLE BACKUPS ====================
+
+    @property
+    def store_dir(self) -> Path:
+        """Inhaltsadressierter Speicher der inkrementellen Backups"""
+        return self.backup_dir / str(self.user_id) / "store"
+
+    def _blob_path(self, blob_key: str) -> Path:
+        return self.store_dir / "blobs" / blob_key[:2] / blob_key
+
+    def _manifest_dir(self) -> Path:
+        return self.store_dir / "manifests"
+
+    def _running_dir(self) -> Path:
+        """Markierungen laufender inkrementeller Backups"""
+        return self.store_dir / "running"
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        """SHA-256 einer Datei (blockweise)"""
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def _blob_key(self, content_hash: Optional[str], encryption_iv: Optional[bytes], source: Path) -> str:
+        """
+        Schlüssel eines Dateiblobs.
+
+        Basis ist Document.content_hash (Klartext). Verschlüsselte Dateien
+        unterscheiden sich je Verschlüsselung, daher fließt der IV mit ein.
+        Ohne content_hash wird die Datei selbst gehasht.
+        """
+        if not content_hash:
+            return self._hash_file(source)
+        if encryption_iv:
+            return hashlib.sha256(f"{content_hash}:{bytes(encryption_iv).hex()}".encode()).hexdigest()
+        return content_hash
+
+    def _store_blob(self, source: Path, blob_key: str) -> bool:
+        """
+        Legt eine Datei im Speicher ab, falls noch nicht vorhanden.
+
+        Returns:
+            True wenn der Blob neu geschrieben wurde
+        """
+        blob_path = self._blob_path(blob_key)
+        if blob_path.exists() and blob_path.stat().st_size == source.stat().st_size:
+            # Zeitstempel erneuern: schützt den Blob vor _prune_store, bis das
+            # Manifest dieses Backups geschrieben ist
+            os.utime(blob_path)
+            return False
+
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = blob_path.with_name(blob_path.name + ".tmp")
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, blob_path)
+        return True
+
+    def _latest_manifest_name(self) -> Optional[str]:
+        manifests = sorted(self._manifest_dir().glob("*.json"))
+        return manifests[-1].stem if manifests else None
+
+    def _create_incremental_backup(self, include_files: bool = True) -> Dict[str, Any]:
+        """
+        Erstellt ein inkrementelles Backup.
+
+        Jedes Manifest verweist auf alle Dateien zu diesem Zeitpunkt und ist
+        damit allein wiederherstellbar; geschrieben werden aber nur Blobs,
+        die im Speicher noch fehlen. Laufzeit und Größe wachsen so mit den
+        Änderungen seit dem letzten Backup, nicht mit dem Archiv.
+        """
+        result = {
+            "success": False,
+            "backup_path": None,
+            "documents_count": 0,
+            "total_size": 0,
+            "files_new": 0,
+            "files_reused": 0,
+            "bytes_new": 0,
+            "bytes_reused": 0,
+            "errors": []
+        }
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_name = f"backup_{self.user_id}_incremental_{timestamp}"
+        manifest_dir = self._manifest_dir()
+        manifest_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = manifest_dir / f"{backup_name}.json"
+
+        # Als laufend markieren, bevor Blobs geschrieben werden
+        running_marker = self._running_dir() / backup_name
+        running_marker.parent.mkdir(parents=True, exist_ok=True)
+        running_marker.touch()
+
+        try:
+            metadata = self._export_metadata()
+            result["documents_count"] = len(metadata.get("documents", []))
+
+            files = []
+            new_blobs = []
+            if include_files:
+                with get_session() as session:
+                    rows = session.query(
+                        Document.id, Document.file_path, Document.filename, Document.content_hash,
+                        Document.encryption_iv, Document.is_encrypted
+                    ).filter(
+                        Document.user_id == self.user_id,
+                        Document.is_deleted == False
+                    ).all()
+
+                for row in rows:
+                    if not row.file_path:
+                        continue
+                    source = Path(row.file_path)
+                    if not source.exists():
+                        continue
+
+                    try:
+                        size = source.stat().st_size
+                        blob_key = self._blob_key(row.content_hash, row.encryption_iv, source)
+                        if self._store_blob(source, blob_key):
+                            new_blobs.append(blob_key)
+                            result["files_new"] += 1
+                            result["bytes_new"] += size
+                        else:
+                            result["files_reused"] += 1
+                            result["bytes_reused"] += size
+                    except OSError as e:
+                        result["errors"].append(f"{row.filename}: {e}")
+                        continue
+
+                    files.append({
+                        "document_id": row.id,
+                        "name": source.name,
+                        "blob": blob_key,
+                        "size": size,
+                        "content_hash": row.content_hash,
+                        "is_encrypted": bool(row.is_encrypted),
+                        "encryption_iv": base64.b64encode(row.encryption_iv).decode("ascii")
+                        if row.encryption_iv else None
+                    })
+
+            manifest = {
+                "version": INCREMENTAL_MANIFEST_VERSION,
+                "backup_name": backup_name,
+                "created_at": datetime.now().isoformat(),
+                "parent": self._latest_manifest_name(),
+                "metadata": metadata,
+                "files": files,
+                "new_blobs": new_blobs
+            }
+
+            # Atomar schreiben - ein halbes Manifest wäre nicht wiederherstellbar
+            temp_manifest = manifest_path.with_name(manifest_path.name + ".tmp")
+            with open(temp_manifest, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, default=str)
+            os.replace(temp_manifest, manifest_path)
+
+            result["total_size"] = result["bytes_new"] + manifest_path.stat().st_size
+            result["success"] = True
+            result["backup_path"] = str(manifest_path)
+
+            self._log_backup(
+                backup_type="incremental",
+                backup_path=str(manifest_path),
+                backup_size=result["total_size"],
+                documents_count=result["documents_count"],
+                status="completed"
+            )
+
+        except Exception as e:
+            result["errors"].append(str(e))
+            self._log_backup(
+                backup_type="incremental",
+                status="failed",
+                error_message=str(e)
+            )
+        finally:
+            running_marker.unlink(missing_ok=True)
+
+        return result
+
+    def _restore_incremental_backup(self, manifest_path: Path,
+                                    restore_files: bool = True,
+                                    merge: bool = False) -> Dict[str, Any]:
+        """Stellt den Stand eines Manifests wieder her"""
+        result = {
+            "success": False,
+            "documents_restored": 0,
+            "files_restored": 0,
+            "errors": []
+        }
+
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            document_map: Dict[int, int] = {}
+            result["documents_restored"] = self._restore_metadata(
+                manifest.get("metadata", {}), merge, document_map
+            )
+
+            if restore_files:
+                upload_dir = Path("data/uploads") / str(self.user_id)
+                upload_dir.mkdir(parents=True, exist_ok=True)
+
+                with get_session() as session:
+                    for entry in manifest.get("files", []):
+                        new_id = document_map.get(entry["document_id"])
+                        blob_path = self._blob_path(entry["blob"])
+                        if not new_id:
+                            continue
+                        if not blob_path.exists():
+                            result["errors"].append(f"Blob fehlt: {entry['name']}")
+                            continue
+
+                        dest = upload_dir / f"{new_id}_{entry['name']}"
+                        shutil.copyfile(blob_path, dest)
+
+                        doc = session.get(Document, new_id)
+                        doc.file_path = str(dest)
+                        doc.content_hash = entry.get("content_hash")
+                        doc.is_encrypted = entry.get("is_encrypted", False)
+                        doc.encryption_iv = base64.b64decode(entry["encryption_iv"]) \
+                            if entry.get("encryption_iv") else None
+                        result["files_restored"] += 1
+
+                    session.commit()
+
+            result["success"] = True
+
+        except Exception as e:
+            result["errors"].append(str(e))
+
+        return result
+
+    def _running_since(self) -> Optional[float]:
+        """Startzeit (mtime) des ältesten laufenden inkrementellen Backups"""
+        stale_before = time.time() - INCREMENTAL_RUNNING_STALE_HOURS * 3600
+        starts = []
+        for marker in self._running_dir().glob("*"):
+            try:
+                started = marker.stat().st_mtime
+            except OSError:
+                continue
+            if started >= stale_before:
+                starts.append(started)
+        return min(starts) if starts else None
+
+    def _prune_store(self) -> int:
+        """
+        Löscht Blobs, auf die kein Manifest mehr verweist.
+
+        Laufende Backups schreiben ihr Manifest erst am Ende: Blobs, die seit
+        dem Start des ältesten laufenden Backups geschrieben oder
+        wiederverwendet wurden, bleiben daher erhalten. Temporäre Dateien
+        (*.tmp) werden nie gelöscht.
+
+        Returns:
+            Anzahl gelöschter Blobs
+        """
+        # Vor dem Lesen der Manifeste ermitteln, damit ein gerade fertig
+        # gewordenes Backup entweder als laufend oder per Manifest zählt
+        running_since = self._running_since()
+
+        referenced = set()
+        for manifest_path in self._manifest_dir().glob("*.json"):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                referenced.update(entry["blob"] for entry in json.load(f).get("files", []))
+
+        removed = 0
+        for blob_path in (self.store_dir / "blobs").glob("*/*"):
+            if blob_path.name in referenced or blob_path.suffix == ".tmp":
+                continue
+            try:
+                # Toleranz für die Zeitauflösung des Dateisystems
+                if running_since is not None and blob_path.stat().st_mtime >= running_since - 2:
+                    continue
+                blob_path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
     def _export_metadata(self) -> Dict[str, Any]:
         """Exportiert alle Metadaten"""
         with get_session() as session:
             # Dokumente
-            docs = session.query(Document).filter(
+            # OCR-Texte gesammelt aus dem Content-Store laden
+            docs = session.query(Document).options(
+                selectinload(Document.ocr_content)
+            ).filter(
                 Document.user_id == self.user_id
             ).all()
 
@@ -225,8 +529,14 @@ class BackupService:
                 "tags": tag_data
             }
 
-    def _restore_metadata(self, metadata: Dict, merge: bool) -> int:
-        """Stellt Metadaten wieder her"""
+    def _restore_metadata(self, metadata: Dict, merge: bool,
+                          document_map: Optional[Dict[int, int]] = None) -> int:
+        """
+        Stellt Metadaten wieder her
+
+        Args:
+            document_map: Wird mit alter ID -> neuer Dokument-ID befüllt
+        """
         restored = 0
 
         with get_session() as session:
@@ -298,6 +608,10 @@ class BackupService:
                 session.add(doc)
                 restored += 1
 
+                if document_map is not None:
+                    session.flush()
+                    document_map[doc_data["id"]] = doc.id
+
             session.commit()
 
         return restored
@@ -375,6 +689,16 @@ class BackupService:
                     "created": datetime.fromtimestamp(file_path.stat().st_mtime)
                 })
 
+            # Inkrementelle Backups (Größe = Manifest, Blobs werden geteilt)
+            for file_path in self._manifest_dir().glob("*.json"):
+                backups.append({
+                    "filename": file_path.name,
+                    "path": str(file_path),
+                    "size": file_path.stat().st_size,
+                    "created": datetime.fromtimestamp(file_path.stat().st_mtime),
+                    "incremental": True
+                })
+
         return sorted(backups, key=lambda x: x["created"], reverse=True)
 
     def delete_backup(self, backup_path: str) -> bool:
@@ -383,6 +707,8 @@ class BackupService:
             path = Path(backup_path)
             if path.exists() and str(self.user_id) in str(path):
                 path.unlink()
+                if path.suffix == ".json":
+                    self._prune_store()
                 return True
         except:
             pass
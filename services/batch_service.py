@@ -314,6 +314,6 @@ class BatchService:
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
                 "categories": categories,
                 "statuses": statuses,
-                "with_ocr": len([d for d in docs if d.ocr_text]),
-                "without_ocr": len([d for d in docs if not d.ocr_text])
+                "with_ocr": len([d for d in docs if d.has_ocr_text]),
+                "without_ocr": len([d for d in docs if not d.has_ocr_text])
             }
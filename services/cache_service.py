@@ -5,6 +5,10 @@ Unterstützt:
 - Redis (Upstash) für Cloud-Deployment
 - In-Memory Cache als Fallback
 
+Für OCR-Ergebnisse gibt es zusätzlich einen persistenten Datei-Cache
+(data/cache), der ohne Redis Neustarts übersteht. Er ist auf
+DISK_CACHE_MAX_MB begrenzt; selten genutzte Einträge werden verdrängt (LRU).
+
 Verwendung:
 1. Erstelle kostenloses Konto bei https://upstash.com
 2. Erstelle Redis-Datenbank
@@ -13,14 +17,27 @@ Verwendung:
 """
 import os
 import json
+import time
 import hashlib
 import logging
-from typing import Optional, Any, Union
+import threading
+from typing import Optional, Any, Union, Tuple
+from pathlib import Path
 from datetime import datetime, timedelta
 from functools import wraps
+from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+# Namespaces, die ohne Redis zusätzlich auf der Festplatte gespeichert werden
+PERSISTENT_NAMESPACES = {'ocr', 'ocr_page'}
+# Namespaces, die nur auf der Festplatte liegen (viele große Einträge, nicht im RAM spiegeln)
+DISK_ONLY_NAMESPACES = {'ocr_page'}
+# Obergrenze des Datei-Caches; beim Aufräumen wird auf 90 % verkleinert
+DISK_CACHE_MAX_MB = 1024
+# Mindestabstand zwischen zwei Aufräumläufen des Datei-Caches
+DISK_CACHE_SWEEP_INTERVAL_SECONDS = 600
+
 # Versuche Redis zu importieren
 try:
     import redis
@@ -41,6 +58,11 @@ class CacheService:
         self._memory_expiry = {}
         self._initialized = False
         self._last_error = None  # Speichert den letzten Fehler
+        self._disk_dir = None
+        self._disk_sweep_lock = threading.Lock()
+        self._last_disk_sweep = None
+        # Treffer/Fehlschläge pro Namespace und Ebene (redis, memory, disk)
+        self._stats = defaultdict(lambda: defaultdict(int))
 
     def _init_redis(self):
         """Initialisiert Redis-Verbindung wenn verfügbar."""
@@ -127,6 +149,7 @@ class CacheService:
             try:
                 value = self._redis_client.get(cache_key)
                 if value:
+                    self._stats[namespace]['hits_redis'] += 1
                     return json.loads(value)
             except Exception as e:
                 logger.warning(f"Redis GET Fehler: {e}")
@@ -138,11 +161,169 @@ class CacheService:
             if expiry and datetime.now() > expiry:
                 del self._memory_cache[cache_key]
                 del self._memory_expiry[cache_key]
-                return None
-            return self._memory_cache[cache_key]
-
+            else:
+                self._stats[namespace]['hits_memory'] += 1
+                return self._memory_cache[cache_key]
+
+        # Persistenter Datei-Cache (nur ohne Redis)
+        if namespace in PERSISTENT_NAMESPACES and not self._redis_client:
+            value, expires = self._disk_get(namespace, cache_key)
+            if value is not None:
+                self._stats[namespace]['hits_disk'] += 1
+                # In den Memory-Cache übernehmen (mit der Restlaufzeit des Eintrags)
+                if namespace not in DISK_ONLY_NAMESPACES:
+                    self._memory_cache[cache_key] = value
+                    self._memory_expiry[cache_key] = expires
+                return value
+
+        self._stats[namespace]['misses'] += 1
         return None
 
+    # ==================== PERSISTENTER DATEI-CACHE ====================
+
+    def _disk_namespace_dir(self, namespace: str) -> Path:
+        """Verzeichnis eines Namespaces im Datei-Cache"""
+        if self._disk_dir is None:
+            from config.settings import DATA_DIR
+            self._disk_dir = DATA_DIR / "cache"
+        return self._disk_dir / namespace
+
+    def _disk_path(self, namespace: str, cache_key: str) -> Path:
+        """Pfad einer Cache-Datei (nach Hash in Unterordner verteilt)"""
+        digest = hashlib.sha256(cache_key.encode('utf-8')).hexdigest()
+        return self._disk_namespace_dir(namespace) / digest[:2] / f"{digest}.json"
+
+    def _disk_get(self, namespace: str, cache_key: str) -> Tuple[Optional[Any], Optional[datetime]]:
+        """Liest einen Wert und dessen Ablaufzeit aus dem Datei-Cache"""
+        path = self._disk_path(namespace, cache_key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            logger.warning(f"Datei-Cache GET Fehler: {e}")
+            return None, None
+
+        expires = datetime.fromisoformat(entry['expires']) if entry.get('expires') else None
+        if expires and expires < datetime.now():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None, None
+
+        # Zugriffszeit für die LRU-Verdrängung festhalten
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get('value'), expires
+
+    def _disk_set(self, namespace: str, cache_key: str, value: Any, ttl_seconds: int) -> bool:
+        """Schreibt einen Wert atomar in den Datei-Cache"""
+        path = self._disk_path(namespace, cache_key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'expires': (datetime.now() + timedelta(seconds=ttl_seconds)).isoformat(),
+                    'value': value
+                }, f, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Datei-Cache SET Fehler: {e}")
+            return False
+
+        self._schedule_disk_sweep()
+        return True
+
+    def _schedule_disk_sweep(self):
+        """Startet das Aufräumen im Hintergrund (höchstens alle DISK_CACHE_SWEEP_INTERVAL_SECONDS)"""
+        now = time.monotonic()
+        if self._last_disk_sweep is not None and \
+                now - self._last_disk_sweep < DISK_CACHE_SWEEP_INTERVAL_SECONDS:
+            return
+        if not self._disk_sweep_lock.acquire(blocking=False):
+            return
+        self._last_disk_sweep = now
+
+        def run():
+            try:
+                self.sweep_disk_cache()
+            except Exception as e:
+                logger.warning(f"Datei-Cache Aufräumen fehlgeschlagen: {e}")
+            finally:
+                self._disk_sweep_lock.release()
+
+        threading.Thread(target=run, name="disk-cache-sweep", daemon=True).start()
+
+    def sweep_disk_cache(self, max_bytes: Optional[int] = None) -> dict:
+        """
+        Begrenzt den Datei-Cache auf max_bytes (Standard: DISK_CACHE_MAX_MB).
+
+        Verdrängt die am längsten nicht gelesenen oder geschriebenen Einträge
+        (mtime), bis 90 % der Grenze erreicht sind. Liegengebliebene
+        .tmp-Dateien älter als eine Stunde werden ebenfalls entfernt.
+
+        Returns:
+            Statistik: files, bytes, removed, bytes_removed
+        """
+        if max_bytes is None:
+            max_bytes = DISK_CACHE_MAX_MB * 1024 * 1024
+
+        entries = []
+        stale_tmp_before = time.time() - 3600
+        removed = 0
+        bytes_removed = 0
+
+        for namespace in PERSISTENT_NAMESPACES:
+            namespace_dir = self._disk_namespace_dir(namespace)
+            if not namespace_dir.exists():
+                continue
+            for path in namespace_dir.glob('*/*'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if path.suffix == '.tmp':
+                    if stat.st_mtime < stale_tmp_before:
+                        try:
+                            path.unlink()
+                            removed += 1
+                            bytes_removed += stat.st_size
+                        except OSError:
+                            pass
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        stats = {'files': len(entries), 'bytes': total, 'removed': removed, 'bytes_removed': bytes_removed}
+        if total <= max_bytes:
+            return stats
+
+        target = int(max_bytes * 0.9)
+        entries.sort(key=lambda entry: entry[0])
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            stats['files'] -= 1
+            stats['removed'] += 1
+            stats['bytes_removed'] += size
+
+        stats['bytes'] = total
+        logger.info(
+            f"Datei-Cache aufgeräumt: {stats['removed']} Einträge, "
+            f"{stats['bytes_removed'] / 1024 / 1024:.1f} MB freigegeben"
+        )
+        return stats
+
     def set(self, namespace: str, key: str, value: Any, ttl_seconds: int = 3600) -> bool:
         """
         Speichert einen Wert im Cache.
@@ -171,10 +352,13 @@ class CacheService:
             except Exception as e:
                 logger.warning(f"Redis SET Fehler: {e}")
 
-        # Fallback: Memory Cache
+        # Fallback: Memory Cache (+ Datei-Cache für persistente Namespaces)
         try:
-            self._memory_cache[cache_key] = value
-            self._memory_expiry[cache_key] = datetime.now() + timedelta(seconds=ttl_seconds)
+            if namespace not in DISK_ONLY_NAMESPACES:
+                self._memory_cache[cache_key] = value
+                self._memory_expiry[cache_key] = datetime.now() + timedelta(seconds=ttl_seconds)
+            if namespace in PERSISTENT_NAMESPACES:
+                self._disk_set(namespace, cache_key, value, ttl_seconds)
             return True
         except Exception as e:
             logger.error(f"Memory Cache SET Fehler: {e}")
@@ -200,6 +384,13 @@ class CacheService:
                 del self._memory_expiry[cache_key]
             success = True
 
+        if namespace in PERSISTENT_NAMESPACES:
+            try:
+                self._disk_path(namespace, cache_key).unlink()
+                success = True
+            except OSError:
+                pass
+
         return success
 
     def clear_namespace(self, namespace: str) -> int:
@@ -225,6 +416,14 @@ class CacheService:
                 del self._memory_expiry[k]
             deleted += 1
 
+        # Datei-Cache
+        if namespace in PERSISTENT_NAMESPACES:
+            import shutil
+            namespace_dir = self._disk_namespace_dir(namespace)
+            if namespace_dir.exists():
+                deleted += sum(1 for _ in namespace_dir.rglob('*.json'))
+                shutil.rmtree(namespace_dir, ignore_errors=True)
+
         return deleted
 
     # ==================== SPEZIALISIERTE CACHE-METHODEN ====================
@@ -237,6 +436,54 @@ class CacheService:
         """Cached OCR-Ergebnis für eine Datei."""
         return self.set('ocr', file_hash, text, ttl_seconds=ttl_days * 86400)
 
+    def _ocr_page_key(self, content_hash: str, settings_key: str, page: Union[int, str]) -> str:
+        """Key für ein Seitenergebnis: Inhalts-Hash + OCR-Einstellungen + Seite"""
+        return f"{content_hash}:{settings_key}:{page}"
+
+    def get_ocr_pages(self, content_hash: str, settings_key: str) -> Tuple[Optional[int], dict]:
+        """
+        Holt alle gecachten Seitenergebnisse eines Dokuments.
+
+        Args:
+            content_hash: SHA-256 des Dateiinhalts
+            settings_key: Fingerabdruck der OCR-Einstellungen
+
+        Returns:
+            Tuple aus (Seitenzahl oder None, {Seitenindex: (Text, Konfidenz)})
+        """
+        page_count = self.get('ocr_page', self._ocr_page_key(content_hash, settings_key, 'count'))
+        if page_count is None:
+            return None, {}
+
+        pages = {}
+        for page in range(int(page_count)):
+            entry = self.get('ocr_page', self._ocr_page_key(content_hash, settings_key, page))
+            if entry is not None:
+                pages[page] = (entry[0], float(entry[1]))
+        return int(page_count), pages
+
+    def set_ocr_page(self, content_hash: str, settings_key: str, page: int,
+                     text: str, confidence: float, ttl_days: int = 90) -> bool:
+        """Cached das OCR-Ergebnis einer einzelnen Seite."""
+        return self.set('ocr_page', self._ocr_page_key(content_hash, settings_key, page),
+                        [text, confidence], ttl_seconds=ttl_days * 86400)
+
+    def set_ocr_page_count(self, content_hash: str, settings_key: str, page_count: int,
+                           ttl_days: int = 90) -> bool:
+        """Speichert die Seitenzahl eines gecachten Dokuments."""
+        return self.set('ocr_page', self._ocr_page_key(content_hash, settings_key, 'count'),
+                        page_count, ttl_seconds=ttl_days * 86400)
+
+    def get_stats(self) -> dict:
+        """Gibt Treffer und Fehlschläge pro Namespace zurück."""
+        stats = {}
+        for namespace, counters in self._stats.items():
+            hits = sum(v for k, v in counters.items() if k.startswith('hits_'))
+            lookups = hits + counters.get('misses', 0)
+            stats[namespace] = dict(counters)
+            stats[namespace]['hit_rate'] = round(hits / lookups, 3) if lookups else 0.0
+        return stats
+
     def get_ai_response(self, prompt_hash: str) -> Optional[dict]:
         """Holt gecachte KI-Antwort."""
         return self.get('ai', prompt_hash)
@@ -253,6 +500,26 @@ class CacheService:
         """Cached Dokument-Metadaten."""
         return self.set('doc', str(doc_id), metadata, ttl_seconds=ttl_minutes * 60)
 
+    def get_folder_listing(self, folder_id: str) -> Optional[dict]:
+        """Holt ein gecachtes Cloud-Ordnerlisting."""
+        return self.get('folder_listing', folder_id)
+
+    def set_folder_listing(self, folder_id: str, listing: dict, ttl_minutes: int = 10) -> bool:
+        """Cached ein Cloud-Ordnerlisting (kurze TTL, damit Änderungen zeitnah sichtbar werden)."""
+        return self.set('folder_listing', folder_id, listing, ttl_seconds=ttl_minutes * 60)
+
+    def get_dashboard_snapshot(self, user_id: int) -> Optional[dict]:
+        """Holt den gecachten Dashboard-Snapshot eines Benutzers."""
+        return self.get('dashboard', str(user_id))
+
+    def set_dashboard_snapshot(self, user_id: int, snapshot: dict, ttl_seconds: int = 300) -> bool:
+        """Cached den Dashboard-Snapshot (wird bei Änderungen invalidiert)."""
+        return self.set('dashboard', str(user_id), snapshot, ttl_seconds=ttl_seconds)
+
+    def invalidate_dashboard_snapshot(self, user_id: int) -> bool:
+        """Invalidiert den Dashboard-Snapshot eines Benutzers."""
+        return self.delete('dashboard', str(user_id))
+
     def invalidate_document(self, doc_id: int) -> bool:
         """Invalidiert Cache für ein Dokument."""
         return self.delete('doc', str(doc_id))
@@ -266,7 +533,8 @@ class CacheService:
             'connected': self._redis_client is not None,
             'memory_entries': len(self._memory_cache),
             'redis_info': None,
-            'error': self._last_error  # Zeigt den letzten Fehler
+            'error': self._last_error,  # Zeigt den letzten Fehler
+            'stats': self.get_stats()
         }
 
         if self._redis_client:
@@ -3,22 +3,30 @@ Cloud-Sync Service für Dropbox und Google Drive
 Ermöglicht automatische Synchronisation von Dokumenten aus Cloud-Ordnern
 """
 import os
+import time
+import random
+import socket
 import hashlib
 import json
 import logging
-from datetime import datetime, timedelta
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlencode, urlparse, parse_qs
 
 import re
 from bs4 import BeautifulSoup
+from sqlalchemy import or_, func
 
 from database.models import Document, Folder, DocumentStatus
 from database.db import get_db
 from database.extended_models import (
-    CloudSyncConnection, CloudSyncLog, CloudProvider, SyncStatus
+    CloudSyncConnection, CloudSyncLog, CloudSyncManifestEntry, CloudProvider, SyncStatus
 )
 
 logger = logging.getLogger(__name__)
@@ -33,6 +41,204 @@ GOOGLE_DRIVE_FOLDER_URL = "https://drive.google.com/drive/folders/{folder_id}"
 GOOGLE_DRIVE_PUBLIC_API = "https://www.googleapis.com/drive/v3/files"
 
 
+# ==================== SYNC-PIPELINE ====================
+# Standardwerte, überschreibbar über die Einstellungen (cloud_sync_*)
+SYNC_DOWNLOAD_WORKERS = 4
+SYNC_COMMIT_BATCH_SIZE = 20
+# Verbindungen pro Host im HTTP-Pool eines Threads
+HTTP_POOL_MAXSIZE = 8
+# Sperre einer Verbindung gilt als verwaist, wenn so lange kein Fortschritt gemeldet wurde
+SYNC_LOCK_STALE_MINUTES = 15
+# Standard-Intervall für automatische Syncs ohne eigene Einstellung
+DEFAULT_SYNC_INTERVAL_MINUTES = 15
+# Nach Fehlschlägen verdoppelt sich die Wartezeit bis höchstens hierhin
+SYNC_ERROR_BACKOFF_MAX_MINUTES = 24 * 60
+# Spätestens nach dieser Zeit wird ein offener Batch committet (inkl. Fortschritt)
+SYNC_PROGRESS_INTERVAL_SECONDS = 10
+# Heartbeat der Sperre unabhängig vom Fortschritt (Scan, lange OCR einzelner Dateien)
+SYNC_HEARTBEAT_INTERVAL_SECONDS = 60
+# Blockgröße beim Streamen von Downloads in Spool-Dateien
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# ==================== ORDNER-CRAWLER ====================
+# Gleichzeitige Listing-Anfragen beim Durchsuchen öffentlicher Ordnerbäume
+CRAWL_MAX_WORKERS = 8
+# Maximale Anfragen pro Sekunde und Host
+HOST_REQUESTS_PER_SECOND = 10
+# Wiederholungen bei 429/5xx und Verbindungsfehlern (exponentieller Backoff)
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_BASE_SECONDS = 0.5
+HTTP_BACKOFF_MAX_SECONDS = 30
+HTTP_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Gültigkeit gecachter Ordnerlistings
+FOLDER_LISTING_CACHE_MINUTES = 10
+
+_http_local = threading.local()
+
+
+def _get_http_session() -> requests.Session:
+    """
+    Gibt die HTTP-Session des aktuellen Threads zurück.
+
+    requests.Session ist nicht threadsicher, daher eine Session pro Thread.
+    Verbindungen (TCP/TLS) werden über den Connection-Pool wiederverwendet.
+    """
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _http_local.session = session
+    return session
+
+
+class _HostRateLimiter:
+    """Verteilt Anfragen pro Host gleichmäßig (threadsicher, ohne Hintergrund-Thread)"""
+
+    def __init__(self, requests_per_second: float):
+        self._interval = 1.0 / requests_per_second
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str):
+        """Blockiert, bis für den Host wieder eine Anfrage erlaubt ist"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_host_rate_limiter = _HostRateLimiter(HOST_REQUESTS_PER_SECOND)
+
+
+def _http_get_with_retry(url: str, **kwargs) -> requests.Response:
+    """
+    GET-Anfrage mit Ratenbegrenzung pro Host und Wiederholung bei Überlast.
+
+    Wiederholt bei Verbindungsfehlern, Timeouts und den Statuscodes in
+    HTTP_RETRY_STATUS_CODES mit exponentiellem Backoff (Retry-After wird
+    beachtet). Nach dem letzten Versuch wird die Antwort bzw. der Fehler
+    an den Aufrufer weitergegeben.
+    """
+    host = urlparse(url).netloc
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        _host_rate_limiter.wait(host)
+        delay = HTTP_BACKOFF_BASE_SECONDS * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_BASE_SECONDS)
+        try:
+            response = _get_http_session().get(url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == HTTP_MAX_RETRIES:
+                raise
+            logger.warning(f"Anfrage an {host} fehlgeschlagen ({e}), Wiederholung {attempt + 1}/{HTTP_MAX_RETRIES}")
+        else:
+            if response.status_code not in HTTP_RETRY_STATUS_CODES or attempt == HTTP_MAX_RETRIES:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = float(retry_after)
+            logger.warning(f"{host} antwortet {response.status_code}, Wiederholung {attempt + 1}/{HTTP_MAX_RETRIES}")
+            response.close()
+        time.sleep(min(delay, HTTP_BACKOFF_MAX_SECONDS))
+
+
+def _discard_spool(spool: Optional[Dict]):
+    """Löscht eine Spool-Datei, falls sie noch existiert (nicht übernommen)"""
+    if not spool or not spool.get("path"):
+        return
+    try:
+        os.unlink(spool["path"])
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Spool-Datei konnte nicht gelöscht werden: {spool['path']}: {e}")
+
+
+def _attach_script_context(ctx):
+    """Hängt den Streamlit-Kontext an einen Worker-Thread (für session_state-Zugriffe)"""
+    if ctx is None:
+        return
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(threading.current_thread(), ctx)
+    except Exception:
+        pass
+
+
+def _get_script_context():
+    """Gibt den Streamlit-Kontext des aktuellen Threads zurück (None ohne Streamlit)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx()
+    except Exception:
+        return None
+
+
+def next_sync_time(connection: CloudSyncConnection, now: Optional[datetime] = None) -> datetime:
+    """
+    Zeitpunkt des nächsten automatischen Syncs einer Verbindung.
+
+    Nach Fehlschlägen zählt der letzte Versuch statt des letzten Erfolgs;
+    die Wartezeit verdoppelt sich pro Fehlschlag in Folge (höchstens
+    SYNC_ERROR_BACKOFF_MAX_MINUTES), damit nicht erreichbare Verbindungen
+    nicht bei jedem Durchlauf erneut gescannt werden.
+    """
+    interval = connection.sync_interval_minutes or DEFAULT_SYNC_INTERVAL_MINUTES
+    failures = connection.sync_failure_count or 0
+
+    if failures and connection.last_sync_attempt_at:
+        backoff = min(interval * 2 ** (failures - 1), SYNC_ERROR_BACKOFF_MAX_MINUTES)
+        return connection.last_sync_attempt_at + timedelta(minutes=backoff)
+    if connection.last_sync_at is None:
+        return now or datetime.now()
+    return connection.last_sync_at + timedelta(minutes=interval)
+
+
+class _SyncHeartbeat:
+    """
+    Hält die Sync-Sperre einer Verbindung aktuell, solange der Sync läuft.
+
+    Ein Hintergrund-Thread setzt sync_heartbeat_at in einer eigenen Session,
+    damit die Sperre auch während langer Scans oder einzelner Dateien mit
+    aufwendiger OCR nicht als verwaist gilt. Es wird nur aktualisiert,
+    solange dieser Sync die Sperre hält (sync_owner).
+    """
+
+    def __init__(self, connection_id: int, owner: str,
+                 interval: float = SYNC_HEARTBEAT_INTERVAL_SECONDS):
+        self.connection_id = connection_id
+        self.owner = owner
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"sync-heartbeat-{connection_id}", daemon=True
+        )
+
+    def start(self) -> "_SyncHeartbeat":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                with get_db() as session:
+                    session.query(CloudSyncConnection).filter(
+                        CloudSyncConnection.id == self.connection_id,
+                        CloudSyncConnection.sync_owner == self.owner
+                    ).update({
+                        CloudSyncConnection.sync_heartbeat_at: datetime.now()
+                    }, synchronize_session=False)
+            except Exception as e:
+                logger.debug(f"Heartbeat für Verbindung {self.connection_id} fehlgeschlagen: {e}")
+
+
 class CloudSyncConnectionWrapper:
     """Wrapper für CloudSyncConnection mit vereinfachtem Attributzugriff"""
 
@@ -64,6 +270,12 @@ class CloudSyncConnectionWrapper:
         self.file_extensions = connection.file_extensions
         self.max_file_size_mb = connection.max_file_size_mb
 
+        # Laufende Synchronisation (z.B. durch den Hintergrund-Scheduler)
+        self.sync_owner = connection.sync_owner
+        self.sync_started_at = connection.sync_started_at
+        self.sync_heartbeat_at = connection.sync_heartbeat_at
+        self.sync_progress = connection.sync_progress
+
 
 class CloudSyncLogWrapper:
     """Wrapper für CloudSyncLog mit vereinfachtem Attributzugriff"""
@@ -267,13 +479,13 @@ class CloudSyncService:
 
         if cursor:
             # Fortsetzung eines vorherigen Aufrufs
-            response = requests.post(
+            response = _get_http_session().post(
                 f"{self.DROPBOX_API_URL}/files/list_folder/continue",
                 headers=headers,
                 json={"cursor": cursor}
             )
         else:
-            response = requests.post(
+            response = _get_http_session().post(
                 f"{self.DROPBOX_API_URL}/files/list_folder",
                 headers=headers,
                 json={
@@ -293,7 +505,7 @@ class CloudSyncService:
             "Dropbox-API-Arg": json.dumps({"path": path})
         }
 
-        response = requests.post(
+        response = _get_http_session().post(
             f"{self.DROPBOX_CONTENT_URL}/files/download",
             headers=headers
         )
@@ -301,11 +513,31 @@ class CloudSyncService:
         metadata = json.loads(response.headers.get("Dropbox-API-Result", "{}"))
         return response.content, metadata
 
+    def _dropbox_open_download(self, access_token: str, path: str) -> Optional[requests.Response]:
+        """Öffnet einen gestreamten Dropbox-Download (Body wird noch nicht gelesen)"""
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Dropbox-API-Arg": json.dumps({"path": path})
+        }
+
+        response = _get_http_session().post(
+            f"{self.DROPBOX_CONTENT_URL}/files/download",
+            headers=headers,
+            stream=True,
+            timeout=60
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Dropbox Download fehlgeschlagen: {response.status_code}")
+            response.close()
+            return None
+        return response
+
     def _dropbox_get_file_metadata(self, access_token: str, path: str) -> Dict:
         """Holt Metadaten einer Dropbox-Datei"""
         headers = {"Authorization": f"Bearer {access_token}"}
 
-        response = requests.post(
+        response = _get_http_session().post(
             f"{self.DROPBOX_API_URL}/files/get_metadata",
             headers=headers,
             json={"path": path}
@@ -327,7 +559,7 @@ class CloudSyncService:
             }
 
             # Erst Metadaten des Shared Links holen
-            metadata_response = requests.post(
+            metadata_response = _get_http_session().post(
                 "https://api.dropboxapi.com/2/sharing/get_shared_link_metadata",
                 headers=headers,
                 json={
@@ -345,7 +577,7 @@ class CloudSyncService:
 
             # Wenn es ein Ordner ist, Liste den Inhalt
             if metadata.get(".tag") == "folder":
-                list_response = requests.post(
+                list_response = _get_http_session().post(
                     "https://api.dropboxapi.com/2/files/list_folder",
                     headers=headers,
                     json={
@@ -364,7 +596,10 @@ class CloudSyncService:
                             "name": entry.get("name", ""),
                             "path": entry.get("path_display", ""),
                             "mimeType": "application/vnd.dropbox.folder" if entry.get(".tag") == "folder" else self._guess_mime_type(entry.get("name", "")),
-                            "size": entry.get("size", 0)
+                            "size": entry.get("size", 0),
+                            "rev": entry.get("rev"),
+                            "content_hash": entry.get("content_hash"),
+                            "server_modified": entry.get("server_modified")
                         })
                     return {"files": files, "success": True}
 
@@ -387,7 +622,7 @@ class CloudSyncService:
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             }
 
-            response = requests.get(shared_link, headers=headers, timeout=30, allow_redirects=True)
+            response = _get_http_session().get(shared_link, headers=headers, timeout=30, allow_redirects=True)
 
             if response.status_code != 200:
                 return {"error": f"HTTP {response.status_code}", "success": False}
@@ -453,7 +688,7 @@ class CloudSyncService:
                 # Wenn Pfad angegeben, füge ihn hinzu
                 download_url = f"{download_url}&path={path}"
 
-            response = requests.get(download_url, timeout=60, allow_redirects=True)
+            response = _get_http_session().get(download_url, timeout=60, allow_redirects=True)
 
             if response.status_code == 200:
                 return response.content, True
@@ -465,6 +700,20 @@ class CloudSyncService:
             logger.error(f"Dropbox Download Fehler: {e}")
             return b'', False
 
+    def _dropbox_public_open_download(self, shared_link: str, path: str) -> Optional[requests.Response]:
+        """Öffnet einen gestreamten Download aus einem öffentlich geteilten Dropbox-Ordner"""
+        download_url = shared_link.replace("?dl=0", "?dl=1").replace("www.dropbox.com", "dl.dropboxusercontent.com")
+        if path:
+            download_url = f"{download_url}&path={path}"
+
+        response = _get_http_session().get(download_url, timeout=60, allow_redirects=True, stream=True)
+
+        if response.status_code != 200:
+            logger.error(f"Dropbox Download fehlgeschlagen: {response.status_code}")
+            response.close()
+            return None
+        return response
+
     # ==================== GOOGLE DRIVE API ====================
 
     def _google_list_folder(self, access_token: str, folder_id: str = None,
@@ -485,7 +734,7 @@ class CloudSyncService:
         if page_token:
             params["pageToken"] = page_token
 
-        response = requests.get(
+        response = _get_http_session().get(
             f"{self.GOOGLE_API_URL}/files",
             headers=headers,
             params=params
@@ -497,7 +746,7 @@ class CloudSyncService:
         """Lädt eine Datei von Google Drive herunter"""
         headers = {"Authorization": f"Bearer {access_token}"}
 
-        response = requests.get(
+        response = _get_http_session().get(
             f"{self.GOOGLE_API_URL}/files/{file_id}",
             headers=headers,
             params={"alt": "media"}
@@ -505,6 +754,24 @@ class CloudSyncService:
 
         return response.content
 
+    def _google_open_download(self, access_token: str, file_id: str) -> Optional[requests.Response]:
+        """Öffnet einen gestreamten Google-Drive-Download (Body wird noch nicht gelesen)"""
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        response = _get_http_session().get(
+            f"{self.GOOGLE_API_URL}/files/{file_id}",
+            headers=headers,
+            params={"alt": "media"},
+            stream=True,
+            timeout=60
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Google Drive Download fehlgeschlagen: {response.status_code}")
+            response.close()
+            return None
+        return response
+
     def _google_get_folder_id_from_link(self, link: str) -> Optional[str]:
         """Extrahiert Folder-ID aus Google Drive Link oder Text"""
         import re
@@ -583,7 +850,7 @@ class CloudSyncService:
             while True:
                 params = {
                     "q": f"'{folder_id}' in parents and trashed=false",
-                    "fields": "nextPageToken, files(id,name,mimeType,size)",
+                    "fields": "nextPageToken, files(id,name,mimeType,size,modifiedTime,md5Checksum)",
                     "pageSize": 1000,
                     "supportsAllDrives": "true",
                     "includeItemsFromAllDrives": "true",
@@ -592,7 +859,7 @@ class CloudSyncService:
                 if token:
                     params["pageToken"] = token
 
-                response = requests.get(BASE, params=params, timeout=30)
+                response = _http_get_with_retry(BASE, params=params, timeout=30)
 
                 if response.status_code == 403:
                     logger.warning("Google API: Zugriff verweigert (403) - Key ungültig oder Ordner nicht öffentlich")
@@ -609,7 +876,9 @@ class CloudSyncService:
                         "id": file_info.get("id"),
                         "name": file_info.get("name"),
                         "mimeType": file_info.get("mimeType", "application/octet-stream"),
-                        "size": int(file_info.get("size", 0)) if file_info.get("size") else 0
+                        "size": int(file_info.get("size", 0)) if file_info.get("size") else 0,
+                        "modifiedTime": file_info.get("modifiedTime"),
+                        "md5Checksum": file_info.get("md5Checksum")
                     })
 
                 token = data.get("nextPageToken")
@@ -663,7 +932,7 @@ class CloudSyncService:
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             }
 
-            response = requests.get(embed_url, headers=headers, timeout=30, allow_redirects=True)
+            response = _http_get_with_retry(embed_url, headers=headers, timeout=30, allow_redirects=True)
 
             if response.status_code != 200:
                 return {"error": f"HTTP {response.status_code}", "success": False}
@@ -761,7 +1030,7 @@ class CloudSyncService:
                 "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
             }
 
-            response = requests.get(url, headers=headers, timeout=30, allow_redirects=True)
+            response = _http_get_with_retry(url, headers=headers, timeout=30, allow_redirects=True)
 
             if response.status_code != 200:
                 return {"error": f"HTTP {response.status_code}: Ordner nicht zugänglich"}
@@ -1161,6 +1430,34 @@ class CloudSyncService:
         Returns:
             Tuple von (file_content, success)
         """
+        response = self._google_public_open_download(file_id)
+        if response is None:
+            return b'', False
+
+        try:
+            content = response.content
+        except Exception as e:
+            logger.error(f"Fehler beim Download von Datei {file_id}: {e}")
+            return b'', False
+        finally:
+            response.close()
+
+        if len(content) == 0:
+            return b'', False
+
+        return content, True
+
+    def _google_public_open_download(self, file_id: str) -> Optional[requests.Response]:
+        """
+        Öffnet einen gestreamten Download von einem öffentlichen Google Drive.
+
+        Bestätigungs- und Fehlerseiten werden am Content-Type erkannt, nur
+        diese (kleinen) HTML-Seiten werden gelesen - der Dateiinhalt bleibt
+        ungelesen im Stream.
+
+        Returns:
+            Offene Response oder None bei Fehler
+        """
         try:
             # Direkte Download-URL
             download_url = GOOGLE_DRIVE_DOWNLOAD_URL.format(file_id=file_id)
@@ -1170,11 +1467,12 @@ class CloudSyncService:
             }
 
             # Erste Anfrage - kann eine Bestätigungsseite zurückgeben
-            session = requests.Session()
+            session = _get_http_session()
             response = session.get(download_url, headers=headers, stream=True, timeout=60)
 
             # Prüfe auf Virus-Scan-Warnung (große Dateien)
-            if 'download_warning' in response.url or b'confirm=' in response.content[:1000]:
+            is_html = 'text/html' in response.headers.get('Content-Type', '')
+            if 'download_warning' in response.url or is_html:
                 # Extrahiere Bestätigungs-Token
                 confirm_token = None
 
@@ -1183,43 +1481,45 @@ class CloudSyncService:
                         confirm_token = value
                         break
 
+                page_text = response.text if is_html else ''
                 if not confirm_token:
                     # Versuche Token aus HTML zu extrahieren
-                    match = re.search(r'confirm=([a-zA-Z0-9_-]+)', response.text)
+                    match = re.search(r'confirm=([a-zA-Z0-9_-]+)', page_text)
                     if match:
                         confirm_token = match.group(1)
 
                 if confirm_token:
                     # Zweite Anfrage mit Bestätigung
+                    response.close()
                     confirm_url = f"{download_url}&confirm={confirm_token}"
                     response = session.get(confirm_url, headers=headers, stream=True, timeout=60)
+                    is_html = 'text/html' in response.headers.get('Content-Type', '')
+                    page_text = response.text if is_html else ''
+
+                if is_html:
+                    # Wahrscheinlich eine Fehlerseite
+                    response.close()
+                    if 'Access denied' in page_text or 'denied' in page_text.lower():
+                        logger.warning(f"Zugriff verweigert für Datei {file_id}")
+                    elif 'quota' in page_text.lower():
+                        logger.warning(f"Download-Quota überschritten für Datei {file_id}")
+                    else:
+                        logger.warning(f"HTML-Seite statt Datei erhalten für {file_id}")
+                    return None
 
-            # Prüfe ob Download erfolgreich
-            content_type = response.headers.get('Content-Type', '')
-
-            if 'text/html' in content_type:
-                # Wahrscheinlich eine Fehlerseite
-                if 'Access denied' in response.text or 'denied' in response.text.lower():
-                    logger.warning(f"Zugriff verweigert für Datei {file_id}")
-                    return b'', False
-                elif 'quota' in response.text.lower():
-                    logger.warning(f"Download-Quota überschritten für Datei {file_id}")
-                    return b'', False
-
-            # Lade vollständigen Inhalt
-            content = response.content
-
-            if len(content) == 0:
-                return b'', False
+            if response.status_code != 200:
+                logger.error(f"Download von Datei {file_id} fehlgeschlagen: {response.status_code}")
+                response.close()
+                return None
 
-            return content, True
+            return response
 
         except requests.exceptions.Timeout:
             logger.error(f"Timeout beim Download von Datei {file_id}")
-            return b'', False
+            return None
         except Exception as e:
             logger.error(f"Fehler beim Download von Datei {file_id}: {e}")
-            return b'', False
+            return None
 
     def _collect_dropbox_files_public(self, connection: CloudSyncConnection,
                                        session) -> List[Dict]:
@@ -1261,23 +1561,15 @@ class CloudSyncService:
             if connection.file_extensions and ext and ext not in connection.file_extensions:
                 continue
 
-            # Prüfen ob bereits synchronisiert
-            from database.extended_models import CloudSyncLog
-            existing_log = session.query(CloudSyncLog).filter(
-                CloudSyncLog.connection_id == connection.id,
-                CloudSyncLog.remote_file_id == file_path
-            ).first()
-
-            if existing_log:
-                continue
-
+            # Bereits synchronisierte Dateien filtert das Manifest heraus
             files.append({
                 "name": filename,
                 "path": file_path,
                 "id": file_path,
                 "size": file_info.get("size", 0),
-                "hash": None,
-                "modified": None,
+                "hash": file_info.get("content_hash"),
+                "rev": file_info.get("rev"),
+                "modified": file_info.get("server_modified"),
                 "mime_type": mime_type,
                 "provider": "dropbox_public",
                 "shared_link": shared_link
@@ -1321,76 +1613,168 @@ class CloudSyncService:
             logger.error("Keine Ordner-ID gefunden - weder in remote_folder_id noch remote_folder_path")
             return files
 
-        logger.info(f"Starte rekursive Sammlung mit Folder-ID: {folder_id}")
+        logger.info(f"Starte Sammlung mit Folder-ID: {folder_id}")
 
-        # Rekursiv alle Dateien sammeln
-        self._collect_public_folder_recursive(
-            folder_id=folder_id,
-            folder_path="",  # Root-Ordner
+        # Alle Unterordner parallel listen, dann Dateien in fester Reihenfolge sammeln
+        self._collect_public_folder_tree(
+            root_folder_id=folder_id,
             connection=connection,
-            session=session,
             files=files
         )
 
         logger.info(f"Insgesamt {len(files)} Dateien in öffentlichem Ordner gefunden")
         return files
 
-    def _collect_public_folder_recursive(self, folder_id: str, folder_path: str,
-                                          connection: CloudSyncConnection,
-                                          session, files: List[Dict],
-                                          depth: int = 0, max_depth: int = 50):
+    @staticmethod
+    def _is_public_subfolder(file_info: Dict) -> bool:
+        """Erkennt Unterordner in öffentlichen Listings (auch gescrapte Einträge ohne MIME-Typ)"""
+        mime_type = file_info.get("mimeType", "")
+        filename = file_info.get("name", "")
+        is_folder = mime_type == "application/vnd.google-apps.folder"
+        has_no_extension = '.' not in filename
+        # Könnte ein Ordner sein - wird wie einer gelistet
+        return is_folder or (has_no_extension and not mime_type.startswith("application/"))
+
+    def _list_public_folder_cached(self, folder_id: str) -> Tuple[Dict, bool]:
+        """
+        Listet einen öffentlichen Ordner, erfolgreiche Listings werden mit TTL gecacht.
+
+        Returns:
+            Tuple von (Listing, aus Cache)
+        """
+        try:
+            from services.cache_service import get_cache_service
+            cache = get_cache_service()
+        except ImportError:
+            cache = None
+
+        if cache:
+            cached = cache.get_folder_listing(folder_id)
+            if cached is not None:
+                return cached, True
+
+        response = self._google_public_list_folder(folder_id)
+        if cache and "error" not in response:
+            cache.set_folder_listing(folder_id, response, ttl_minutes=FOLDER_LISTING_CACHE_MINUTES)
+        return response, False
+
+    def _crawl_public_folders(self, root_folder_id: str, max_depth: int) -> Tuple[Dict[str, Dict], Dict[str, int]]:
+        """
+        Listet einen öffentlichen Ordnerbaum in Breitensuche.
+
+        Bis zu CRAWL_MAX_WORKERS Listings laufen gleichzeitig; jeder Ordner
+        wird nur einmal abgefragt, auch wenn er mehrfach verlinkt ist.
+        Ratenbegrenzung und Wiederholungen übernimmt _http_get_with_retry.
+
+        Returns:
+            Tuple von (Listing pro Ordner-ID, Statistik)
+        """
+        stats = {"folders": 0, "listings": 0, "cache_hits": 0, "errors": 0}
+        listings: Dict[str, Dict] = {}
+        requested = {root_folder_id}
+        script_ctx = _get_script_context()
+
+        with ThreadPoolExecutor(
+            max_workers=CRAWL_MAX_WORKERS, thread_name_prefix="drive-crawl",
+            initializer=_attach_script_context, initargs=(script_ctx,)
+        ) as pool:
+            in_flight = {pool.submit(self._list_public_folder_cached, root_folder_id): (root_folder_id, 0)}
+
+            while in_flight:
+                done, _ = wait(set(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder_id, depth = in_flight.pop(future)
+                    try:
+                        response, from_cache = future.result()
+                    except Exception as e:
+                        response, from_cache = {"error": str(e)}, False
+                    listings[folder_id] = response
+                    stats["folders"] += 1
+                    stats["cache_hits" if from_cache else "listings"] += 1
+
+                    if "error" in response:
+                        stats["errors"] += 1
+                        continue
+                    if depth >= max_depth:
+                        continue
+
+                    for file_info in response.get("files", []):
+                        subfolder_id = file_info.get("id", "")
+                        if subfolder_id and subfolder_id not in requested and self._is_public_subfolder(file_info):
+                            requested.add(subfolder_id)
+                            in_flight[pool.submit(
+                                self._list_public_folder_cached, subfolder_id
+                            )] = (subfolder_id, depth + 1)
+
+        return listings, stats
+
+    def _collect_public_folder_tree(self, root_folder_id: str,
+                                    connection: CloudSyncConnection,
+                                    files: List[Dict], max_depth: int = 50) -> List[Dict]:
         """
-        Sammelt rekursiv Dateien aus öffentlichen Google Drive Ordnern.
+        Sammelt Dateien aus einem öffentlichen Google Drive Ordnerbaum.
+
+        Die Listings werden parallel geladen (_crawl_public_folders), die
+        Dateien danach mit _append_public_folder_files eingesammelt.
+        Ergebnis und folder_path sind damit unabhängig davon, in welcher
+        Reihenfolge die Anfragen fertig werden.
 
         Args:
-            folder_id: Google Drive Ordner-ID
-            folder_path: Aktueller Pfad für die Kategorisierung (z.B. "Versicherung/Leben")
+            root_folder_id: Google Drive Ordner-ID
             connection: CloudSyncConnection
-            session: DB Session
             files: Liste zum Sammeln der Dateien
-            depth: Aktuelle Rekursionstiefe
-            max_depth: Maximale Rekursionstiefe (Standard: 50)
+            max_depth: Maximale Ordnertiefe (Standard: 50)
         """
-        if depth > max_depth:
-            logger.debug(f"Ordnertiefe {depth} erreicht bei: {folder_path}")
-            return
+        crawl_start = time.perf_counter()
+        listings, stats = self._crawl_public_folders(root_folder_id, max_depth)
 
-        logger.info(f"Durchsuche Ordner: {folder_path or 'Root'} (ID: {folder_id})")
+        self._append_public_folder_files(
+            listings, root_folder_id, "", connection, files,
+            depth=0, max_depth=max_depth, ancestors=frozenset()
+        )
 
-        # Lade Ordnerinhalt
-        response = self._google_public_list_folder(folder_id)
+        logger.info(
+            f"Ordnerbaum durchsucht: {stats['folders']} Ordner, {stats['listings']} Listings, "
+            f"{stats['cache_hits']} aus Cache, {stats['errors']} Fehler "
+            f"in {time.perf_counter() - crawl_start:.1f}s"
+        )
+        return files
+
+    def _append_public_folder_files(self, listings: Dict[str, Dict], folder_id: str,
+                                    folder_path: str, connection: CloudSyncConnection,
+                                    files: List[Dict], depth: int, max_depth: int,
+                                    ancestors: frozenset):
+        """
+        Übernimmt die Dateien eines gelisteten Ordners in Tiefensuche.
 
+        Unterordner werden an ihrer Position im Listing eingeschoben, die
+        Reihenfolge entspricht also einem sequenziellen Durchlauf.
+        Vorfahren werden übersprungen (Zyklen über Verknüpfungen).
+        """
+        response = listings.get(folder_id)
+        if response is None:
+            return
         if "error" in response:
             logger.error(f"Fehler beim Laden des Ordners {folder_path}: {response['error']}")
             return
 
         file_list = response.get("files", [])
-        logger.info(f"Gefunden: {len(file_list)} Einträge in {folder_path or 'Root'}")
+        logger.debug(f"Gefunden: {len(file_list)} Einträge in {folder_path or 'Root'}")
+        ancestors = ancestors | {folder_id}
 
         for file_info in file_list:
             mime_type = file_info.get("mimeType", "")
             filename = file_info.get("name", "")
             file_id = file_info.get("id", "")
 
-            logger.debug(f"Prüfe: {filename} (MIME: {mime_type}, ID: {file_id})")
-
-            # Unterordner rekursiv durchsuchen
-            is_folder = mime_type == "application/vnd.google-apps.folder"
-            has_no_extension = '.' not in filename
-            if is_folder or (has_no_extension and not mime_type.startswith("application/")):
-                # Könnte ein Ordner sein - versuche rekursiv zu laden
-                subfolder_path = f"{folder_path}/{filename}" if folder_path else filename
-                logger.info(f"Unterordner gefunden: {subfolder_path}")
-
-                self._collect_public_folder_recursive(
-                    folder_id=file_id,
-                    folder_path=subfolder_path,
-                    connection=connection,
-                    session=session,
-                    files=files,
-                    depth=depth + 1,
-                    max_depth=max_depth
-                )
+            # Unterordner rekursiv übernehmen
+            if self._is_public_subfolder(file_info):
+                if depth < max_depth and file_id not in ancestors:
+                    subfolder_path = f"{folder_path}/{filename}" if folder_path else filename
+                    self._append_public_folder_files(
+                        listings, file_id, subfolder_path, connection, files,
+                        depth=depth + 1, max_depth=max_depth, ancestors=ancestors
+                    )
                 continue
 
             # Google Docs/Sheets etc. überspringen
@@ -1405,19 +1789,7 @@ class CloudSyncService:
                 logger.debug(f"Überspringe wegen Dateiendung: {filename} ({ext} nicht in {connection.file_extensions})")
                 continue
 
-            # Prüfen ob bereits synchronisiert
-            existing_log = session.query(CloudSyncLog).filter(
-                CloudSyncLog.connection_id == connection.id,
-                CloudSyncLog.remote_file_id == file_id
-            ).first()
-
-            if existing_log:
-                logger.debug(f"Überspringe bereits synchronisiert: {filename}")
-                continue
-
-            logger.info(f"Datei erkannt (wird importiert): {filename} ({mime_type})")
-
-            # Vollständigen Pfad für die Datei erstellen
+            # Bereits synchronisierte Dateien filtert das Manifest heraus
             full_path = f"{folder_path}/{filename}" if folder_path else filename
 
             files.append({
@@ -1425,17 +1797,13 @@ class CloudSyncService:
                 "path": full_path,  # WICHTIG: Vollständiger Pfad für Kategorisierung
                 "id": file_id,
                 "size": file_info.get("size", 0),
-                "hash": None,
-                "modified": None,
+                "hash": file_info.get("md5Checksum"),
+                "modified": file_info.get("modifiedTime"),
                 "mime_type": mime_type,
                 "provider": "google_drive_public",
                 "source_folder": folder_path  # Quellordner für Dokumenten-Intelligenz
             })
 
-            logger.info(f"Datei gefunden: {full_path}")
-
-        return files
-
     # ==================== SYNCHRONISATION ====================
 
     def sync_connection(self, connection_id: int,
@@ -1466,10 +1834,13 @@ class CloudSyncService:
             - progress_percent: Fortschritt in Prozent (0-100)
             - elapsed_seconds: Verstrichene Zeit
             - estimated_remaining_seconds: Geschätzte Restzeit
+            - stage_stats: Durchsatz pro Pipeline-Stufe (download, processing, writing)
+            - files_unchanged: Laut Manifest unveränderte Dateien (nicht heruntergeladen)
+            - bytes_saved / requests_saved: Eingesparte Download-Bytes und -Anfragen
+            - manifest_stats: Neu/geändert/unverändert/entfernt laut Manifest
             - success: True wenn abgeschlossen und erfolgreich
             - error: Fehlermeldung falls vorhanden
         """
-        import time
         start_time = time.time()
 
         result = {
@@ -1489,7 +1860,12 @@ class CloudSyncService:
             "skipped_files": 0,
             "errors": [],
             "error": None,
-            "synced_files": []
+            "synced_files": [],
+            "stage_stats": {},
+            "files_unchanged": 0,
+            "bytes_saved": 0,
+            "requests_saved": 0,
+            "manifest_stats": {}
         }
 
         yield result.copy()
@@ -1536,15 +1912,27 @@ class CloudSyncService:
                 yield result
                 return
 
-            # Status auf "syncing" setzen
-            connection.status = SyncStatus.SYNCING
-            session.commit()
+            # Verbindung sperren und Status auf "syncing" setzen
+            if not self._claim_connection(session, connection):
+                result["phase"] = "error"
+                result["error"] = "Synchronisation läuft bereits"
+                result["errors"].append(result["error"])
+                yield result
+                return
 
+            heartbeat = _SyncHeartbeat(connection.id, connection.sync_owner).start()
             try:
                 # Phase 1: Dateien scannen
                 result["phase"] = "scanning"
                 yield result.copy()
 
+                # Dropbox-Delta (Cursor) liefert nur Änderungen, alle anderen den ganzen Ordner
+                full_listing = not (
+                    connection.provider == CloudProvider.DROPBOX and
+                    not is_public_dropbox and
+                    connection.last_cursor
+                )
+
                 try:
                     if connection.provider == CloudProvider.DROPBOX:
                         # Öffentliche oder authentifizierte Dropbox
@@ -1564,6 +1952,9 @@ class CloudSyncService:
                         result["phase"] = "error"
                         result["error"] = f"Provider {connection.provider} nicht unterstützt"
                         result["errors"].append(result["error"])
+                        connection.status = SyncStatus.ERROR
+                        connection.last_sync_error = result["error"]
+                        self._release_connection(session, connection, result)
                         yield result
                         return
                 except Exception as collect_error:
@@ -1571,9 +1962,21 @@ class CloudSyncService:
                     result["phase"] = "error"
                     result["error"] = f"Fehler beim Scannen: {str(collect_error)}"
                     result["errors"].append(result["error"])
+                    connection.status = SyncStatus.ERROR
+                    connection.last_sync_error = result["error"]
+                    self._release_connection(session, connection, result)
                     yield result
                     return
 
+                # Unveränderte Dateien anhand des Manifests aussortieren (ohne Download)
+                files_to_sync, manifest_stats = self._filter_unchanged_files(
+                    session, connection, files_to_sync, full_listing
+                )
+                result["manifest_stats"] = manifest_stats
+                result["files_unchanged"] = manifest_stats["files_unchanged"]
+                result["bytes_saved"] = manifest_stats["bytes_saved"]
+                result["requests_saved"] = manifest_stats["requests_saved"]
+
                 result["files_total"] = len(files_to_sync)
                 logger.info(f"Dateien gefunden: {result['files_total']}")
 
@@ -1583,86 +1986,25 @@ class CloudSyncService:
                     result["error"] = None
                     connection.status = SyncStatus.COMPLETED
                     connection.last_sync_at = datetime.now()
-                    session.commit()
+                    self._release_connection(session, connection, result)
                     yield result
                     return
 
                 result["phase"] = "downloading"
+                self._persist_sync_progress(connection, result)
+                session.commit()
                 yield result.copy()
 
-                # Phase 2: Dateien herunterladen und importieren
-                for idx, file_info in enumerate(files_to_sync):
-                    elapsed = time.time() - start_time
-                    result["elapsed_seconds"] = elapsed
-                    result["current_file"] = file_info.get("name", "Unbekannt")
-                    result["current_file_size"] = file_info.get("size", 0)
-                    result["files_processed"] = idx
-                    result["source_folder"] = file_info.get("source_folder", "")
-
-                    # Fortschritt berechnen
-                    if result["files_total"] > 0:
-                        result["progress_percent"] = int((idx / result["files_total"]) * 100)
-
-                        # Restzeit schätzen
-                        if idx > 0:
-                            avg_time_per_file = elapsed / idx
-                            remaining_files = result["files_total"] - idx
-                            result["estimated_remaining_seconds"] = avg_time_per_file * remaining_files
-
-                    # Status: Download startet
-                    result["current_step"] = "downloading"
-                    result["current_step_detail"] = f"Lade {file_info.get('name')} herunter..."
-                    yield result.copy()
-
-                    # Datei verarbeiten
-                    try:
-                        sync_status, processing_steps = self._process_file_with_status(
-                            connection, session, file_info, process_documents, result
-                        )
-
-                        # Yield für jeden Verarbeitungsschritt
-                        for step in processing_steps:
-                            result["current_step"] = step.get("step", "processing")
-                            result["current_step_detail"] = step.get("detail", "")
-                            yield result.copy()
-
-                        if sync_status == "synced":
-                            result["files_synced"] += 1
-                            result["synced_files"].append(file_info.get("name"))
-                            # Commit nach jedem erfolgreichen Import!
-                            try:
-                                session.commit()
-                            except Exception as commit_err:
-                                logger.error(f"Commit Fehler für {file_info.get('name')}: {commit_err}")
-                                session.rollback()
-                                result["files_error"] += 1
-                                result["errors"].append(f"{file_info.get('name')}: Commit fehlgeschlagen")
-                        elif sync_status == "skipped":
-                            result["files_skipped"] += 1
-                        else:
-                            result["files_error"] += 1
-                            # Rollback bei Fehler, damit nächste Datei funktioniert
-                            try:
-                                session.rollback()
-                            except:
-                                pass
-                            # Füge letzten Fehler-Schritt zu Fehlerliste hinzu
-                            error_detail = "Unbekannter Fehler"
-                            for step in reversed(processing_steps):
-                                if step.get("step") == "error" or "❌" in step.get("detail", ""):
-                                    error_detail = step.get("detail", error_detail)
-                                    break
-                            result["errors"].append(f"{file_info.get('name')}: {error_detail}")
-
-                    except Exception as e:
-                        logger.error(f"Fehler beim Import von {file_info.get('name')}: {e}")
-                        result["files_error"] += 1
-                        result["errors"].append(f"{file_info.get('name')}: {str(e)}")
-                        # Rollback bei Exception
-                        try:
-                            session.rollback()
-                        except:
-                            pass
+                # Phase 2: Dateien herunterladen, verarbeiten und importieren (Pipeline)
+                pipeline = self._run_sync_pipeline(
+                    connection, session, files_to_sync, process_documents, result, start_time
+                )
+                try:
+                    for progress in pipeline:
+                        yield progress
+                finally:
+                    # Bei Abbruch Pools und Spool-Dateien sofort aufräumen
+                    pipeline.close()
 
                 # Phase 3: Abschluss
                 result["phase"] = "completed"
@@ -1680,15 +2022,25 @@ class CloudSyncService:
                 connection.last_sync_error = None
                 connection.total_files_synced += result["files_synced"]
 
+            except GeneratorExit:
+                # Aufrufer hat abgebrochen (z.B. Browser-Tab geschlossen): Sperre freigeben
+                logger.warning(f"Sync für Verbindung {connection_id} abgebrochen")
+                connection.status = SyncStatus.PENDING
+                result["phase"] = "aborted"
+                self._release_connection(session, connection, result)
+                raise
             except Exception as e:
                 logger.error(f"Sync-Fehler für Verbindung {connection_id}: {e}")
+                session.rollback()
                 connection.status = SyncStatus.ERROR
                 connection.last_sync_error = str(e)
                 result["phase"] = "error"
                 result["error"] = str(e)
                 result["errors"].append(str(e))
+            finally:
+                heartbeat.stop()
 
-            session.commit()
+            self._release_connection(session, connection, result)
 
         # Sync-Log schreiben
         self._write_sync_log(connection_id, result)
@@ -1699,6 +2051,128 @@ class CloudSyncService:
 
         yield result
 
+    # ==================== SPERRE & FORTSCHRITT ====================
+
+    @staticmethod
+    def _sync_owner_name() -> str:
+        """Kennung des ausführenden Prozesses/Threads für die Sync-Sperre"""
+        return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"[:255]
+
+    def _claim_connection(self, session, connection: CloudSyncConnection) -> bool:
+        """
+        Sperrt eine Verbindung atomar für diese Synchronisation.
+
+        Die Sperre ist der Status SYNCING mit aktuellem Heartbeat. Sie gilt
+        über Prozesse hinweg (UI und Hintergrund-Scheduler); verwaiste
+        Sperren ohne Heartbeat seit SYNC_LOCK_STALE_MINUTES werden übernommen.
+
+        Returns:
+            True, wenn die Sperre erworben wurde
+        """
+        now = datetime.now()
+        stale_before = now - timedelta(minutes=SYNC_LOCK_STALE_MINUTES)
+
+        claimed = session.query(CloudSyncConnection).filter(
+            CloudSyncConnection.id == connection.id,
+            or_(
+                CloudSyncConnection.status.is_(None),
+                CloudSyncConnection.status != SyncStatus.SYNCING,
+                CloudSyncConnection.sync_heartbeat_at.is_(None),
+                CloudSyncConnection.sync_heartbeat_at < stale_before
+            )
+        ).update({
+            CloudSyncConnection.status: SyncStatus.SYNCING,
+            CloudSyncConnection.sync_owner: self._sync_owner_name(),
+            CloudSyncConnection.sync_started_at: now,
+            CloudSyncConnection.last_sync_attempt_at: now,
+            CloudSyncConnection.sync_heartbeat_at: now,
+            CloudSyncConnection.sync_progress: {"phase": "initializing"}
+        }, synchronize_session=False)
+        session.commit()
+        session.refresh(connection)
+
+        if not claimed:
+            logger.info(f"Verbindung {connection.id} wird bereits synchronisiert von {connection.sync_owner}")
+        return claimed == 1
+
+    def _persist_sync_progress(self, connection: CloudSyncConnection, result: Dict):
+        """Überträgt den Fortschritt in die Verbindung (wird mit dem nächsten Commit gespeichert)"""
+        connection.sync_heartbeat_at = datetime.now()
+        connection.sync_progress = {key: result.get(key) for key in (
+            "phase", "files_total", "files_processed", "files_synced", "files_skipped",
+            "files_error", "files_unchanged", "progress_percent", "current_file",
+            "elapsed_seconds", "estimated_remaining_seconds", "error"
+        )}
+
+    def _release_connection(self, session, connection: CloudSyncConnection, result: Dict):
+        """Speichert den Endstand und gibt die Sync-Sperre frei (Status setzt der Aufrufer)"""
+        self._persist_sync_progress(connection, result)
+        connection.sync_owner = None
+        # Fehlschläge in Folge zählen (Backoff in next_sync_time)
+        if connection.status == SyncStatus.ERROR:
+            connection.sync_failure_count = (connection.sync_failure_count or 0) + 1
+        elif connection.status == SyncStatus.COMPLETED:
+            connection.sync_failure_count = 0
+        session.commit()
+
+    def get_sync_status(self, connection_id: int = None) -> List[Dict[str, Any]]:
+        """
+        Status laufender und letzter Synchronisationen - auch aus anderen Prozessen.
+
+        Liest Sperre und Fortschritt aus der Verbindung sowie die Anzahl der
+        seit Sync-Beginn bereits gespeicherten Dateien aus den Sync-Logs.
+        Damit kann die UI Hintergrund-Syncs nach einem Neuladen weiter anzeigen.
+
+        Returns:
+            Liste von Status-Dictionaries pro Verbindung
+        """
+        now = datetime.now()
+        stale_before = now - timedelta(minutes=SYNC_LOCK_STALE_MINUTES)
+        statuses = []
+
+        with get_db() as session:
+            query = session.query(CloudSyncConnection).filter(
+                CloudSyncConnection.user_id == self.user_id
+            )
+            if connection_id:
+                query = query.filter(CloudSyncConnection.id == connection_id)
+
+            for conn in query.all():
+                is_running = (
+                    conn.status == SyncStatus.SYNCING and
+                    conn.sync_heartbeat_at is not None and
+                    conn.sync_heartbeat_at >= stale_before
+                )
+
+                files_saved = None
+                if is_running and conn.sync_started_at:
+                    files_saved = session.query(func.count(CloudSyncLog.id)).filter(
+                        CloudSyncLog.connection_id == conn.id,
+                        CloudSyncLog.synced_at >= conn.sync_started_at
+                    ).scalar()
+
+                next_sync_at = None
+                if conn.is_active and conn.auto_sync_enabled:
+                    next_sync_at = next_sync_time(conn, now)
+
+                statuses.append({
+                    "connection_id": conn.id,
+                    "provider": conn.provider.value if conn.provider else None,
+                    "status": conn.status.value if conn.status else None,
+                    "is_running": is_running,
+                    "is_stale": conn.status == SyncStatus.SYNCING and not is_running,
+                    "owner": conn.sync_owner,
+                    "started_at": conn.sync_started_at,
+                    "heartbeat_at": conn.sync_heartbeat_at,
+                    "progress": conn.sync_progress or {},
+                    "files_saved": files_saved,
+                    "last_sync_at": conn.last_sync_at,
+                    "last_sync_error": conn.last_sync_error,
+                    "next_sync_at": next_sync_at
+                })
+
+        return statuses
+
     def _collect_dropbox_files(self, connection: CloudSyncConnection,
                                 session) -> List[Dict]:
         """Sammelt alle zu synchronisierenden Dropbox-Dateien"""
@@ -1735,22 +2209,14 @@ class CloudSyncService:
                 if file_size > max_size:
                     continue
 
-                # Prüfen ob bereits synchronisiert
-                content_hash = entry.get("content_hash")
-                existing_log = session.query(CloudSyncLog).filter(
-                    CloudSyncLog.connection_id == connection.id,
-                    CloudSyncLog.remote_file_hash == content_hash
-                ).first()
-
-                if existing_log:
-                    continue
-
+                # Bereits synchronisierte Dateien filtert das Manifest heraus
                 files.append({
                     "name": filename,
                     "path": entry.get("path_display"),
                     "id": entry.get("id"),
                     "size": file_size,
-                    "hash": content_hash,
+                    "hash": entry.get("content_hash"),
+                    "rev": entry.get("rev"),
                     "modified": entry.get("server_modified"),
                     "provider": "dropbox"
                 })
@@ -1813,22 +2279,13 @@ class CloudSyncService:
                 if file_size > max_size:
                     continue
 
-                # Prüfen ob bereits synchronisiert
-                file_hash = file_info.get("md5Checksum")
-                existing_log = session.query(CloudSyncLog).filter(
-                    CloudSyncLog.connection_id == connection.id,
-                    CloudSyncLog.remote_file_hash == file_hash
-                ).first()
-
-                if existing_log:
-                    continue
-
+                # Bereits synchronisierte Dateien filtert das Manifest heraus
                 files.append({
                     "name": filename,
                     "path": filename,
                     "id": file_info.get("id"),
                     "size": file_size,
-                    "hash": file_hash,
+                    "hash": file_info.get("md5Checksum"),
                     "modified": file_info.get("modifiedTime"),
                     "mime_type": mime_type,
                     "provider": "google_drive"
@@ -1873,83 +2330,52 @@ class CloudSyncService:
                 "detail": f"📥 Lade herunter: {filename}"
             })
 
-            if provider == "dropbox":
-                file_content, metadata = self._dropbox_download_file(
-                    connection.access_token,
-                    file_info.get("path")
-                )
-            elif provider == "google_drive_public":
-                logger.info(f"Starte öffentlichen Download für: {filename}")
-                file_content, success = self._google_public_download_file(
-                    file_info.get("id")
-                )
-                if not success:
-                    logger.error(f"Download fehlgeschlagen für {filename}")
-                    processing_steps.append({
-                        "step": "error",
-                        "detail": f"❌ Download fehlgeschlagen: {filename}"
-                    })
-                    return "error", processing_steps
-                logger.info(f"Download erfolgreich: {len(file_content)} Bytes")
-            else:
-                file_content = self._google_download_file(
-                    connection.access_token,
-                    file_info.get("id")
-                )
+            spool, download_error = self._download_remote_file(connection, file_info)
+            if download_error:
+                processing_steps.append({
+                    "step": "error",
+                    "detail": f"❌ {download_error}"
+                })
+                return "error", processing_steps
 
-            processing_steps.append({
-                "step": "downloaded",
-                "detail": f"✅ Heruntergeladen: {len(file_content):,} Bytes"
-            })
+            try:
+                processing_steps.append({
+                    "step": "downloaded",
+                    "detail": f"✅ Heruntergeladen: {spool['size']:,} Bytes"
+                })
 
-            # Quellordner-Pfad für intelligente Kategorisierung
-            source_folder_path = file_info.get("source_folder") or file_info.get("path") or ""
+                # Quellordner-Pfad für intelligente Kategorisierung
+                source_folder_path = file_info.get("source_folder") or file_info.get("path") or ""
 
-            logger.info(f"Importiere Datei: {filename} aus Ordner: {source_folder_path}")
+                logger.info(f"Importiere Datei: {filename} aus Ordner: {source_folder_path}")
 
-            # Schritt 2: Speichern
-            processing_steps.append({
-                "step": "saving",
-                "detail": f"💾 Speichere Datei lokal..."
-            })
+                # Schritt 2: Speichern
+                processing_steps.append({
+                    "step": "saving",
+                    "detail": "💾 Speichere Datei lokal..."
+                })
 
-            # Dokument erstellen mit Status-Tracking
-            doc, import_steps = self._import_file_with_status(
-                session, connection,
-                filename,
-                file_content,
-                file_info.get("size", len(file_content)),
-                file_info.get("hash"),
-                source_folder_path,
-                process_documents
-            )
+                # Dokument erstellen mit Status-Tracking (Inhalt bleibt in der Spool-Datei)
+                doc, import_steps = self._import_file_with_status(
+                    session, connection,
+                    filename,
+                    spool["path"],
+                    file_info.get("size") or spool["size"],
+                    spool["sha256"],
+                    source_folder_path,
+                    process_documents,
+                    remote_hash=file_info.get("hash")
+                )
+            finally:
+                # Nicht übernommene Spool-Dateien (Duplikat, Fehler) entfernen
+                _discard_spool(spool)
 
             # Import-Schritte hinzufügen
             processing_steps.extend(import_steps)
 
-            # Sync-Log erstellen
-            modified_time = file_info.get("modified")
-            if modified_time and isinstance(modified_time, str):
-                try:
-                    modified_time = datetime.fromisoformat(modified_time.replace("Z", "+00:00"))
-                except:
-                    modified_time = None
-
-            sync_log = CloudSyncLog(
-                connection_id=connection.id,
-                user_id=self.user_id,
-                remote_file_path=file_info.get("path") or file_info.get("name"),
-                remote_file_id=file_info.get("id"),
-                remote_file_hash=file_info.get("hash"),
-                file_size=file_info.get("size"),
-                file_modified_at=modified_time,
-                document_id=doc.id if doc else None,
-                local_file_path=doc.file_path if doc else None,
-                sync_status="synced",
-                original_filename=file_info.get("name"),
-                mime_type=file_info.get("mime_type") or self._get_mime_type(file_info.get("name"))
-            )
-            session.add(sync_log)
+            # Sync-Log und Manifest aktualisieren
+            session.add(self._create_sync_log(connection, file_info, doc))
+            self._record_manifest_entry(session, connection, file_info, doc)
 
             processing_steps.append({
                 "step": "completed",
@@ -1966,26 +2392,733 @@ class CloudSyncService:
             })
             return "error", processing_steps
 
-    def _sync_dropbox(self, connection: CloudSyncConnection,
-                      session, process_documents: bool) -> Dict:
-        """Synchronisiert Dropbox-Ordner"""
-        result = {
-            "files_found": 0,
-            "files_synced": 0,
-            "files_skipped": 0,
-            "files_error": 0,
-            "errors": [],
-            "synced_files": []
-        }
+    def _spool_dir(self) -> Path:
+        """Verzeichnis für laufende Downloads (neben dem lokalen Upload-Ordner)"""
+        spool_dir = Path("data/uploads") / str(self.user_id) / "cloud_sync" / ".spool"
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        return spool_dir
 
-        cursor = connection.last_cursor
-        has_more = True
+    def _spool_response(self, response: requests.Response, filename: str) -> Dict[str, Any]:
+        """
+        Schreibt einen gestreamten Response-Body blockweise in eine Spool-Datei.
 
-        while has_more:
-            response = self._dropbox_list_folder(
-                connection.access_token,
-                connection.remote_folder_path,
-                cursor
+        Der SHA-256 wird dabei mitberechnet, der Inhalt liegt also nie
+        vollständig im Speicher und muss für die Duplikatprüfung nicht
+        erneut gelesen werden.
+
+        Returns:
+            Dictionary mit path, size und sha256
+        """
+        import tempfile
+
+        sha = hashlib.sha256()
+        size = 0
+        fd, spool_path = tempfile.mkstemp(dir=self._spool_dir(), suffix=Path(filename).suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(chunk_size=SPOOL_CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        sha.update(chunk)
+                        size += len(chunk)
+        except Exception:
+            _discard_spool({"path": spool_path})
+            raise
+        finally:
+            response.close()
+
+        return {"path": spool_path, "size": size, "sha256": sha.hexdigest()}
+
+    def _download_remote_file(self, connection, file_info: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Lädt eine Datei beim jeweiligen Provider gestreamt in eine Spool-Datei.
+
+        Args:
+            connection: CloudSyncConnection oder CloudSyncConnectionWrapper
+            file_info: Dateieintrag aus der Scan-Phase
+
+        Returns:
+            Tuple von (Spool-Eintrag {path, size, sha256}, Fehlermeldung oder None).
+            Der Aufrufer übernimmt die Spool-Datei oder löscht sie mit _discard_spool.
+        """
+        provider = file_info.get("provider", "")
+        filename = file_info.get("name", "unknown")
+
+        if provider == "dropbox":
+            response = self._dropbox_open_download(connection.access_token, file_info.get("path"))
+        elif provider == "dropbox_public":
+            response = self._dropbox_public_open_download(
+                file_info.get("shared_link") or connection.remote_folder_path,
+                file_info.get("path")
+            )
+        elif provider == "google_drive_public":
+            logger.info(f"Starte öffentlichen Download für: {filename}")
+            response = self._google_public_open_download(file_info.get("id"))
+        else:
+            response = self._google_open_download(connection.access_token, file_info.get("id"))
+
+        if response is None:
+            logger.error(f"Download fehlgeschlagen für {filename}")
+            return None, f"Download fehlgeschlagen: {filename}"
+
+        spool = self._spool_response(response, filename)
+        if spool["size"] == 0:
+            _discard_spool(spool)
+            logger.error(f"Download fehlgeschlagen für {filename} (leer)")
+            return None, f"Download fehlgeschlagen: {filename}"
+
+        logger.info(f"Download erfolgreich: {spool['size']} Bytes")
+        return spool, None
+
+    def _create_sync_log(self, connection: CloudSyncConnection, file_info: Dict,
+                         doc: Optional[Document]) -> CloudSyncLog:
+        """Erstellt den Sync-Log-Eintrag für eine importierte Datei"""
+        modified_time = self._parse_remote_time(file_info.get("modified"))
+
+        return CloudSyncLog(
+            connection_id=connection.id,
+            user_id=self.user_id,
+            remote_file_path=file_info.get("path") or file_info.get("name"),
+            remote_file_id=file_info.get("id"),
+            remote_file_hash=file_info.get("hash"),
+            file_size=file_info.get("size"),
+            file_modified_at=modified_time,
+            document_id=doc.id if doc else None,
+            local_file_path=doc.file_path if doc else None,
+            sync_status="synced",
+            original_filename=file_info.get("name"),
+            mime_type=file_info.get("mime_type") or self._get_mime_type(file_info.get("name"))
+        )
+
+    # ==================== REMOTE-MANIFEST ====================
+
+    @staticmethod
+    def _parse_remote_time(value) -> Optional[datetime]:
+        """Wandelt Zeitangaben der Anbieter in naive UTC-Zeit um (wie in der DB gespeichert)"""
+        if not value:
+            return None
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=0)
+
+    @staticmethod
+    def _manifest_key(file_info: Dict) -> Optional[str]:
+        """Schlüssel einer Remote-Datei im Manifest (ID, sonst Pfad)"""
+        return file_info.get("id") or file_info.get("path")
+
+    def _load_manifest(self, session, connection: CloudSyncConnection) -> Dict[str, CloudSyncManifestEntry]:
+        """
+        Lädt das Manifest einer Verbindung in einer Abfrage.
+
+        Für Verbindungen, die vor Einführung des Manifests synchronisiert
+        wurden, wird es einmalig aus den Sync-Logs aufgebaut.
+        """
+        manifest = {
+            entry.remote_file_id: entry
+            for entry in session.query(CloudSyncManifestEntry).filter(
+                CloudSyncManifestEntry.connection_id == connection.id
+            )
+        }
+        if manifest:
+            return manifest
+
+        logs = session.query(CloudSyncLog).filter(
+            CloudSyncLog.connection_id == connection.id,
+            CloudSyncLog.sync_status == "synced"
+        ).order_by(CloudSyncLog.synced_at).all()
+
+        for log in logs:
+            key = log.remote_file_id or log.remote_file_path
+            if not key:
+                continue
+            entry = manifest.get(key)
+            if entry is None:
+                entry = CloudSyncManifestEntry(connection_id=connection.id, remote_file_id=key)
+                session.add(entry)
+                manifest[key] = entry
+            entry.remote_file_path = log.remote_file_path
+            entry.remote_hash = log.remote_file_hash
+            entry.remote_size = log.file_size
+            entry.remote_modified_at = self._parse_remote_time(log.file_modified_at)
+            entry.document_id = log.document_id
+            entry.synced_at = log.synced_at
+
+        if manifest:
+            logger.info(f"Manifest aus {len(logs)} Sync-Logs aufgebaut: {len(manifest)} Dateien")
+        return manifest
+
+    def _manifest_entry_unchanged(self, entry: CloudSyncManifestEntry, file_info: Dict) -> bool:
+        """
+        Vergleicht den gespeicherten Fingerabdruck mit dem aktuellen Listing.
+
+        Verglichen wird das stärkste Merkmal, das beide Seiten kennen
+        (Hash, dann Revision, dann Änderungszeit). Ohne jedes Merkmal
+        (z.B. gescrapte öffentliche Ordner) gilt eine bekannte Datei als
+        unverändert, sofern sich die Größe nicht geändert hat.
+        """
+        remote_hash = file_info.get("hash")
+        if remote_hash and entry.remote_hash:
+            return remote_hash == entry.remote_hash
+
+        remote_rev = file_info.get("rev")
+        if remote_rev and entry.remote_rev:
+            return remote_rev == entry.remote_rev
+
+        size = int(file_info.get("size") or 0)
+        if size and entry.remote_size and size != entry.remote_size:
+            return False
+
+        modified = self._parse_remote_time(file_info.get("modified"))
+        if modified and entry.remote_modified_at:
+            return modified == entry.remote_modified_at
+
+        return True
+
+    def _filter_unchanged_files(self, session, connection: CloudSyncConnection,
+                                files: List[Dict], full_listing: bool) -> Tuple[List[Dict], Dict[str, int]]:
+        """
+        Entfernt unveränderte Dateien aus dem Scan-Ergebnis, bevor etwas heruntergeladen wird.
+
+        Args:
+            files: Alle gelisteten Dateien der Scan-Phase
+            full_listing: True, wenn das Listing den ganzen Ordner umfasst
+                (nicht gelistete Einträge werden dann als gelöscht markiert)
+
+        Returns:
+            Tuple von (zu synchronisierende Dateien, Manifest-Statistik)
+        """
+        manifest = self._load_manifest(session, connection)
+        by_hash = {entry.remote_hash: entry for entry in manifest.values() if entry.remote_hash}
+        now = datetime.now()
+
+        stats = {
+            "files_listed": len(files),
+            "files_new": 0,
+            "files_changed": 0,
+            "files_unchanged": 0,
+            "files_removed": 0,
+            "bytes_saved": 0,
+            "requests_saved": 0
+        }
+        to_sync = []
+        seen_ids = []
+
+        for file_info in files:
+            key = self._manifest_key(file_info)
+            entry = manifest.get(key)
+
+            if entry is None:
+                twin = by_hash.get(file_info.get("hash")) if file_info.get("hash") else None
+                if twin is None:
+                    stats["files_new"] += 1
+                    to_sync.append(file_info)
+                    continue
+                # Gleicher Inhalt unter neuer ID (kopiert/verschoben): nur vermerken
+                entry = CloudSyncManifestEntry(
+                    connection_id=connection.id,
+                    remote_file_id=key,
+                    document_id=twin.document_id,
+                    first_seen_at=now,
+                    synced_at=now
+                )
+                self._set_manifest_fingerprint(entry, file_info)
+                session.add(entry)
+                manifest[key] = entry
+            elif not self._manifest_entry_unchanged(entry, file_info):
+                stats["files_changed"] += 1
+                to_sync.append(file_info)
+                continue
+            elif entry.id is not None:
+                seen_ids.append(entry.id)
+            else:
+                # Aus den Sync-Logs aufgebaut, noch nicht gespeichert
+                entry.last_seen_at = now
+
+            if entry.is_deleted:
+                entry.is_deleted = False
+            stats["files_unchanged"] += 1
+            stats["bytes_saved"] += int(file_info.get("size") or entry.remote_size or 0)
+            # Pro Datei mindestens eine Download-Anfrage
+            stats["requests_saved"] += 1
+
+        for i in range(0, len(seen_ids), 500):
+            session.query(CloudSyncManifestEntry).filter(
+                CloudSyncManifestEntry.id.in_(seen_ids[i:i + 500])
+            ).update({CloudSyncManifestEntry.last_seen_at: now}, synchronize_session=False)
+
+        if full_listing:
+            listed = {self._manifest_key(f) for f in files}
+            for key, entry in manifest.items():
+                if key not in listed and not entry.is_deleted:
+                    entry.is_deleted = True
+                    stats["files_removed"] += 1
+
+        session.commit()
+        logger.info(
+            f"Manifest: {stats['files_unchanged']} unverändert, {stats['files_new']} neu, "
+            f"{stats['files_changed']} geändert, {stats['files_removed']} entfernt "
+            f"({stats['bytes_saved']:,} Bytes gespart)"
+        )
+        return to_sync, stats
+
+    def _set_manifest_fingerprint(self, entry: CloudSyncManifestEntry, file_info: Dict):
+        """Übernimmt den Fingerabdruck aus einem Listing-Eintrag"""
+        entry.remote_file_path = file_info.get("path") or file_info.get("name")
+        entry.remote_hash = file_info.get("hash")
+        entry.remote_rev = file_info.get("rev")
+        entry.remote_size = int(file_info.get("size") or 0) or None
+        entry.remote_modified_at = self._parse_remote_time(file_info.get("modified"))
+        entry.last_seen_at = datetime.now()
+        entry.is_deleted = False
+
+    def _record_manifest_entry(self, session, connection: CloudSyncConnection,
+                               file_info: Dict, doc: Optional[Document]):
+        """Aktualisiert das Manifest nach einem Import (im selben Commit wie das Sync-Log)"""
+        key = self._manifest_key(file_info)
+        if not key:
+            return
+
+        entry = session.query(CloudSyncManifestEntry).filter(
+            CloudSyncManifestEntry.connection_id == connection.id,
+            CloudSyncManifestEntry.remote_file_id == key
+        ).first()
+        if entry is None:
+            entry = CloudSyncManifestEntry(connection_id=connection.id, remote_file_id=key)
+            session.add(entry)
+
+        self._set_manifest_fingerprint(entry, file_info)
+        entry.document_id = doc.id if doc else None
+        entry.synced_at = datetime.now()
+
+    # ==================== SYNC-PIPELINE ====================
+
+    def _sync_pipeline_config(self) -> Dict[str, int]:
+        """Liest Worker-Anzahlen und Batchgröße aus den Einstellungen"""
+        download_workers = SYNC_DOWNLOAD_WORKERS
+        process_workers = 0
+        commit_batch_size = SYNC_COMMIT_BATCH_SIZE
+
+        try:
+            from config.settings import get_settings
+            settings = get_settings()
+            download_workers = getattr(settings, 'cloud_sync_download_workers', 0) or download_workers
+            process_workers = getattr(settings, 'cloud_sync_process_workers', 0) or 0
+            commit_batch_size = getattr(settings, 'cloud_sync_commit_batch_size', 0) or commit_batch_size
+        except Exception:
+            # Ohne Streamlit-Session (z.B. Hintergrund-Sync) Standardwerte verwenden
+            pass
+
+        if process_workers <= 0:
+            # Die Seiten-OCR verteilt sich selbst auf Prozesse - hier nur wenige Threads
+            process_workers = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+        return {
+            "download_workers": max(1, download_workers),
+            "process_workers": max(1, process_workers),
+            "commit_batch_size": max(1, commit_batch_size)
+        }
+
+    def _pipeline_download(self, connection: 'CloudSyncConnectionWrapper', file_info: Dict) -> Dict[str, Any]:
+        """Download-Stufe der Pipeline (läuft im Download-Pool)"""
+        start = time.perf_counter()
+        try:
+            spool, error = self._download_remote_file(connection, file_info)
+        except Exception as e:
+            logger.error(f"Download-Fehler für {file_info.get('name')}: {e}")
+            spool, error = None, f"Download-Fehler: {str(e)}"
+
+        return {
+            "spool": spool,
+            "error": error,
+            "duplicate": False,
+            "bytes": spool["size"] if spool else 0,
+            "seconds": time.perf_counter() - start
+        }
+
+    def _pipeline_analyze(self, file_info: Dict, spool: Dict) -> Dict[str, Any]:
+        """Verarbeitungs-Stufe der Pipeline: OCR und Analyse (läuft im Verarbeitungs-Pool)"""
+        start = time.perf_counter()
+        filename = file_info.get("name", "unknown")
+        source_folder_path = file_info.get("source_folder") or file_info.get("path") or ""
+
+        try:
+            analysis = self._analyze_document_content(
+                spool["path"], self._get_mime_type(filename), source_folder_path, filename,
+                content_hash=spool["sha256"]
+            )
+        except Exception as e:
+            logger.error(f"Intelligente Verarbeitung fehlgeschlagen für {filename}: {e}")
+            analysis = {
+                "ocr_text": None,
+                "ocr_confidence": None,
+                "metadata": None,
+                "steps": [{"step": "processing_error", "detail": "⚠️ Verarbeitung teilweise fehlgeschlagen"}]
+            }
+
+        analysis["seconds"] = time.perf_counter() - start
+        return analysis
+
+    def _pipeline_write(self, session, connection: CloudSyncConnection, file_info: Dict,
+                        download: Dict, analysis: Optional[Dict], process_documents: bool,
+                        folder_cache: Dict[str, Optional[int]]) -> Tuple[str, List[Dict], Optional[Dict]]:
+        """
+        Schreib-Stufe der Pipeline: Datei speichern, Dokument und Sync-Log anlegen.
+
+        Wird ausschließlich vom Generator-Thread aufgerufen (einziger DB-Schreiber).
+        Committet nicht selbst - das übernimmt _commit_sync_batch.
+
+        Returns:
+            Tuple von (Status, Status-Updates, Batch-Eintrag oder None)
+        """
+        filename = file_info.get("name", "unknown")
+        processing_steps = [{"step": "downloading", "detail": f"📥 Lade herunter: {filename}"}]
+
+        if download["error"]:
+            processing_steps.append({"step": "error", "detail": f"❌ {download['error']}"})
+            return "error", processing_steps, None
+
+        spool = download["spool"]
+        processing_steps.append({
+            "step": "downloaded",
+            "detail": f"✅ Heruntergeladen: {download['bytes']:,} Bytes"
+        })
+        if analysis:
+            processing_steps.extend(analysis["steps"])
+
+        try:
+            entry = {
+                "file_info": file_info,
+                "analysis": analysis,
+                "file_path": None,
+                "file_size": download["bytes"],
+                "content_hash": spool["sha256"],
+                "duplicate": False
+            }
+
+            existing_doc, duplicate_steps = self._find_duplicate_document(
+                session, [file_info.get("hash"), entry["content_hash"]], filename
+            )
+            if existing_doc:
+                entry["duplicate"] = True
+                processing_steps.extend(duplicate_steps)
+            else:
+                processing_steps.append({"step": "saving", "detail": "💾 Speichere Datei lokal..."})
+                # Spool-Datei wird verschoben, nicht erneut gelesen
+                file_path, save_steps = self._store_file_content(filename, spool["path"])
+                processing_steps.extend(save_steps)
+                if not file_path:
+                    return "error", processing_steps, None
+                entry["file_path"] = file_path
+
+                # Zielordner vor dem Anlegen des Dokuments auflösen, damit die
+                # Ordner-Session nicht auf die Schreibsperre des Batches wartet
+                metadata = analysis.get("metadata") if analysis else None
+                if metadata and metadata.suggested_folder_path and metadata.suggested_folder_path not in folder_cache:
+                    from services.document_intelligence_service import DocumentIntelligenceService
+                    folder_cache[metadata.suggested_folder_path] = DocumentIntelligenceService(
+                        self.user_id
+                    ).create_folder_structure(metadata.suggested_folder_path)
+
+            processing_steps.extend(
+                self._pipeline_record(session, connection, entry, process_documents, folder_cache)
+            )
+        except Exception as e:
+            logger.error(f"Fehler beim Import von {filename}: {e}")
+            processing_steps.append({"step": "error", "detail": f"❌ Fehler: {str(e)}"})
+            return "error", processing_steps, None
+
+        processing_steps.append({"step": "completed", "detail": f"✅ Fertig: {filename}"})
+        return "synced", processing_steps, entry
+
+    def _pipeline_record(self, session, connection: CloudSyncConnection, entry: Dict,
+                         process_documents: bool, folder_cache: Dict[str, Optional[int]]) -> List[Dict]:
+        """Legt Dokument (bzw. verknüpft Duplikat) und Sync-Log in der Session an"""
+        file_info = entry["file_info"]
+        filename = file_info.get("name", "unknown")
+        processing_steps = []
+
+        if entry["duplicate"]:
+            doc, _ = self._find_duplicate_document(
+                session, [file_info.get("hash"), entry["content_hash"]], filename
+            )
+        else:
+            doc = self._create_document_record(
+                session, connection, filename, entry["file_path"],
+                file_info.get("size") or entry["file_size"],
+                entry["content_hash"], process_documents
+            )
+            if process_documents and entry["analysis"]:
+                processing_steps.extend(
+                    self._apply_document_analysis(doc, entry["analysis"], filename, folder_cache)
+                )
+
+        session.add(self._create_sync_log(connection, file_info, doc))
+        self._record_manifest_entry(session, connection, file_info, doc)
+        return processing_steps
+
+    def _commit_sync_batch(self, session, connection: CloudSyncConnection,
+                           batch: List[Dict], result: Dict, process_documents: bool,
+                           folder_cache: Dict[str, Optional[int]]):
+        """
+        Committet alle gepufferten Importe in einer Transaktion.
+
+        Schlägt der Batch-Commit fehl, werden die Einträge einzeln wiederholt,
+        damit ein fehlerhafter Datensatz nicht den ganzen Batch verwirft.
+        Der Fortschritt der Verbindung (Heartbeat der Sperre) wird mitgespeichert.
+        """
+        self._persist_sync_progress(connection, result)
+
+        try:
+            session.commit()
+            batch.clear()
+            return
+        except Exception as commit_err:
+            logger.error(f"Batch-Commit fehlgeschlagen ({len(batch)} Dateien): {commit_err}")
+            session.rollback()
+
+        for entry in batch:
+            filename = entry["file_info"].get("name")
+            try:
+                self._pipeline_record(session, connection, entry, process_documents, folder_cache)
+                self._persist_sync_progress(connection, result)
+                session.commit()
+            except Exception as e:
+                logger.error(f"Commit Fehler für {filename}: {e}")
+                session.rollback()
+                result["files_synced"] -= 1
+                result["files_error"] += 1
+                if filename in result["synced_files"]:
+                    result["synced_files"].remove(filename)
+                result["errors"].append(f"{filename}: Commit fehlgeschlagen")
+        batch.clear()
+
+    def _existing_content_hashes(self, session, files: List[Dict]) -> set:
+        """Lädt in einer Abfrage, welche Remote-Hashes bereits als Dokument existieren"""
+        hashes = list({f.get("hash") for f in files if f.get("hash")})
+        known = set()
+        for i in range(0, len(hashes), 500):
+            rows = session.query(Document.content_hash).filter(
+                Document.user_id == self.user_id,
+                Document.content_hash.in_(hashes[i:i + 500])
+            ).all()
+            known.update(row[0] for row in rows)
+        return known
+
+    @staticmethod
+    def _summarize_stage_stats(stage_stats: Dict[str, Dict], wall_seconds: float) -> Dict[str, Dict]:
+        """Berechnet Durchsatz pro Pipeline-Stufe"""
+        summary = {}
+        for stage, stats in stage_stats.items():
+            summary[stage] = {
+                "items": stats["items"],
+                "busy_seconds": round(stats["busy_seconds"], 2),
+                "items_per_second": round(stats["items"] / wall_seconds, 2) if wall_seconds > 0 else 0.0
+            }
+            if stats.get("duplicates"):
+                summary[stage]["duplicates"] = stats["duplicates"]
+            if stats["bytes"]:
+                summary[stage]["bytes"] = stats["bytes"]
+                summary[stage]["mb_per_second"] = (
+                    round(stats["bytes"] / (1024 * 1024) / wall_seconds, 2) if wall_seconds > 0 else 0.0
+                )
+        return summary
+
+    def _run_sync_pipeline(self, connection: CloudSyncConnection, session,
+                           files_to_sync: List[Dict], process_documents: bool,
+                           result: Dict, start_time: float):
+        """
+        Lädt, verarbeitet und importiert Dateien als dreistufige Pipeline (Generator).
+
+        - Download: begrenzter Thread-Pool, HTTP-Verbindungen pro Thread gepoolt
+        - Verarbeitung: eigener Pool für OCR und Dokumentenanalyse
+        - Schreiben: dieser Generator als einziger DB-Schreiber, Commits in Batches
+
+        Aktualisiert ``result`` und liefert nach jeder fertigen Datei
+        Fortschritts-Kopien im Format von sync_connection_with_progress.
+        """
+        config = self._sync_pipeline_config()
+        conn_info = CloudSyncConnectionWrapper(connection)
+        script_ctx = _get_script_context()
+        files_total = len(files_to_sync)
+        pipeline_start = time.perf_counter()
+
+        stage_stats = {
+            stage: {"items": 0, "bytes": 0, "busy_seconds": 0.0, "duplicates": 0}
+            for stage in ("download", "processing", "writing")
+        }
+
+        # Bereits vorhandene Inhalte brauchen keine OCR
+        known_hashes = self._existing_content_hashes(session, files_to_sync)
+
+        pending = deque(files_to_sync)
+        downloads = {}
+        processing = {}
+        # Begrenzt Dateien im Speicher (heruntergeladen, noch nicht geschrieben)
+        max_in_flight = config["download_workers"] + 2 * config["process_workers"]
+        batch = []
+        folder_cache = {}
+        completed = 0
+        last_commit = time.monotonic()
+
+        def commit_batch():
+            nonlocal last_commit
+            self._commit_sync_batch(session, connection, batch, result,
+                                    process_documents, folder_cache)
+            last_commit = time.monotonic()
+
+        download_pool = ThreadPoolExecutor(
+            max_workers=config["download_workers"], thread_name_prefix="sync-download",
+            initializer=_attach_script_context, initargs=(script_ctx,)
+        )
+        process_pool = ThreadPoolExecutor(
+            max_workers=config["process_workers"], thread_name_prefix="sync-process",
+            initializer=_attach_script_context, initargs=(script_ctx,)
+        )
+
+        try:
+            while pending or downloads or processing:
+                while pending and len(downloads) + len(processing) < max_in_flight:
+                    file_info = pending.popleft()
+                    future = download_pool.submit(self._pipeline_download, conn_info, file_info)
+                    downloads[future] = file_info
+
+                # Mit Timeout, damit der Heartbeat auch bei langer OCR weiterläuft
+                done, _ = wait(set(downloads) | set(processing),
+                               timeout=SYNC_PROGRESS_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future in downloads:
+                        file_info = downloads.pop(future)
+                        download = future.result()
+                        stage_stats["download"]["items"] += 1
+                        stage_stats["download"]["bytes"] += download["bytes"]
+                        stage_stats["download"]["busy_seconds"] += download["seconds"]
+
+                        # Duplikate am gestreamten SHA-256 erkennen, bevor der
+                        # Inhalt verarbeitet oder gespeichert wird
+                        spool = download["spool"]
+                        if spool and (file_info.get("hash") in known_hashes or
+                                      self._content_hash_exists(session, spool["sha256"])):
+                            download["duplicate"] = True
+                            stage_stats["download"]["duplicates"] += 1
+                            _discard_spool(spool)
+
+                        needs_analysis = (
+                            process_documents and
+                            spool is not None and
+                            not download["duplicate"]
+                        )
+                        if needs_analysis:
+                            analysis_future = process_pool.submit(
+                                self._pipeline_analyze, file_info, spool
+                            )
+                            processing[analysis_future] = (file_info, download)
+                            continue
+                        analysis = None
+                    else:
+                        file_info, download = processing.pop(future)
+                        analysis = future.result()
+                        stage_stats["processing"]["items"] += 1
+                        stage_stats["processing"]["busy_seconds"] += analysis["seconds"]
+
+                    # Neuer Zielordner: vorher committen, damit die Ordner-Session
+                    # nicht auf die Schreibsperre des offenen Batches wartet
+                    metadata = analysis.get("metadata") if analysis else None
+                    if batch and metadata and metadata.suggested_folder_path \
+                            and metadata.suggested_folder_path not in folder_cache:
+                        commit_batch()
+
+                    write_start = time.perf_counter()
+                    sync_status, processing_steps, entry = self._pipeline_write(
+                        session, connection, file_info, download, analysis,
+                        process_documents, folder_cache
+                    )
+                    # Nicht übernommene Spool-Datei (Duplikat, Fehler) entfernen
+                    _discard_spool(download["spool"])
+
+                    completed += 1
+                    if sync_status == "synced":
+                        result["files_synced"] += 1
+                        result["synced_files"].append(file_info.get("name"))
+                        batch.append(entry)
+                        if len(batch) >= config["commit_batch_size"]:
+                            commit_batch()
+                    else:
+                        result["files_error"] += 1
+                        error_detail = "Unbekannter Fehler"
+                        for step in reversed(processing_steps):
+                            if step.get("step") == "error" or "❌" in step.get("detail", ""):
+                                error_detail = step.get("detail", error_detail)
+                                break
+                        result["errors"].append(f"{file_info.get('name')}: {error_detail}")
+
+                    stage_stats["writing"]["items"] += 1
+                    stage_stats["writing"]["busy_seconds"] += time.perf_counter() - write_start
+
+                    # Fortschritt
+                    elapsed = time.time() - start_time
+                    result["elapsed_seconds"] = elapsed
+                    result["current_file"] = file_info.get("name", "Unbekannt")
+                    result["current_file_size"] = file_info.get("size", 0)
+                    result["source_folder"] = file_info.get("source_folder", "")
+                    result["files_processed"] = completed
+                    result["files_in_flight"] = len(downloads) + len(processing)
+                    result["progress_percent"] = int((completed / files_total) * 100)
+                    result["estimated_remaining_seconds"] = elapsed / completed * (files_total - completed)
+                    result["stage_stats"] = self._summarize_stage_stats(
+                        stage_stats, time.perf_counter() - pipeline_start
+                    )
+
+                    for step in processing_steps:
+                        result["current_step"] = step.get("step", "processing")
+                        result["current_step_detail"] = step.get("detail", "")
+                        yield result.copy()
+
+                # Spätestens alle SYNC_PROGRESS_INTERVAL_SECONDS committen (Fortschritt/Heartbeat)
+                if time.monotonic() - last_commit >= SYNC_PROGRESS_INTERVAL_SECONDS:
+                    commit_batch()
+
+            commit_batch()
+        finally:
+            download_pool.shutdown(wait=True, cancel_futures=True)
+            process_pool.shutdown(wait=True, cancel_futures=True)
+            # Spool-Dateien abgebrochener Läufe (z.B. Generator geschlossen) aufräumen
+            for future in downloads:
+                if future.done() and not future.cancelled():
+                    _discard_spool(future.result()["spool"])
+            for _, download in processing.values():
+                _discard_spool(download["spool"])
+
+        result["stage_stats"] = self._summarize_stage_stats(
+            stage_stats, time.perf_counter() - pipeline_start
+        )
+        logger.info(f"Sync-Pipeline abgeschlossen: {result['stage_stats']}")
+
+    def _sync_dropbox(self, connection: CloudSyncConnection,
+                      session, process_documents: bool) -> Dict:
+        """Synchronisiert Dropbox-Ordner"""
+        result = {
+            "files_found": 0,
+            "files_synced": 0,
+            "files_skipped": 0,
+            "files_error": 0,
+            "errors": [],
+            "synced_files": []
+        }
+
+        cursor = connection.last_cursor
+        has_more = True
+
+        while has_more:
+            response = self._dropbox_list_folder(
+                connection.access_token,
+                connection.remote_folder_path,
+                cursor
             )
 
             if "error" in response:
@@ -2260,7 +3393,7 @@ class CloudSyncService:
         # Intelligente Dokumentenverarbeitung wenn aktiviert
         if process_documents:
             try:
-                self._process_document_intelligent(
+                self._process_document_intelligent_with_status(
                     session, doc, content, remote_path, filename
                 )
             except Exception as e:
@@ -2270,36 +3403,113 @@ class CloudSyncService:
         return doc
 
     def _import_file_with_status(self, session, connection: CloudSyncConnection,
-                                  filename: str, content: bytes, file_size: int,
+                                  filename: str, content: Union[bytes, str], file_size: int,
                                   content_hash: str, remote_path: str,
-                                  process_documents: bool) -> Tuple[Optional[Document], List[Dict]]:
+                                  process_documents: bool,
+                                  remote_hash: Optional[str] = None) -> Tuple[Optional[Document], List[Dict]]:
         """
         Importiert eine Datei mit Status-Updates für die Fortschrittsanzeige.
         Verwendet StorageService für Cloud-Speicher wenn verfügbar.
 
+        Args:
+            content: Dateiinhalt als Bytes oder Pfad einer Spool-Datei
+                (wird beim Speichern verschoben)
+            content_hash: SHA-256 des Inhalts
+            remote_hash: Hash des Providers (für ältere Importe ohne SHA-256)
+
         Returns:
             Tuple von (Document, Liste von Status-Updates)
         """
-        processing_steps = []
-
         # Duplikat-Prüfung: Existiert bereits ein Dokument mit gleichem Inhalt?
-        if content_hash:
-            existing_doc = session.query(Document).filter(
-                Document.user_id == self.user_id,
-                Document.content_hash == content_hash
-            ).first()
+        existing_doc, processing_steps = self._find_duplicate_document(
+            session, [content_hash, remote_hash], filename
+        )
+        if existing_doc:
+            return existing_doc, processing_steps
 
-            if existing_doc:
-                logger.info(f"Duplikat übersprungen: {filename} (Hash: {content_hash[:16]}...)")
+        # Analyse vor dem Speichern - eine Spool-Datei wird dabei verschoben
+        analysis = None
+        if process_documents:
+            try:
+                analysis = self._analyze_document_content(
+                    content, self._get_mime_type(filename), remote_path, filename,
+                    content_hash=content_hash
+                )
+            except Exception as e:
+                logger.error(f"Intelligente Verarbeitung fehlgeschlagen für {filename}: {e}")
                 processing_steps.append({
-                    "step": "skipped",
-                    "detail": f"⏭️ Übersprungen - Dokument bereits vorhanden als '{existing_doc.title or existing_doc.filename}'"
+                    "step": "processing_error",
+                    "detail": "⚠️ Verarbeitung teilweise fehlgeschlagen"
                 })
-                # Dokument als COMPLETED markieren falls PENDING
-                if existing_doc.status == DocumentStatus.PENDING:
-                    existing_doc.status = DocumentStatus.COMPLETED
-                return existing_doc, processing_steps
 
+        file_path, save_steps = self._store_file_content(filename, content)
+        if not file_path:
+            return None, save_steps
+        processing_steps.extend(save_steps)
+
+        doc = self._create_document_record(
+            session, connection, filename, file_path, file_size, content_hash, process_documents
+        )
+
+        # Intelligente Dokumentenverarbeitung wenn aktiviert
+        if analysis:
+            processing_steps.extend(analysis["steps"])
+            try:
+                processing_steps.extend(self._apply_document_analysis(doc, analysis, filename))
+            except Exception as e:
+                logger.error(f"Intelligente Verarbeitung fehlgeschlagen für {filename}: {e}")
+                processing_steps.append({
+                    "step": "processing_error",
+                    "detail": "⚠️ Verarbeitung teilweise fehlgeschlagen"
+                })
+
+        return doc, processing_steps
+
+    def _find_duplicate_document(self, session, content_hashes: List[Optional[str]],
+                                 filename: str) -> Tuple[Optional[Document], List[Dict]]:
+        """Sucht ein vorhandenes Dokument mit einem der Inhalts-Hashes (SHA-256 oder Provider-Hash)"""
+        processing_steps = []
+        hashes = [h for h in content_hashes if h]
+        if not hashes:
+            return None, processing_steps
+
+        existing_doc = session.query(Document).filter(
+            Document.user_id == self.user_id,
+            Document.content_hash.in_(hashes)
+        ).first()
+
+        if existing_doc:
+            logger.info(f"Duplikat übersprungen: {filename} (Hash: {existing_doc.content_hash[:16]}...)")
+            processing_steps.append({
+                "step": "skipped",
+                "detail": f"⏭️ Übersprungen - Dokument bereits vorhanden als '{existing_doc.title or existing_doc.filename}'"
+            })
+            # Dokument als COMPLETED markieren falls PENDING
+            if existing_doc.status == DocumentStatus.PENDING:
+                existing_doc.status = DocumentStatus.COMPLETED
+
+        return existing_doc, processing_steps
+
+    def _content_hash_exists(self, session, content_hash: Optional[str]) -> bool:
+        """Prüft ohne Laden des Dokuments, ob ein Inhalt bereits importiert wurde"""
+        if not content_hash:
+            return False
+        return session.query(Document.id).filter(
+            Document.user_id == self.user_id,
+            Document.content_hash == content_hash
+        ).first() is not None
+
+    def _store_file_content(self, filename: str, content: Union[bytes, str]) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Speichert den Dateiinhalt über den StorageService (Cloud oder lokal).
+
+        Args:
+            filename: Originaler Dateiname
+            content: Bytes oder Pfad einer Spool-Datei (wird verschoben, nicht kopiert)
+
+        Returns:
+            Tuple von (Dateipfad oder None bei Fehler, Liste von Status-Updates)
+        """
         # Verwende Storage Service für hybride Speicherung
         try:
             from services.storage_service import get_storage_service
@@ -2310,46 +3520,53 @@ class CloudSyncService:
         # Eindeutigen Dateinamen erstellen
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         safe_filename = f"{timestamp}_{filename}"
+        is_spool = isinstance(content, (str, os.PathLike))
 
         # Datei speichern (Cloud oder Lokal)
         if storage:
-            success, file_path = storage.upload_file(
-                file_data=content,
-                filename=safe_filename,
-                user_id=self.user_id,
-                subfolder="cloud_sync",
-                content_type=self._get_mime_type(filename)
-            )
-
-            if success:
-                if file_path.startswith("cloud://"):
-                    processing_steps.append({
-                        "step": "saved",
-                        "detail": f"☁️ Datei in Cloud gespeichert"
-                    })
-                else:
-                    processing_steps.append({
-                        "step": "saved",
-                        "detail": f"💾 Datei lokal gespeichert"
-                    })
+            if is_spool:
+                success, file_path = storage.store_local_file(
+                    source_path=content,
+                    filename=safe_filename,
+                    user_id=self.user_id,
+                    subfolder="cloud_sync",
+                    content_type=self._get_mime_type(filename)
+                )
             else:
+                success, file_path = storage.upload_file(
+                    file_data=content,
+                    filename=safe_filename,
+                    user_id=self.user_id,
+                    subfolder="cloud_sync",
+                    content_type=self._get_mime_type(filename)
+                )
+
+            if not success:
                 logger.error(f"Speichern fehlgeschlagen: {file_path}")
-                return None, [{"step": "error", "detail": f"❌ Speichern fehlgeschlagen"}]
-        else:
-            # Fallback: Direkt lokal speichern
-            upload_dir = Path("data/uploads") / str(self.user_id) / "cloud_sync"
-            upload_dir.mkdir(parents=True, exist_ok=True)
-            file_path = str(upload_dir / safe_filename)
+                return None, [{"step": "error", "detail": "❌ Speichern fehlgeschlagen"}]
 
+            if file_path.startswith("cloud://"):
+                return file_path, [{"step": "saved", "detail": "☁️ Datei in Cloud gespeichert"}]
+            return file_path, [{"step": "saved", "detail": "💾 Datei lokal gespeichert"}]
+
+        # Fallback: Direkt lokal speichern
+        upload_dir = Path("data/uploads") / str(self.user_id) / "cloud_sync"
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        file_path = str(upload_dir / safe_filename)
+
+        if is_spool:
+            os.replace(content, file_path)
+        else:
             with open(file_path, "wb") as f:
                 f.write(content)
 
-            processing_steps.append({
-                "step": "saved",
-                "detail": f"💾 Datei lokal gespeichert"
-            })
+        return file_path, [{"step": "saved", "detail": "💾 Datei lokal gespeichert"}]
 
-        # Dokument in DB erstellen
+    def _create_document_record(self, session, connection: CloudSyncConnection,
+                                filename: str, file_path: str, file_size: int,
+                                content_hash: Optional[str],
+                                process_documents: bool) -> Document:
+        """Legt den Dokument-Datensatz für eine importierte Datei an (mit flush)"""
         # is_encrypted=False: Cloud-importierte Dateien werden nicht verschlüsselt
         doc = Document(
             user_id=self.user_id,
@@ -2368,22 +3585,7 @@ class CloudSyncService:
 
         session.add(doc)
         session.flush()
-
-        # Intelligente Dokumentenverarbeitung wenn aktiviert
-        if process_documents:
-            try:
-                intelligent_steps = self._process_document_intelligent_with_status(
-                    session, doc, content, remote_path, filename
-                )
-                processing_steps.extend(intelligent_steps)
-            except Exception as e:
-                logger.error(f"Intelligente Verarbeitung fehlgeschlagen für {filename}: {e}")
-                processing_steps.append({
-                    "step": "processing_error",
-                    "detail": f"⚠️ Verarbeitung teilweise fehlgeschlagen"
-                })
-
-        return doc, processing_steps
+        return doc
 
     def _process_document_intelligent_with_status(self, session, doc: Document,
                                                    content: bytes, remote_path: str,
@@ -2395,66 +3597,98 @@ class CloudSyncService:
         Returns:
             Liste von Status-Updates für Fortschrittsanzeige
         """
+        analysis = self._analyze_document_content(
+            content, doc.mime_type or self._get_mime_type(filename), remote_path, filename
+        )
+        return analysis["steps"] + self._apply_document_analysis(doc, analysis, filename)
+
+    def _analyze_document_content(self, content: Union[bytes, str], mime_type: str,
+                                  remote_path: str, filename: str,
+                                  content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        OCR und Dokumentenanalyse ohne Datenbankzugriff.
+
+        Läuft in der Sync-Pipeline im Verarbeitungs-Pool; das Ergebnis wird
+        anschließend vom DB-Schreiber mit _apply_document_analysis übernommen.
+
+        Args:
+            content: Dateiinhalt als Bytes oder Dateipfad (PDFs werden dann
+                seitenweise von der Festplatte gelesen)
+            content_hash: SHA-256 des Inhalts (wird sonst blockweise berechnet)
+
+        Returns:
+            Dictionary mit ocr_text, ocr_confidence (None = nicht setzen),
+            metadata (DocumentMetadata oder None) und steps
+        """
         processing_steps = []
+        analysis = {
+            "ocr_text": None,
+            "ocr_confidence": None,
+            "metadata": None,
+            "steps": processing_steps
+        }
         ocr_text = ""
 
-        # Cache Service für OCR-Ergebnisse
+        if not content_hash:
+            from utils.pdf_utils import hash_pdf_source
+            content_hash = hash_pdf_source(content)
+
+        # Cache Service für OCR-Ergebnisse (Schlüssel wie cache._hash_content)
         try:
             from services.cache_service import get_cache_service
             cache = get_cache_service()
-            content_hash = cache._hash_content(content)
+            cache_key = content_hash[:16]
         except ImportError:
             cache = None
-            content_hash = None
+            cache_key = None
 
         # 1. OCR durchführen (mit Cache-Prüfung)
         processing_steps.append({
             "step": "ocr_starting",
-            "detail": f"🔍 Starte Texterkennung (OCR)..."
+            "detail": "🔍 Starte Texterkennung (OCR)..."
         })
 
         # Prüfe Cache für OCR-Ergebnis
         cached_ocr = None
-        if cache and content_hash:
-            cached_ocr = cache.get_ocr_result(content_hash)
+        if cache and cache_key:
+            cached_ocr = cache.get_ocr_result(cache_key)
             if cached_ocr:
                 processing_steps.append({
                     "step": "ocr_cached",
-                    "detail": f"⚡ OCR aus Cache geladen"
+                    "detail": "⚡ OCR aus Cache geladen"
                 })
                 ocr_text = cached_ocr
-                doc.ocr_text = ocr_text
-                doc.ocr_confidence = 0.95  # Hohe Konfidenz für Cache
+                analysis["ocr_text"] = ocr_text
+                analysis["ocr_confidence"] = 0.95  # Hohe Konfidenz für Cache
 
         if not cached_ocr:
             try:
                 from services.ocr import OCRService
-                from PIL import Image
-                import io
                 ocr_service = OCRService()
 
-                mime_type = doc.mime_type or self._get_mime_type(filename)
-
                 if mime_type == "application/pdf":
                     processing_steps.append({
                         "step": "ocr_pdf",
-                        "detail": f"📄 Verarbeite PDF mit OCR..."
+                        "detail": "📄 Verarbeite PDF mit OCR..."
                     })
-                    # extract_text_from_pdf erwartet bytes und gibt List[Tuple[str, float]] zurück
-                    ocr_results = ocr_service.extract_text_from_pdf(content)
+                    # Seitenweise Extraktion: Pfade werden direkt von MuPDF gelesen
+                    ocr_results = [
+                        (text, conf) for _, text, conf in
+                        ocr_service.iter_text_from_pdf(content, content_hash=content_hash)
+                    ]
                     if ocr_results:
                         # Texte aller Seiten zusammenfügen
                         ocr_text = "\n\n".join([text for text, conf in ocr_results if text])
                         avg_confidence = sum([conf for text, conf in ocr_results]) / len(ocr_results) if ocr_results else 0
-                        doc.ocr_text = ocr_text
-                        doc.ocr_confidence = avg_confidence
+                        analysis["ocr_text"] = ocr_text
+                        analysis["ocr_confidence"] = avg_confidence
                     else:
                         ocr_text = ""
-                        doc.ocr_confidence = 0
+                        analysis["ocr_confidence"] = 0
 
                     # Cache OCR-Ergebnis
-                    if cache and content_hash and ocr_text:
-                        cache.set_ocr_result(content_hash, ocr_text)
+                    if cache and cache_key and ocr_text:
+                        cache.set_ocr_result(cache_key, ocr_text)
 
                     text_length = len(ocr_text)
                     processing_steps.append({
@@ -2465,17 +3699,22 @@ class CloudSyncService:
                 elif mime_type.startswith("image/"):
                     processing_steps.append({
                         "step": "ocr_image",
-                        "detail": f"🖼️ Verarbeite Bild mit OCR..."
+                        "detail": "🖼️ Verarbeite Bild mit OCR..."
                     })
-                    # Bild aus Bytes laden
-                    image = Image.open(io.BytesIO(content))
-                    ocr_text, confidence = ocr_service.extract_text_from_image(image)
-                    doc.ocr_text = ocr_text
-                    doc.ocr_confidence = confidence
+                    if isinstance(content, (str, os.PathLike)):
+                        with open(content, "rb") as f:
+                            image_bytes = f.read()
+                    else:
+                        image_bytes = content
+                    ocr_text, confidence = ocr_service.extract_text_from_image_bytes(
+                        image_bytes, content_hash=content_hash
+                    )
+                    analysis["ocr_text"] = ocr_text
+                    analysis["ocr_confidence"] = confidence
 
                     # Cache OCR-Ergebnis
-                    if cache and content_hash and ocr_text:
-                        cache.set_ocr_result(content_hash, ocr_text)
+                    if cache and cache_key and ocr_text:
+                        cache.set_ocr_result(cache_key, ocr_text)
 
                     text_length = len(ocr_text)
                     processing_steps.append({
@@ -2485,14 +3724,14 @@ class CloudSyncService:
                 else:
                     processing_steps.append({
                         "step": "ocr_skipped",
-                        "detail": f"⏭️ OCR übersprungen (kein PDF/Bild)"
+                        "detail": "⏭️ OCR übersprungen (kein PDF/Bild)"
                     })
 
             except ImportError:
                 logger.warning("OCR Service nicht verfügbar")
                 processing_steps.append({
                     "step": "ocr_unavailable",
-                    "detail": f"⚠️ OCR Service nicht verfügbar"
+                    "detail": "⚠️ OCR Service nicht verfügbar"
                 })
             except Exception as e:
                 logger.error(f"OCR fehlgeschlagen: {e}")
@@ -2505,7 +3744,7 @@ class CloudSyncService:
         if ocr_text and len(ocr_text) > 50:
             processing_steps.append({
                 "step": "analyzing",
-                "detail": f"🧠 Analysiere Dokumentinhalt..."
+                "detail": "🧠 Analysiere Dokumentinhalt..."
             })
 
             try:
@@ -2518,7 +3757,7 @@ class CloudSyncService:
                     ai_service = AIService()
                     processing_steps.append({
                         "step": "ai_loaded",
-                        "detail": f"🤖 KI-Service geladen"
+                        "detail": "🤖 KI-Service geladen"
                     })
                 except:
                     pass
@@ -2530,7 +3769,7 @@ class CloudSyncService:
                 # Analysiere Dokument
                 processing_steps.append({
                     "step": "extracting_metadata",
-                    "detail": f"📋 Extrahiere Metadaten..."
+                    "detail": "📋 Extrahiere Metadaten..."
                 })
 
                 metadata = intel_service.analyze_document(
@@ -2538,6 +3777,7 @@ class CloudSyncService:
                     source_folder_path=remote_path,
                     filename=filename
                 )
+                analysis["metadata"] = metadata
 
                 # Status-Update für gefundene Metadaten
                 found_items = []
@@ -2556,93 +3796,144 @@ class CloudSyncService:
                         "detail": f"✅ Gefunden: {', '.join(found_items[:3])}"
                     })
 
-                # Aktualisiere Dokument mit extrahierten Metadaten
-                if metadata.sender:
-                    doc.sender = metadata.sender
+            except ImportError:
+                logger.warning("Document Intelligence Service nicht verfügbar")
+                processing_steps.append({
+                    "step": "intel_unavailable",
+                    "detail": "⚠️ Dokumenten-Intelligenz nicht verfügbar"
+                })
+            except Exception as e:
+                logger.error(f"Dokumenten-Intelligenz fehlgeschlagen: {e}")
+                processing_steps.append({
+                    "step": "intel_error",
+                    "detail": f"⚠️ Analysefehler: {str(e)[:40]}"
+                })
+        else:
+            processing_steps.append({
+                "step": "analysis_skipped",
+                "detail": "⏭️ Analyse übersprungen (zu wenig Text)"
+            })
 
-                if metadata.document_date:
-                    doc.document_date = metadata.document_date
+        return analysis
 
-                if metadata.insurance_number:
-                    doc.insurance_number = metadata.insurance_number
+    def _apply_document_analysis(self, doc: Document, analysis: Dict[str, Any],
+                                 filename: str,
+                                 folder_cache: Optional[Dict[str, Optional[int]]] = None) -> List[Dict]:
+        """
+        Überträgt OCR-Text und Metadaten auf das Dokument und ordnet es ein.
 
-                if metadata.contract_number:
-                    doc.contract_number = metadata.contract_number
+        Args:
+            doc: Dokument (an die Session des Aufrufers gebunden)
+            analysis: Ergebnis von _analyze_document_content
+            filename: Originaler Dateiname (für Logs)
+            folder_cache: Optionaler Cache Ordnerpfad -> Ordner-ID (pro Sync-Lauf)
 
-                if metadata.customer_number:
-                    doc.customer_number = metadata.customer_number
+        Returns:
+            Liste von Status-Updates für Fortschrittsanzeige
+        """
+        processing_steps = []
 
-                if metadata.amount:
-                    doc.invoice_amount = metadata.amount
+        if analysis.get("ocr_text") is not None:
+            doc.ocr_text = analysis["ocr_text"]
+        if analysis.get("ocr_confidence") is not None:
+            doc.ocr_confidence = analysis["ocr_confidence"]
 
-                if metadata.document_type:
-                    doc.category = metadata.document_type.capitalize()
+        metadata = analysis.get("metadata")
+        if metadata is None:
+            return processing_steps
 
-                # 3. Erstelle Ordnerstruktur und verschiebe Dokument
-                if metadata.suggested_folder_path:
-                    processing_steps.append({
-                        "step": "creating_folder",
-                        "detail": f"📁 Erstelle Ordner: {metadata.suggested_folder_path}"
-                    })
+        try:
+            from services.document_intelligence_service import DocumentIntelligenceService
 
+            # Aktualisiere Dokument mit extrahierten Metadaten
+            if metadata.sender:
+                doc.sender = metadata.sender
+
+            if metadata.document_date:
+                doc.document_date = metadata.document_date
+
+            if metadata.insurance_number:
+                doc.insurance_number = metadata.insurance_number
+
+            if metadata.contract_number:
+                doc.contract_number = metadata.contract_number
+
+            if metadata.customer_number:
+                doc.customer_number = metadata.customer_number
+
+            if metadata.amount:
+                doc.invoice_amount = metadata.amount
+
+            if metadata.document_type:
+                doc.category = metadata.document_type.capitalize()
+
+            # 3. Erstelle Ordnerstruktur und verschiebe Dokument
+            if metadata.suggested_folder_path:
+                processing_steps.append({
+                    "step": "creating_folder",
+                    "detail": f"📁 Erstelle Ordner: {metadata.suggested_folder_path}"
+                })
+
+                if folder_cache is not None and metadata.suggested_folder_path in folder_cache:
+                    folder_id = folder_cache[metadata.suggested_folder_path]
+                else:
+                    intel_service = DocumentIntelligenceService(self.user_id)
                     folder_id = intel_service.create_folder_structure(
                         metadata.suggested_folder_path
                     )
-                    if folder_id:
-                        doc.folder_id = folder_id
-                        logger.info(f"Dokument {filename} in Ordner {metadata.suggested_folder_path} verschoben")
-                        processing_steps.append({
-                            "step": "folder_assigned",
-                            "detail": f"✅ In Ordner eingeordnet"
-                        })
-
-                # 4. Generiere besseren Titel
-                title_parts = []
-                if metadata.document_date:
-                    title_parts.append(metadata.document_date.strftime("%Y-%m-%d"))
-                if metadata.sender:
-                    title_parts.append(metadata.sender)
-                if metadata.document_type:
-                    type_names = {
-                        "versicherung": "Versicherung",
-                        "vertrag": "Vertrag",
-                        "rechnung": "Rechnung",
-                        "abonnement": "Abo"
-                    }
-                    title_parts.append(type_names.get(metadata.document_type, ""))
-                if metadata.insurance_number:
-                    title_parts.append(metadata.insurance_number)
+                    if folder_cache is not None and folder_id:
+                        folder_cache[metadata.suggested_folder_path] = folder_id
 
-                if title_parts:
-                    doc.title = " - ".join([p for p in title_parts if p])
+                if folder_id:
+                    doc.folder_id = folder_id
+                    logger.info(f"Dokument {filename} in Ordner {metadata.suggested_folder_path} verschoben")
                     processing_steps.append({
-                        "step": "title_generated",
-                        "detail": f"📝 Titel: {doc.title[:40]}..."
+                        "step": "folder_assigned",
+                        "detail": "✅ In Ordner eingeordnet"
                     })
 
-                doc.status = DocumentStatus.COMPLETED
+            # 4. Generiere besseren Titel
+            title_parts = []
+            if metadata.document_date:
+                title_parts.append(metadata.document_date.strftime("%Y-%m-%d"))
+            if metadata.sender:
+                title_parts.append(metadata.sender)
+            if metadata.document_type:
+                type_names = {
+                    "versicherung": "Versicherung",
+                    "vertrag": "Vertrag",
+                    "rechnung": "Rechnung",
+                    "abonnement": "Abo"
+                }
+                title_parts.append(type_names.get(metadata.document_type, ""))
+            if metadata.insurance_number:
+                title_parts.append(metadata.insurance_number)
 
+            if title_parts:
+                doc.title = " - ".join([p for p in title_parts if p])
                 processing_steps.append({
-                    "step": "analysis_complete",
-                    "detail": f"✅ Intelligente Analyse abgeschlossen"
+                    "step": "title_generated",
+                    "detail": f"📝 Titel: {doc.title[:40]}..."
                 })
 
-            except ImportError:
-                logger.warning("Document Intelligence Service nicht verfügbar")
-                processing_steps.append({
-                    "step": "intel_unavailable",
-                    "detail": f"⚠️ Dokumenten-Intelligenz nicht verfügbar"
-                })
-            except Exception as e:
-                logger.error(f"Dokumenten-Intelligenz fehlgeschlagen: {e}")
-                processing_steps.append({
-                    "step": "intel_error",
-                    "detail": f"⚠️ Analysefehler: {str(e)[:40]}"
-                })
-        else:
+            doc.status = DocumentStatus.COMPLETED
+
             processing_steps.append({
-                "step": "analysis_skipped",
-                "detail": f"⏭️ Analyse übersprungen (zu wenig Text)"
+                "step": "analysis_complete",
+                "detail": "✅ Intelligente Analyse abgeschlossen"
+            })
+
+        except ImportError:
+            logger.warning("Document Intelligence Service nicht verfügbar")
+            processing_steps.append({
+                "step": "intel_unavailable",
+                "detail": "⚠️ Dokumenten-Intelligenz nicht verfügbar"
+            })
+        except Exception as e:
+            logger.error(f"Dokumenten-Intelligenz fehlgeschlagen: {e}")
+            processing_steps.append({
+                "step": "intel_error",
+                "detail": f"⚠️ Analysefehler: {str(e)[:40]}"
             })
 
         return processing_steps
@@ -2678,7 +3969,9 @@ class CloudSyncService:
             "files_skipped": result.get("files_skipped", 0),
             "files_error": result.get("files_error", 0),
             "synced_files": result.get("synced_files", []),
-            "errors": result.get("errors", [])
+            "errors": result.get("errors", []),
+            "stage_stats": result.get("stage_stats", {}),
+            "manifest_stats": result.get("manifest_stats", {})
         }
 
         with open(log_file, "a", encoding="utf-8") as f:
@@ -2753,14 +4046,8 @@ class CloudSyncService:
             now = datetime.now()
 
             for conn in connections:
-                if conn.last_sync_at is None:
+                if now >= next_sync_time(conn, now):
                     due_connections.append(conn)
-                else:
-                    next_sync = conn.last_sync_at + timedelta(
-                        minutes=conn.sync_interval_minutes or 15
-                    )
-                    if now >= next_sync:
-                        due_connections.append(conn)
 
             return due_connections
 
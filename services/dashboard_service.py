@@ -0,0 +1,206 @@
+"""
+Dashboard-Kennzahlen als gecachter Snapshot
+
+Berechnet alle KPIs des Dashboards (streamlit_app.render_dashboard) mit
+wenigen gruppierten SQL-Aggregaten statt einer Abfrage pro Kennzahl bzw.
+Monat. Das Ergebnis wird pro Benutzer gecacht und beim Commit von
+Änderungen an Dokumenten, Bons oder Terminen verworfen.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import case, event, extract, func
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Fallback-Gültigkeit (z.B. für Änderungen aus anderen Prozessen ohne Redis)
+DASHBOARD_CACHE_TTL_SECONDS = 300
+# Monate im Ausgaben-Diagramm
+DASHBOARD_EXPENSE_MONTHS = 6
+
+_SESSION_DIRTY_KEY = "dashboard_dirty_users"
+
+
+def _month_start(year: int, month: int) -> datetime:
+    """Erster Tag eines Monats; month darf über-/unterlaufen"""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1)
+
+
+class DashboardService:
+    """Liefert den Kennzahlen-Snapshot eines Benutzers"""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+
+    def get_snapshot(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Kennzahlen aus dem Cache oder frisch berechnet.
+
+        Args:
+            force_refresh: Cache ignorieren und neu berechnen
+
+        Returns:
+            Snapshot inkl. computed_at, compute_ms und from_cache
+        """
+        from services.cache_service import get_cache_service
+        cache = get_cache_service()
+
+        if not force_refresh:
+            cached = cache.get_dashboard_snapshot(self.user_id)
+            if cached:
+                return {**cached, "from_cache": True}
+
+        snapshot = self.compute_snapshot()
+        cache.set_dashboard_snapshot(self.user_id, snapshot, ttl_seconds=DASHBOARD_CACHE_TTL_SECONDS)
+        return {**snapshot, "from_cache": False}
+
+    def compute_snapshot(self, months: int = DASHBOARD_EXPENSE_MONTHS) -> Dict[str, Any]:
+        """Berechnet alle Kennzahlen (vier Abfragen)"""
+        from database.db import get_db
+
+        start = time.perf_counter()
+        now = datetime.now()
+
+        with get_db() as session:
+            snapshot = self._document_kpis(session, now)
+            snapshot.update(self._deadline_kpis(session, now))
+            monthly = self._monthly_expenses(session, now, months)
+
+        snapshot["monthly_expenses"] = monthly
+        snapshot["month_expenses"] = monthly[-1]["amount"] if monthly else 0.0
+        snapshot["last_month_expenses"] = monthly[-2]["amount"] if len(monthly) > 1 else 0.0
+        snapshot["computed_at"] = now.isoformat()
+        snapshot["compute_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return snapshot
+
+    def _document_kpis(self, session, now: datetime) -> Dict[str, Any]:
+        """Dokument-, Posteingangs-, Rechnungs- und Vertragszahlen in einer Abfrage"""
+        from database.models import Document, Folder, InvoiceStatus
+
+        inbox_id = session.query(Folder.id).filter(
+            Folder.user_id == self.user_id,
+            Folder.name == "Posteingang"
+        ).limit(1).scalar_subquery()
+
+        is_open = Document.invoice_status == InvoiceStatus.OPEN
+        row = session.query(
+            func.count(Document.id),
+            func.sum(case((Document.folder_id == inbox_id, 1), else_=0)),
+            func.sum(case((is_open, 1), else_=0)),
+            func.sum(case((is_open, Document.invoice_amount), else_=0)),
+            func.sum(case((
+                (Document.contract_end >= now) & (Document.contract_end <= now + timedelta(days=90)), 1
+            ), else_=0)),
+        ).filter(Document.user_id == self.user_id).one()
+
+        return {
+            "document_count": row[0] or 0,
+            "inbox_count": int(row[1] or 0),
+            "open_invoices_count": int(row[2] or 0),
+            "open_invoices_amount": float(row[3] or 0),
+            "expiring_contracts_count": int(row[4] or 0),
+        }
+
+    def _deadline_kpis(self, session, now: datetime) -> Dict[str, Any]:
+        """Fristen der nächsten 30 bzw. 7 Tage in einer Abfrage"""
+        from database.models import CalendarEvent
+
+        row = session.query(
+            func.count(CalendarEvent.id),
+            func.sum(case((CalendarEvent.start_date <= now + timedelta(days=7), 1), else_=0)),
+        ).filter(
+            CalendarEvent.user_id == self.user_id,
+            CalendarEvent.start_date >= now,
+            CalendarEvent.start_date <= now + timedelta(days=30)
+        ).one()
+
+        return {
+            "upcoming_deadlines_count": row[0] or 0,
+            "urgent_deadlines_count": int(row[1] or 0),
+        }
+
+    def _monthly_expenses(self, session, now: datetime, months: int) -> List[Dict[str, Any]]:
+        """Bons und bezahlte Rechnungen je Monat (je eine GROUP-BY-Abfrage)"""
+        from database.models import Document, InvoiceStatus, Receipt
+
+        first_month = _month_start(now.year, now.month - (months - 1))
+        next_month = _month_start(now.year, now.month + 1)
+        totals: Dict[tuple, float] = {}
+
+        receipt_year = extract('year', Receipt.date)
+        receipt_month = extract('month', Receipt.date)
+        receipt_rows = session.query(
+            receipt_year, receipt_month, func.sum(Receipt.total_amount)
+        ).filter(
+            Receipt.user_id == self.user_id,
+            Receipt.date >= first_month,
+            Receipt.date < next_month
+        ).group_by(receipt_year, receipt_month).all()
+
+        invoice_year = extract('year', Document.invoice_paid_date)
+        invoice_month = extract('month', Document.invoice_paid_date)
+        invoice_rows = session.query(
+            invoice_year, invoice_month, func.sum(Document.invoice_amount)
+        ).filter(
+            Document.user_id == self.user_id,
+            Document.invoice_status == InvoiceStatus.PAID,
+            Document.invoice_paid_date >= first_month,
+            Document.invoice_paid_date < next_month
+        ).group_by(invoice_year, invoice_month).all()
+
+        for year, month, amount in list(receipt_rows) + list(invoice_rows):
+            key = (int(year), int(month))
+            totals[key] = totals.get(key, 0.0) + float(amount or 0)
+
+        data = []
+        for offset in range(months):
+            month_start = _month_start(first_month.year, first_month.month + offset)
+            data.append({
+                'month': month_start.strftime('%b'),
+                'amount': totals.get((month_start.year, month_start.month), 0.0)
+            })
+        return data
+
+
+def invalidate_dashboard(user_id: int):
+    """Verwirft den gecachten Snapshot eines Benutzers"""
+    try:
+        from services.cache_service import get_cache_service
+        get_cache_service().invalidate_dashboard_snapshot(user_id)
+    except Exception as e:
+        logger.debug(f"Dashboard-Cache für Benutzer {user_id} nicht invalidiert: {e}")
+
+
+def _collect_dirty_users(session: Session, flush_context):
+    """Merkt sich Benutzer, deren Dokumente/Bons/Termine geändert wurden"""
+    from database.models import CalendarEvent, Document, Receipt
+
+    users: Optional[Set[int]] = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Document, Receipt, CalendarEvent)) and obj.user_id:
+            if users is None:
+                users = session.info.setdefault(_SESSION_DIRTY_KEY, set())
+            users.add(obj.user_id)
+
+
+def _invalidate_after_commit(session: Session):
+    for user_id in session.info.pop(_SESSION_DIRTY_KEY, ()):
+        invalidate_dashboard(user_id)
+
+
+def _discard_after_rollback(session: Session):
+    session.info.pop(_SESSION_DIRTY_KEY, None)
+
+
+def register_cache_invalidation():
+    """Registriert die Session-Hooks zur Invalidierung (idempotent)"""
+    if event.contains(Session, "after_flush", _collect_dirty_users):
+        return
+    event.listen(Session, "after_flush", _collect_dirty_users)
+    event.listen(Session, "after_commit", _invalidate_after_commit)
+    event.listen(Session, "after_rollback", _discard_after_rollback)
@@ -3,16 +3,19 @@ Intelligenter Dokumentenklassifikator mit KI-Unterstützung und Explainability
 """
 import re
 import json
+import time
+import threading
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import streamlit as st
 
 from database import get_db
 from database.models import (
-    ClassificationRule, Folder, Document, Property, document_virtual_folders,
+    ClassificationRule, Folder, FolderKeyword, Document, Property, document_virtual_folders,
     Entity, EntityType, FeedbackEvent, FeedbackEventType, ClassificationExplanation
 )
 from config.settings import DOCUMENT_CATEGORIES
+from services.keyword_matcher import KeywordAutomaton
 
 
 # Erweiterte Kategorie-Patterns mit Untertypen
@@ -196,6 +199,121 @@ KNOWN_SENDERS = {
     'jobcenter': {'folder': 'Behörden', 'category': 'Bescheid'},
 }
 
+# Kategorien nach Priorität sortiert (höchste zuerst) - einmalig beim Import
+SORTED_CATEGORIES = sorted(
+    CATEGORY_PATTERNS.items(),
+    key=lambda x: x[1].get('priority', 50),
+    reverse=True
+)
+
+# Absendermuster werden nur im Briefkopf gesucht
+RULE_SENDER_HEADER_CHARS = 500
+
+# Maximales Alter eines Klassifikator-Kontexts in Sekunden. Schreibzugriffe
+# über den Klassifikator invalidieren sofort; das Alterslimit fängt Änderungen
+# aus anderen Prozessen oder direkten DB-Zugriffen ab.
+CLASSIFIER_CONTEXT_MAX_AGE = 300
+
+
+class ClassifierRuleSet:
+    """
+    Vorkompilierter Regelsatz eines Benutzers.
+
+    Enthält die statischen Kategorie-Keywords sowie Ordner-Keywords,
+    gelernte Regeln und Entity-Aliase des Benutzers als Momentaufnahme
+    (reine Tupel, keine ORM-Objekte) und einen gemeinsamen Automaten,
+    der alle Muster in einem Durchlauf findet.
+    """
+
+    def __init__(self, folder_keywords: Tuple, rules: Tuple, entities: Tuple,
+                 version: int = 0, load_seconds: float = 0.0):
+        # (keyword_lower, keyword, folder_id, weight, is_negative)
+        self.folder_keywords = folder_keywords
+        # (sender_lower, sender_pattern, keywords_lower, target_folder_id, confidence)
+        self.rules = rules
+        # (id, name, type, folder_id, patterns_lower, plate_normalized)
+        self.entities = entities
+        self.source = (folder_keywords, rules, entities)
+        self.version = version
+        self.built_at = time.time()
+        self.loaded_at = self.built_at
+        self.load_seconds = load_seconds
+
+        start = time.perf_counter()
+        automaton = KeywordAutomaton()
+        for _, info in SORTED_CATEGORIES:
+            for keyword in info['keywords']:
+                automaton.add(keyword)
+            for sub_keywords in info.get('subtypes', {}).values():
+                for keyword in sub_keywords:
+                    automaton.add(keyword)
+        for keyword_lower, *_ in folder_keywords:
+            automaton.add(keyword_lower)
+        for sender_lower, _, keywords_lower, _, _ in rules:
+            if sender_lower:
+                automaton.add(sender_lower)
+            for keyword in keywords_lower:
+                automaton.add(keyword)
+        for entity in entities:
+            for pattern in entity[4]:
+                automaton.add(pattern)
+        self.automaton = automaton.build()
+        self.build_seconds = time.perf_counter() - start
+
+    def scan(self, text_lower: str) -> Dict[str, int]:
+        """Findet alle Muster im Text (Muster -> Ende des ersten Vorkommens)"""
+        return self.automaton.scan(text_lower)
+
+
+# Klassifikator-Kontext pro Benutzer (prozessweit, zwischen Streamlit-Sessions
+# und allen Dokumenten eines Batches geteilt)
+_rule_sets: Dict[int, ClassifierRuleSet] = {}
+_rule_set_versions: Dict[int, int] = {}
+_rule_set_stats = {'loads': 0, 'hits': 0, 'invalidations': 0, 'expired': 0, 'rebuilds': 0}
+_rule_sets_lock = threading.Lock()
+
+
+def invalidate_rule_set(user_id: int):
+    """
+    Markiert den Klassifikator-Kontext eines Benutzers als veraltet.
+
+    Aufzurufen nach Änderungen an Regeln, Ordner-Keywords oder Entities.
+    Der nächste Zugriff lädt die Daten neu.
+    """
+    with _rule_sets_lock:
+        _rule_set_versions[user_id] = _rule_set_versions.get(user_id, 0) + 1
+        _rule_set_stats['invalidations'] += 1
+
+
+def get_rule_set_stats() -> Dict:
+    """Gibt Lade-/Trefferzähler und die Aktualität der Kontexte pro Benutzer zurück"""
+    now = time.time()
+    with _rule_sets_lock:
+        users = {}
+        for user_id, rule_set in _rule_sets.items():
+            current_version = _rule_set_versions.get(user_id, 0)
+            age = now - rule_set.loaded_at
+            users[user_id] = {
+                'version': rule_set.version,
+                'current_version': current_version,
+                'age_seconds': round(age, 1),
+                'stale': rule_set.version != current_version or age >= CLASSIFIER_CONTEXT_MAX_AGE,
+                'folder_keywords': len(rule_set.folder_keywords),
+                'rules': len(rule_set.rules),
+                'entities': len(rule_set.entities),
+                'patterns': len(rule_set.automaton),
+                'load_ms': round(rule_set.load_seconds * 1000, 2),
+                'build_ms': round(rule_set.build_seconds * 1000, 2)
+            }
+
+        total = _rule_set_stats['hits'] + _rule_set_stats['loads']
+        return {
+            **_rule_set_stats,
+            'hit_rate': round(_rule_set_stats['hits'] / total, 3) if total else 0.0,
+            'max_age_seconds': CLASSIFIER_CONTEXT_MAX_AGE,
+            'users': users
+        }
+
 
 class DocumentClassifier:
     """Intelligenter Dokumentenklassifikator mit KI-Unterstützung"""
@@ -203,6 +321,104 @@ class DocumentClassifier:
     def __init__(self, user_id: int):
         self.user_id = user_id
 
+    def _load_rule_set_source(self) -> Tuple[Tuple, Tuple, Tuple]:
+        """Lädt Ordner-Keywords, Regeln und Entities als Momentaufnahme"""
+        folder_keywords = []
+        rules = []
+        entities = []
+
+        with get_db() as session:
+            for kw in session.query(FolderKeyword).filter(
+                FolderKeyword.user_id == self.user_id
+            ).all():
+                if kw.keyword:
+                    folder_keywords.append(
+                        (kw.keyword.lower(), kw.keyword, kw.folder_id, kw.weight, kw.is_negative)
+                    )
+
+            for rule in session.query(ClassificationRule).filter(
+                ClassificationRule.user_id == self.user_id
+            ).order_by(ClassificationRule.confidence.desc()).all():
+                keywords = rule.subject_keywords if isinstance(rule.subject_keywords, list) else []
+                rules.append((
+                    rule.sender_pattern.lower() if rule.sender_pattern else None,
+                    rule.sender_pattern,
+                    tuple(kw.lower() for kw in keywords if isinstance(kw, str)),
+                    rule.target_folder_id,
+                    rule.confidence
+                ))
+
+            try:
+                for entity in session.query(Entity).filter(
+                    Entity.user_id == self.user_id,
+                    Entity.is_active == True
+                ).all():
+                    patterns = [entity.name.lower()]
+                    patterns.extend(a.lower() for a in (entity.aliases or []) if isinstance(a, str))
+
+                    plate = None
+                    if entity.entity_type == EntityType.VEHICLE:
+                        plate = (entity.meta or {}).get('plate', '')
+                        plate = plate.lower().replace(' ', '').replace('-', '') if plate else None
+
+                    entities.append((
+                        entity.id,
+                        entity.name,
+                        entity.entity_type.value if entity.entity_type else 'unknown',
+                        entity.folder_id,
+                        tuple(patterns),
+                        plate
+                    ))
+            except Exception:
+                # Entities sind optional - Klassifikation läuft ohne weiter
+                entities = []
+
+        return tuple(folder_keywords), tuple(rules), tuple(entities)
+
+    def _get_rule_set(self) -> ClassifierRuleSet:
+        """
+        Gibt den Klassifikator-Kontext (kompilierter Regelsatz) des Benutzers zurück.
+
+        Solange die Version aktuell und das Alterslimit nicht erreicht ist,
+        wird ohne Datenbankzugriff der vorhandene Kontext verwendet. Sonst
+        werden Keywords, Regeln und Entities neu geladen; der Automat wird
+        nur neu gebaut, wenn sich die Daten tatsächlich geändert haben.
+        """
+        with _rule_sets_lock:
+            version = _rule_set_versions.get(self.user_id, 0)
+            rule_set = _rule_sets.get(self.user_id)
+            if rule_set is not None and rule_set.version == version:
+                if time.time() - rule_set.loaded_at < CLASSIFIER_CONTEXT_MAX_AGE:
+                    _rule_set_stats['hits'] += 1
+                    return rule_set
+                _rule_set_stats['expired'] += 1
+
+        start = time.perf_counter()
+        source = self._load_rule_set_source()
+        load_seconds = time.perf_counter() - start
+
+        if rule_set is not None and rule_set.source == source:
+            # Daten unverändert - Automat weiterverwenden
+            rule_set.version = version
+            rule_set.loaded_at = time.time()
+            rule_set.load_seconds = load_seconds
+        else:
+            rule_set = ClassifierRuleSet(*source, version=version, load_seconds=load_seconds)
+            with _rule_sets_lock:
+                _rule_set_stats['rebuilds'] += 1
+
+        with _rule_sets_lock:
+            _rule_set_stats['loads'] += 1
+            # Nur eintragen, wenn zwischenzeitlich nicht invalidiert wurde
+            if _rule_set_versions.get(self.user_id, 0) == version:
+                _rule_sets[self.user_id] = rule_set
+        return rule_set
+
+    def _scan_text(self, text_lower: str) -> Tuple[ClassifierRuleSet, Dict[str, int]]:
+        """Durchsucht den Text einmal nach allen Mustern des Regelsatzes"""
+        rule_set = self._get_rule_set()
+        return rule_set, rule_set.scan(text_lower)
+
     def classify(self, text: str, metadata: Dict, save_explanation: bool = True) -> Dict:
         """
         Klassifiziert ein Dokument und gibt alle relevanten Zuordnungen zurück.
@@ -241,12 +457,15 @@ class DocumentClassifier:
 
         text_lower = text.lower() if text else ''
 
+        # Ein Durchlauf über den Text für Kategorien, Keywords, Regeln und Entities
+        scan = self._scan_text(text_lower)
+
         # 1. Absender erkennen
         sender = self._detect_sender(text_lower, metadata)
         result['detected_sender'] = sender
 
         # 2. HÖCHSTE PRIORITÄT: Benutzerdefinierte Ordner-Keywords prüfen
-        keyword_match = self._match_folder_keywords(text_lower)
+        keyword_match = self._match_folder_keywords(text_lower, scan)
         if keyword_match and keyword_match['confidence'] > 0.3:
             result['primary_folder_id'] = keyword_match['folder_id']
             result['confidence'] = keyword_match['confidence']
@@ -268,7 +487,7 @@ class DocumentClassifier:
             }
 
         # 4. Kategorie und Unterkategorie bestimmen (mit Prioritätssystem)
-        category, subcategory, cat_confidence, matched_keywords = self._determine_category_with_keywords(text_lower)
+        category, subcategory, cat_confidence, matched_keywords = self._determine_category_with_keywords(text_lower, scan)
         if cat_confidence > result['confidence'] or not result.get('category') or result['category'] == 'Sonstiges':
             result['category'] = category
             result['subcategory'] = subcategory
@@ -277,7 +496,7 @@ class DocumentClassifier:
             result['decision_factors']['keyword_matches'] = matched_keywords
 
         # 5. Entities erkennen (Personen, Fahrzeuge, etc.)
-        entity_matches = self._match_entities(text_lower)
+        entity_matches = self._match_entities(text_lower, scan)
         if entity_matches:
             result['matched_entities'] = entity_matches
             result['decision_factors']['entity_matches'] = entity_matches
@@ -302,7 +521,7 @@ class DocumentClassifier:
         result['virtual_folder_ids'] = self._determine_virtual_folders(result)
 
         # 9. Gelernte Regeln anwenden
-        rule_match = self._apply_learned_rules(text, metadata)
+        rule_match = self._apply_learned_rules(text, metadata, scan)
         if rule_match:
             result['decision_factors']['rule_matches'].append(rule_match)
             if rule_match['confidence'] > result['confidence']:
@@ -315,27 +534,25 @@ class DocumentClassifier:
 
         return result
 
-    def _determine_category_with_keywords(self, text_lower: str) -> Tuple[str, Optional[str], float, List[Dict]]:
+    def _determine_category_with_keywords(self, text_lower: str,
+                                          scan: Optional[Tuple[ClassifierRuleSet, Dict[str, int]]] = None
+                                          ) -> Tuple[str, Optional[str], float, List[Dict]]:
         """Bestimmt Kategorie und gibt auch die gefundenen Keywords zurück"""
+        _, hits = scan or self._scan_text(text_lower)
+
         best_category = 'Sonstiges'
         best_subcategory = None
         best_score = 0
         best_priority = 0
         all_matches = []
 
-        sorted_categories = sorted(
-            CATEGORY_PATTERNS.items(),
-            key=lambda x: x[1].get('priority', 50),
-            reverse=True
-        )
-
-        for category, info in sorted_categories:
+        for category, info in SORTED_CATEGORIES:
             priority = info.get('priority', 50)
             category_score = 0
             matched_keywords = []
 
             for keyword in info['keywords']:
-                if keyword in text_lower:
+                if keyword in hits:
                     category_score += 1
                     matched_keywords.append({
                         'keyword': keyword,
@@ -350,7 +567,7 @@ class DocumentClassifier:
                 subcategory = None
                 for subcat, sub_keywords in info.get('subtypes', {}).items():
                     for kw in sub_keywords:
-                        if kw in text_lower:
+                        if kw in hits:
                             subcategory = subcat
                             base_score += 0.2
                             matched_keywords.append({
@@ -375,33 +592,33 @@ class DocumentClassifier:
         confidence = min(0.95, best_score) if best_score > 0 else 0.1
         return best_category, best_subcategory, confidence, all_matches
 
-    def _match_entities(self, text_lower: str) -> List[Dict]:
+    def _match_entities(self, text_lower: str,
+                        scan: Optional[Tuple[ClassifierRuleSet, Dict[str, int]]] = None) -> List[Dict]:
         """Erkennt Entities (Personen, Fahrzeuge, Lieferanten) im Text"""
         matches = []
 
         try:
-            with get_db() as session:
-                entities = session.query(Entity).filter(
-                    Entity.user_id == self.user_id,
-                    Entity.is_active == True
-                ).all()
-
-                for entity in entities:
-                    if entity.matches_text(text_lower):
-                        matches.append({
-                            'id': entity.id,
-                            'name': entity.name,
-                            'type': entity.entity_type.value if entity.entity_type else 'unknown',
-                            'folder_id': entity.folder_id
-                        })
-
-                        # Bei Fahrzeug: Kennzeichen prüfen
-                        if entity.entity_type == EntityType.VEHICLE:
-                            meta = entity.meta or {}
-                            plate = meta.get('plate', '')
-                            if plate and plate.lower().replace(' ', '').replace('-', '') in text_lower.replace(' ', '').replace('-', ''):
-                                matches[-1]['matched_by'] = 'plate'
-                                matches[-1]['confidence'] = 0.95
+            rule_set, hits = scan or self._scan_text(text_lower)
+            compact_text = None
+
+            for entity_id, name, entity_type, folder_id, patterns, plate in rule_set.entities:
+                if not any(pattern in hits for pattern in patterns):
+                    continue
+
+                matches.append({
+                    'id': entity_id,
+                    'name': name,
+                    'type': entity_type,
+                    'folder_id': folder_id
+                })
+
+                # Bei Fahrzeug: Kennzeichen prüfen
+                if plate:
+                    if compact_text is None:
+                        compact_text = text_lower.replace(' ', '').replace('-', '')
+                    if plate in compact_text:
+                        matches[-1]['matched_by'] = 'plate'
+                        matches[-1]['confidence'] = 0.95
 
         except Exception:
             pass
@@ -477,14 +694,7 @@ class DocumentClassifier:
         best_score = 0
         best_priority = 0
 
-        # Sortiere Kategorien nach Priorität (höchste zuerst)
-        sorted_categories = sorted(
-            CATEGORY_PATTERNS.items(),
-            key=lambda x: x[1].get('priority', 50),
-            reverse=True
-        )
-
-        for category, info in sorted_categories:
+        for category, info in SORTED_CATEGORIES:
             priority = info.get('priority', 50)
 
             # Hauptkategorie-Keywords prüfen
@@ -525,51 +735,43 @@ class DocumentClassifier:
         confidence = min(0.95, best_score) if best_score > 0 else 0.1
         return best_category, best_subcategory, confidence
 
-    def _match_folder_keywords(self, text_lower: str) -> Optional[Dict]:
+    def _match_folder_keywords(self, text_lower: str,
+                               scan: Optional[Tuple[ClassifierRuleSet, Dict[str, int]]] = None) -> Optional[Dict]:
         """Prüft benutzerdefinierte Ordner-Keywords aus der Datenbank"""
-        try:
-            from database.models import FolderKeyword
-        except ImportError:
-            return None
+        rule_set, hits = scan or self._scan_text(text_lower)
 
-        with get_db() as session:
-            # Alle Keywords des Benutzers laden
-            keywords = session.query(FolderKeyword).filter(
-                FolderKeyword.user_id == self.user_id
-            ).all()
-
-            if not keywords:
-                return None
+        if not rule_set.folder_keywords:
+            return None
 
-            # Scores pro Ordner sammeln
-            folder_scores = {}
+        # Scores pro Ordner sammeln
+        folder_scores = {}
 
-            for kw in keywords:
-                if kw.keyword.lower() in text_lower:
-                    folder_id = kw.folder_id
-                    if folder_id not in folder_scores:
-                        folder_scores[folder_id] = {'score': 0, 'matches': [], 'negative': 0}
+        for keyword_lower, keyword, folder_id, weight, is_negative in rule_set.folder_keywords:
+            if keyword_lower in hits:
+                if folder_id not in folder_scores:
+                    folder_scores[folder_id] = {'score': 0, 'matches': [], 'negative': 0}
 
-                    if kw.is_negative:
-                        folder_scores[folder_id]['negative'] += kw.weight
-                    else:
-                        folder_scores[folder_id]['score'] += kw.weight
-                        folder_scores[folder_id]['matches'].append(kw.keyword)
+                if is_negative:
+                    folder_scores[folder_id]['negative'] += weight
+                else:
+                    folder_scores[folder_id]['score'] += weight
+                    folder_scores[folder_id]['matches'].append(keyword)
 
-            if not folder_scores:
-                return None
+        if not folder_scores:
+            return None
 
-            # Beste Übereinstimmung finden (Score minus negative)
-            best_folder = None
-            best_score = 0
+        # Beste Übereinstimmung finden (Score minus negative)
+        best_folder = None
+        best_score = 0
 
-            for folder_id, data in folder_scores.items():
-                net_score = data['score'] - data['negative']
-                if net_score > best_score:
-                    best_score = net_score
-                    best_folder = folder_id
+        for folder_id, data in folder_scores.items():
+            net_score = data['score'] - data['negative']
+            if net_score > best_score:
+                best_score = net_score
+                best_folder = folder_id
 
-            if best_folder and best_score >= 1.0:  # Mindestens 1 Match
+        if best_folder and best_score >= 1.0:  # Mindestens 1 Match
+            with get_db() as session:
                 folder = session.get(Folder, best_folder)
                 if folder:
                     return {
@@ -762,45 +964,44 @@ class DocumentClassifier:
 
         return virtual_ids
 
-    def _apply_learned_rules(self, text: str, metadata: Dict) -> Optional[Dict]:
+    def _apply_learned_rules(self, text: str, metadata: Dict,
+                             scan: Optional[Tuple[ClassifierRuleSet, Dict[str, int]]] = None) -> Optional[Dict]:
         """Wendet gelernte Regeln an"""
-        with get_db() as session:
-            rules = session.query(ClassificationRule).filter(
-                ClassificationRule.user_id == self.user_id
-            ).order_by(ClassificationRule.confidence.desc()).all()
-
-            text_lower = (text or '').lower()
-            sender = (metadata.get('sender') or '').lower()
-
-            best_match = None
-            best_score = 0
-
-            for rule in rules:
-                score = 0
-
-                # Absender prüfen
-                if rule.sender_pattern:
-                    if rule.sender_pattern.lower() in sender:
-                        score += 0.5
-                    elif rule.sender_pattern.lower() in text_lower[:500]:
-                        score += 0.3
-
-                # Schlüsselwörter prüfen
-                if rule.subject_keywords:
-                    keywords = rule.subject_keywords if isinstance(rule.subject_keywords, list) else []
-                    matches = sum(1 for kw in keywords if kw.lower() in text_lower)
-                    if keywords:
-                        score += 0.5 * (matches / len(keywords))
-
-                if score > best_score and score > 0.4:
-                    best_score = score
-                    best_match = {
-                        'folder_id': rule.target_folder_id,
-                        'confidence': min(0.95, score * rule.confidence),
-                        'reason': f"Regel: {rule.sender_pattern}"
-                    }
+        rule_set, hits = scan or self._scan_text((text or '').lower())
+        if not rule_set.rules:
+            return None
 
-            return best_match
+        sender = (metadata.get('sender') or '').lower()
+        sender_hits = rule_set.scan(sender) if sender else {}
+        header_end = RULE_SENDER_HEADER_CHARS
+
+        best_match = None
+        best_score = 0
+
+        for sender_lower, sender_pattern, keywords, target_folder_id, confidence in rule_set.rules:
+            score = 0
+
+            # Absender prüfen (Briefkopf = erste 500 Zeichen)
+            if sender_lower:
+                if sender_lower in sender_hits:
+                    score += 0.5
+                elif hits.get(sender_lower, header_end + 1) <= header_end:
+                    score += 0.3
+
+            # Schlüsselwörter prüfen
+            if keywords:
+                matches = sum(1 for kw in keywords if kw in hits)
+                score += 0.5 * (matches / len(keywords))
+
+            if score > best_score and score > 0.4:
+                best_score = score
+                best_match = {
+                    'folder_id': target_folder_id,
+                    'confidence': min(0.95, score * confidence),
+                    'reason': f"Regel: {sender_pattern}"
+                }
+
+        return best_match
 
     def classify_with_ai(self, text: str, metadata: Dict) -> Dict:
         """Klassifiziert ein Dokument mit KI-Unterstützung"""
@@ -916,6 +1117,8 @@ Antworte im JSON-Format:
 
             session.commit()
 
+        invalidate_rule_set(self.user_id)
+
     def assign_to_virtual_folders(self, document_id: int, folder_ids: List[int]):
         """Weist ein Dokument mehreren virtuellen Ordnern zu"""
         from sqlalchemy.exc import IntegrityError
@@ -1091,6 +1294,45 @@ Antworte im JSON-Format:
 
             session.commit()
 
+        invalidate_rule_set(self.user_id)
+
+    def benchmark_keyword_matching(self, text: str, iterations: int = 10) -> Dict:
+        """
+        Vergleicht den kompilierten Automaten mit einzelnen Teilstring-Suchen.
+
+        Args:
+            text: Langer OCR-Text als Testeingabe
+            iterations: Anzahl Wiederholungen pro Verfahren
+
+        Returns:
+            Dictionary mit Laufzeiten, Musteranzahl und Speedup
+        """
+        text_lower = (text or '').lower()
+        iterations = max(1, iterations)
+
+        rule_set = self._get_rule_set()
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            naive_hits = rule_set.automaton.scan_naive(text_lower)
+        naive_seconds = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            automaton_hits = rule_set.scan(text_lower)
+        automaton_seconds = (time.perf_counter() - start) / iterations
+
+        return {
+            'text_length': len(text_lower),
+            **rule_set.automaton.get_stats(),
+            'hits': len(automaton_hits),
+            'build_ms': round(rule_set.build_seconds * 1000, 2),
+            'naive_ms': round(naive_seconds * 1000, 2),
+            'automaton_ms': round(automaton_seconds * 1000, 2),
+            'speedup': round(naive_seconds / automaton_seconds, 2) if automaton_seconds else 0.0,
+            'identical_hits': naive_hits == automaton_hits
+        }
+
     def _learn_entity_keywords(self, entity_id: int, text_snippet: str):
         """Lernt Keywords für eine Entity aus einem Textausschnitt"""
         # Keywords extrahieren die mit der Entity in Verbindung stehen könnten
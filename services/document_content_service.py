@@ -0,0 +1,423 @@
+"""
+Content-Store für OCR-Volltexte
+
+OCR-Texte liegen zlib-komprimiert in document_contents statt inline in der
+documents-Tabelle; identische Texte werden über ihren SHA-256 nur einmal
+gespeichert. Document.ocr_text lädt den Text erst beim Zugriff. Ersetzte
+Texte, auf die kein Dokument mehr verweist, werden im selben Flush gelöscht.
+
+Bestehende Texte aus der alten Spalte documents.ocr_text werden mit
+migrate_ocr_texts() in Batches verschoben. Das Kommandozeilen-Skript misst
+Tabellengröße und Scan-Geschwindigkeit vor und nach der Migration.
+
+Verwendung:
+    python -m services.document_content_service [--batch-size 200] [--vacuum]
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Dokumente pro Batch (= pro Transaktion) bei der Migration
+CONTENT_MIGRATION_BATCH_SIZE = 200
+# Dokumente pro Abrufblock bei der Textsuche im Content-Store
+CONTENT_SCAN_CHUNK_SIZE = 200
+
+
+# ==================== DEDUPLIZIERUNG ====================
+
+# Schlüssel in session.info: Text-IDs, die im laufenden Flush ersetzt werden
+_REPLACED_CONTENTS_KEY = "replaced_document_contents"
+
+
+def _insert_content(conn, content):
+    """
+    Legt einen Text an, sofern sein Hash noch nicht existiert.
+
+    Schützt vor dem Wettlauf zwischen SELECT und INSERT, wenn zwei Sessions
+    denselben Text gleichzeitig speichern.
+    """
+    from sqlalchemy import insert
+    from sqlalchemy.exc import IntegrityError
+    from database.models import DocumentContent
+
+    values = {
+        "text_hash": content.text_hash,
+        "compression": content.compression,
+        "data": content.data,
+        "original_size": content.original_size,
+        "compressed_size": content.compressed_size,
+    }
+
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        conn.execute(pg_insert(DocumentContent).values(values).on_conflict_do_nothing(
+            index_elements=["text_hash"]
+        ))
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        conn.execute(sqlite_insert(DocumentContent).values(values).on_conflict_do_nothing(
+            index_elements=["text_hash"]
+        ))
+    else:
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(DocumentContent).values(values))
+        except IntegrityError:
+            # Zeitgleich von einer anderen Session angelegt
+            pass
+
+
+def _collect_replaced_contents(session: Session):
+    """Merkt sich die bisherigen Texte geänderter und gelöschter Dokumente"""
+    from database.models import Document
+
+    replaced = session.info.setdefault(_REPLACED_CONTENTS_KEY, set())
+    unknown = []
+
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Document):
+            continue
+        state = inspect(obj)
+        if obj not in session.deleted and not state.attrs.ocr_content.history.has_changes():
+            continue
+        if state.key is None:
+            continue
+
+        # Der Fremdschlüssel wird erst im Flush synchronisiert und enthält
+        # daher noch den bisherigen Wert (sofern geladen)
+        if "ocr_content_id" in state.committed_state:
+            old_id = state.committed_state["ocr_content_id"]
+        elif "ocr_content_id" in state.dict:
+            old_id = state.dict["ocr_content_id"]
+        else:
+            unknown.append(obj.id)
+            continue
+        if old_id is not None:
+            replaced.add(old_id)
+
+    if unknown:
+        with session.no_autoflush:
+            replaced.update(
+                content_id for (content_id,) in session.query(Document.ocr_content_id).filter(
+                    Document.id.in_(unknown), Document.ocr_content_id.isnot(None)
+                )
+            )
+
+
+def _deduplicate_contents(session: Session, flush_context, instances):
+    """Verweist neue Texte auf vorhandene Einträge mit gleichem Hash (before_flush)"""
+    from database.models import Document, DocumentContent
+
+    _collect_replaced_contents(session)
+
+    pending = {id(obj): obj for obj in session.new if isinstance(obj, DocumentContent)}
+    if not pending:
+        return
+
+    hashes = {content.text_hash for content in pending.values()}
+    with session.no_autoflush:
+        known = {
+            text_hash for (text_hash,) in session.query(DocumentContent.text_hash).filter(
+                DocumentContent.text_hash.in_(hashes)
+            )
+        }
+        missing = {
+            content.text_hash: content for content in pending.values() if content.text_hash not in known
+        }
+        if missing:
+            conn = session.connection()
+            for content in missing.values():
+                _insert_content(conn, content)
+
+        existing = {
+            content.text_hash: content for content in session.query(DocumentContent).filter(
+                DocumentContent.text_hash.in_(hashes)
+            )
+        }
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Document):
+            current = inspect(obj).dict.get("ocr_content")
+            if current is not None and id(current) in pending:
+                obj.ocr_content = existing[current.text_hash]
+
+    for content in pending.values():
+        session.expunge(content)
+
+
+def _delete_replaced_contents(session: Session, flush_context):
+    """Löscht ersetzte Texte, auf die kein Dokument mehr verweist (after_flush)"""
+    from sqlalchemy import delete, select
+    from database.models import Document, DocumentContent
+
+    replaced = session.info.pop(_REPLACED_CONTENTS_KEY, None)
+    if not replaced:
+        return
+
+    referenced = select(Document.ocr_content_id).where(Document.ocr_content_id.in_(replaced))
+    session.connection().execute(
+        delete(DocumentContent).where(
+            DocumentContent.id.in_(replaced),
+            DocumentContent.id.notin_(referenced)
+        )
+    )
+
+
+def register_content_deduplication():
+    """Registriert die Session-Hooks für Deduplizierung und Aufräumen (idempotent)"""
+    if not event.contains(Session, "before_flush", _deduplicate_contents):
+        event.listen(Session, "before_flush", _deduplicate_contents)
+    if not event.contains(Session, "after_flush", _delete_replaced_contents):
+        event.listen(Session, "after_flush", _delete_replaced_contents)
+
+
+# ==================== SUCHE ====================
+
+def find_documents_by_text(session, user_id: int, needle: str, scope=None,
+                           limit: Optional[int] = None) -> List[int]:
+    """
+    Sucht Dokumente, deren OCR-Text needle enthält (ohne Suchindex).
+
+    Die komprimierten Texte werden blockweise gelesen und entpackt; gedacht
+    als Fallback, wenn der Whoosh-Index nicht verfügbar ist.
+
+    Args:
+        session: Datenbank-Session
+        user_id: ID des Benutzers
+        needle: Gesuchter Text (Groß-/Kleinschreibung egal)
+        scope: Optionale Abfrage auf Document.id (z.B. Ordner- und
+               Kategoriefilter der Seite); nur diese Dokumente werden entpackt
+        limit: Maximale Anzahl Treffer (None = alle)
+
+    Returns:
+        Dokument-IDs, neueste zuerst
+    """
+    from database.models import Document, DocumentContent
+
+    needle = needle.lower()
+    matches = []
+
+    rows = session.query(Document.id, DocumentContent.compression, DocumentContent.data).join(
+        DocumentContent, Document.ocr_content_id == DocumentContent.id
+    ).filter(
+        Document.user_id == user_id
+    )
+    if scope is not None:
+        rows = rows.filter(Document.id.in_(scope))
+
+    for document_id, compression, data in rows.order_by(Document.id.desc()).yield_per(CONTENT_SCAN_CHUNK_SIZE):
+        if needle in DocumentContent.decode(compression, data).lower():
+            matches.append(document_id)
+            if limit is not None and len(matches) >= limit:
+                return matches
+
+    # Noch nicht migrierte Dokumente
+    legacy = session.query(Document.id).filter(
+        Document.user_id == user_id,
+        Document.ocr_text_legacy.ilike(f"%{needle}%")
+    )
+    if scope is not None:
+        legacy = legacy.filter(Document.id.in_(scope))
+    if limit is not None:
+        legacy = legacy.limit(limit - len(matches))
+    matches.extend(row.id for row in legacy.order_by(Document.id.desc()))
+    return matches
+
+
+# ==================== MIGRATION ====================
+
+def migrate_ocr_texts(batch_size: int = CONTENT_MIGRATION_BATCH_SIZE,
+                      progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Verschiebt OCR-Texte aus documents.ocr_text in den Content-Store.
+
+    Jeder Batch läuft in einer eigenen Transaktion; ein abgebrochener Lauf
+    kann einfach neu gestartet werden (verarbeitet nur noch gefüllte Zeilen).
+
+    Returns:
+        Statistik: documents, contents_created, deduplicated, bytes_before,
+        bytes_after, seconds
+    """
+    from database.db import get_db
+    from database.models import Document, DocumentContent
+
+    stats = {
+        "documents": 0, "contents_created": 0, "deduplicated": 0,
+        "bytes_before": 0, "bytes_after": 0, "seconds": 0.0
+    }
+    start = time.perf_counter()
+    last_id = 0
+
+    while True:
+        with get_db() as session:
+            rows = session.query(Document.id, Document.ocr_text_legacy).filter(
+                Document.id > last_id,
+                Document.ocr_text_legacy.isnot(None)
+            ).order_by(Document.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            texts = {}
+            for row in rows:
+                if row.ocr_text_legacy:
+                    texts.setdefault(DocumentContent.hash_text(row.ocr_text_legacy), row.ocr_text_legacy)
+
+            content_ids = dict(session.query(DocumentContent.text_hash, DocumentContent.id).filter(
+                DocumentContent.text_hash.in_(list(texts))
+            ).all()) if texts else {}
+
+            new_contents = [
+                DocumentContent.from_text(ocr_text)
+                for text_hash, ocr_text in texts.items() if text_hash not in content_ids
+            ]
+            session.add_all(new_contents)
+            session.flush()
+            # Der Flush-Hook ersetzt neue Einträge durch die gespeicherten Zeilen
+            if new_contents:
+                content_ids.update(session.query(DocumentContent.text_hash, DocumentContent.id).filter(
+                    DocumentContent.text_hash.in_([content.text_hash for content in new_contents])
+                ).all())
+            stats["bytes_after"] += sum(content.compressed_size for content in new_contents)
+
+            mappings = []
+            for row in rows:
+                content_id = None
+                if row.ocr_text_legacy:
+                    content_id = content_ids[DocumentContent.hash_text(row.ocr_text_legacy)]
+                    stats["bytes_before"] += len(row.ocr_text_legacy.encode("utf-8"))
+                mappings.append({"id": row.id, "ocr_content_id": content_id, "ocr_text_legacy": None})
+            session.bulk_update_mappings(Document, mappings)
+
+            stats["documents"] += len(rows)
+            stats["contents_created"] += len(new_contents)
+            stats["deduplicated"] += sum(1 for row in rows if row.ocr_text_legacy) - len(new_contents)
+            last_id = rows[-1].id
+
+        stats["seconds"] = round(time.perf_counter() - start, 2)
+        logger.info(f"OCR-Texte migriert: {stats['documents']} Dokumente ({stats['seconds']}s)")
+        if progress_callback:
+            progress_callback(dict(stats))
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return stats
+
+
+def prune_orphaned_contents() -> int:
+    """Löscht Texte, auf die kein Dokument mehr verweist"""
+    from database.db import get_db
+    from database.models import Document, DocumentContent
+
+    with get_db() as session:
+        referenced = session.query(Document.ocr_content_id).filter(Document.ocr_content_id.isnot(None))
+        return session.query(DocumentContent).filter(
+            DocumentContent.id.notin_(referenced)
+        ).delete(synchronize_session=False)
+
+
+# ==================== MESSUNG ====================
+
+def _table_size(conn, table: str) -> Optional[int]:
+    """Belegter Speicher einer Tabelle in Bytes (None, wenn nicht ermittelbar)"""
+    try:
+        if conn.dialect.name == "postgresql":
+            return conn.execute(text("SELECT pg_total_relation_size(:t)"), {"t": table}).scalar()
+        if conn.dialect.name == "sqlite":
+            return conn.execute(
+                text("SELECT SUM(pgsize) FROM dbstat WHERE name = :t"), {"t": table}
+            ).scalar() or 0
+    except Exception as e:
+        logger.debug(f"Tabellengröße von {table} nicht ermittelbar: {e}")
+    return None
+
+
+def measure_documents_table(rounds: int = 3) -> Dict[str, Any]:
+    """
+    Größe von documents/document_contents und Dauer eines vollständigen
+    Scans der documents-Tabelle (bestes von rounds Durchläufen).
+    """
+    from database.db import engine
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT COUNT(*) FROM documents")).scalar() or 0
+        best = None
+        for _ in range(max(1, rounds)):
+            start = time.perf_counter()
+            result = conn.execution_options(stream_results=True).execute(text("SELECT * FROM documents"))
+            for _ in result:
+                pass
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        return {
+            "rows": rows,
+            "documents_bytes": _table_size(conn, "documents"),
+            "contents_bytes": _table_size(conn, "document_contents"),
+            "scan_seconds": round(best, 4),
+            "rows_per_second": round(rows / best) if best else None,
+        }
+
+
+def vacuum_documents_table():
+    """Gibt den freigewordenen Platz der documents-Tabelle frei (sperrt die Tabelle)"""
+    from database.db import engine
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("VACUUM FULL ANALYZE documents"))
+        elif conn.dialect.name == "sqlite":
+            conn.execute(text("VACUUM"))
+
+
+def _format_size(size: Optional[int]) -> str:
+    return f"{size / 1024 / 1024:.1f} MB" if size is not None else "?"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Kommandozeilen-Einstieg: messen, migrieren, erneut messen"""
+    parser = argparse.ArgumentParser(description="OCR-Texte in den Content-Store verschieben")
+    parser.add_argument("--batch-size", type=int, default=CONTENT_MIGRATION_BATCH_SIZE,
+                        help="Dokumente pro Transaktion (Standard: %(default)s)")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="Danach VACUUM ausführen, um den Platz freizugeben")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    from database.db import init_db
+    init_db()
+
+    before = measure_documents_table()
+    stats = migrate_ocr_texts(batch_size=args.batch_size)
+    pruned = prune_orphaned_contents()
+    if args.vacuum:
+        vacuum_documents_table()
+    after = measure_documents_table()
+
+    print(f"Migriert: {stats['documents']} Dokumente in {stats['seconds']}s, "
+          f"{stats['contents_created']} Texte angelegt, {stats['deduplicated']} dedupliziert, "
+          f"{pruned} verwaiste Texte gelöscht")
+    if stats["bytes_before"]:
+        print(f"OCR-Text: {_format_size(stats['bytes_before'])} -> {_format_size(stats['bytes_after'])} komprimiert")
+    print(f"{'':<22}{'vorher':>14}{'nachher':>14}")
+    print(f"{'documents':<22}{_format_size(before['documents_bytes']):>14}{_format_size(after['documents_bytes']):>14}")
+    print(f"{'document_contents':<22}{_format_size(before['contents_bytes']):>14}{_format_size(after['contents_bytes']):>14}")
+    print(f"{'Scan documents':<22}{before['scan_seconds']:>13}s{after['scan_seconds']:>13}s")
+    print(f"{'Zeilen/s':<22}{before['rows_per_second'] or '?':>14}{after['rows_per_second'] or '?':>14}")
+    if not args.vacuum:
+        print("Hinweis: Der Platz in documents wird erst nach VACUUM (--vacuum) freigegeben.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,29 @@
 """
 Verschlüsselungsservice für sichere Dokumentenspeicherung
 Verwendet AES-256-GCM für authentifizierte Verschlüsselung
+
+Dateiformate:
+- Legacy (Einzelnachricht): Ciphertext der ganzen Datei, 12-Byte-Nonce in
+  Document.encryption_iv. Wird weiterhin gelesen.
+- Segmentiert (Version 1): Header + Segmente fester Größe, jedes mit eigenem
+  GCM-Tag. Der Header steht am Dateianfang und zusätzlich in
+  Document.encryption_iv, so dass beide Formate am IV unterscheidbar sind.
+
+    Header  = MAGIC (4) | Version (1) | Segmentgröße (4, BE) | Nonce-Präfix (7)
+    Nonce_i = Nonce-Präfix (7) | Segmentzähler i (4, BE) | Letztes-Segment-Flag (1)
+    AAD_i   = Header | normalisierter Dateiname
+
+  Das Flag im Nonce verhindert unbemerktes Abschneiden oder Anhängen von
+  Segmenten, der Zähler das Vertauschen.
 """
+import io
 import os
 import base64
 import hashlib
-from typing import Tuple, Optional
+import struct
+import threading
+import time
+from typing import Tuple, Optional, BinaryIO, Iterator, Dict
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -22,15 +40,35 @@ class EncryptionService:
     SALT_SIZE = 16  # 128 bits für Key-Derivation
     ITERATIONS = 100000  # PBKDF2 Iterationen
 
-    def __init__(self, master_key: Optional[bytes] = None):
+    # Segmentiertes Dateiformat
+    STREAM_MAGIC = b"DMSE"
+    STREAM_VERSION = 1
+    STREAM_HEADER_SIZE = 16
+    STREAM_NONCE_PREFIX_SIZE = 7
+    STREAM_SEGMENT_SIZE = 64 * 1024  # Klartext pro Segment
+    TAG_SIZE = 16  # GCM-Tag pro Segment
+
+    # Cache für aus Passwörtern abgeleitete Schlüssel (0 = deaktiviert)
+    KEY_CACHE_TTL_SECONDS = 15 * 60
+
+    def __init__(self, master_key: Optional[bytes] = None,
+                 key_cache_ttl_seconds: int = KEY_CACHE_TTL_SECONDS):
         """
         Initialisiert den Verschlüsselungsservice.
 
         Args:
             master_key: Optionaler Master-Key. Wenn nicht angegeben,
                         wird ein neuer generiert oder aus der Session geladen.
+            key_cache_ttl_seconds: Gültigkeit abgeleiteter Schlüssel im Cache
         """
         self._master_key = master_key
+        self.key_cache_ttl_seconds = key_cache_ttl_seconds
+
+        # Wiederverwendbare Cipher-Kontexte (AESGCM ist zustandslos und threadsicher)
+        self._ciphers: Dict[bytes, AESGCM] = {}
+        # Abgeleitete Schlüssel: Cache-Key -> (Schlüssel, Ablaufzeit)
+        self._key_cache: Dict[bytes, Tuple[bytearray, float]] = {}
+        self._key_cache_lock = threading.Lock()
 
     @property
     def master_key(self) -> bytes:
@@ -75,24 +113,96 @@ class EncryptionService:
         key = kdf.derive(password.encode('utf-8'))
         return key, salt
 
-    def encrypt(self, data: bytes, associated_data: bytes = None) -> Tuple[bytes, bytes]:
+    def derive_key(self, password: str, salt: bytes = None) -> Tuple[bytes, bytes]:
+        """
+        Wie derive_key_from_password, aber mit Cache pro Session.
+
+        Wiederholte Ableitungen mit gleichem Passwort und Salt (z.B. in
+        Export- oder Backup-Schleifen) kosten nach dem ersten Aufruf kein
+        PBKDF2 mehr. Einträge verfallen nach key_cache_ttl_seconds und werden
+        dann überschrieben.
+
+        Args:
+            password: Das Benutzerpasswort
+            salt: Optionales Salt. Wird generiert wenn nicht angegeben.
+
+        Returns:
+            Tuple aus (abgeleiteter Schlüssel, Salt)
+        """
+        if salt is None or self.key_cache_ttl_seconds <= 0:
+            return self.derive_key_from_password(password, salt)
+
+        # Passwort nicht im Klartext als Cache-Key halten
+        cache_key = hashlib.sha256(
+            salt + struct.pack(">I", self.ITERATIONS) + password.encode('utf-8')
+        ).digest()
+        now = time.monotonic()
+
+        with self._key_cache_lock:
+            self._purge_expired_keys(now)
+            cached = self._key_cache.get(cache_key)
+            if cached:
+                return bytes(cached[0]), salt
+
+        key, salt = self.derive_key_from_password(password, salt)
+        with self._key_cache_lock:
+            self._key_cache[cache_key] = (bytearray(key), now + self.key_cache_ttl_seconds)
+        return key, salt
+
+    def _purge_expired_keys(self, now: float):
+        """Entfernt und überschreibt abgelaufene Schlüssel (Lock muss gehalten werden)"""
+        for cache_key in [k for k, (_, expires) in self._key_cache.items() if expires <= now]:
+            key_buffer, _ = self._key_cache.pop(cache_key)
+            self._ciphers.pop(bytes(key_buffer), None)
+            self._wipe(key_buffer)
+
+    @staticmethod
+    def _wipe(buffer: bytearray):
+        """Überschreibt einen Schlüsselpuffer mit Nullen"""
+        buffer[:] = b"\x00" * len(buffer)
+
+    def clear_key_cache(self):
+        """Verwirft alle abgeleiteten Schlüssel und Cipher-Kontexte (z.B. beim Logout)"""
+        with self._key_cache_lock:
+            for key_buffer, _ in self._key_cache.values():
+                self._wipe(key_buffer)
+            self._key_cache.clear()
+            self._ciphers.clear()
+
+    def _cipher(self, key: Optional[bytes] = None) -> AESGCM:
+        """
+        Liefert einen wiederverwendbaren AESGCM-Kontext für einen Schlüssel.
+
+        Args:
+            key: Schlüssel (Standard: Master-Key)
+        """
+        key = bytes(key) if key is not None else self.master_key
+        cipher = self._ciphers.get(key)
+        if cipher is None:
+            cipher = AESGCM(key)
+            with self._key_cache_lock:
+                self._ciphers[key] = cipher
+        return cipher
+
+    def encrypt(self, data: bytes, associated_data: bytes = None,
+                key: Optional[bytes] = None) -> Tuple[bytes, bytes]:
         """
         Verschlüsselt Daten mit AES-256-GCM.
 
         Args:
             data: Zu verschlüsselnde Daten
             associated_data: Optionale zusätzliche authentifizierte Daten (AAD)
+            key: Optionaler Schlüssel (Standard: Master-Key)
 
         Returns:
             Tuple aus (verschlüsselte Daten, Nonce)
         """
         nonce = os.urandom(self.NONCE_SIZE)
-        aesgcm = AESGCM(self.master_key)
-
-        ciphertext = aesgcm.encrypt(nonce, data, associated_data)
+        ciphertext = self._cipher(key).encrypt(nonce, data, associated_data)
         return ciphertext, nonce
 
-    def decrypt(self, ciphertext: bytes, nonce: bytes, associated_data: bytes = None) -> bytes:
+    def decrypt(self, ciphertext: bytes, nonce: bytes, associated_data: bytes = None,
+                key: Optional[bytes] = None) -> bytes:
         """
         Entschlüsselt Daten.
 
@@ -100,12 +210,12 @@ class EncryptionService:
             ciphertext: Verschlüsselte Daten
             nonce: Der bei der Verschlüsselung verwendete Nonce
             associated_data: Die gleichen AAD wie bei der Verschlüsselung
+            key: Optionaler Schlüssel (Standard: Master-Key)
 
         Returns:
             Entschlüsselte Daten
         """
-        aesgcm = AESGCM(self.master_key)
-        return aesgcm.decrypt(nonce, ciphertext, associated_data)
+        return self._cipher(key).decrypt(nonce, ciphertext, associated_data)
 
     def _normalize_filename_for_aad(self, filename: str) -> bytes:
         """
@@ -128,36 +238,215 @@ class EncryptionService:
 
         return normalized.encode('utf-8')
 
-    def encrypt_file(self, file_data: bytes, filename: str) -> Tuple[bytes, bytes]:
+    def encrypt_file(self, file_data: bytes, filename: str,
+                     key: Optional[bytes] = None) -> Tuple[bytes, bytes]:
         """
-        Verschlüsselt eine Datei.
+        Verschlüsselt eine Datei im segmentierten Format.
+
+        Für große Dateien encrypt_stream verwenden, um den Ciphertext direkt
+        auf die Platte zu schreiben.
 
         Args:
             file_data: Dateiinhalt
             filename: Dateiname (wird als AAD verwendet)
+            key: Optionaler Schlüssel (Standard: Master-Key)
 
         Returns:
-            Tuple aus (verschlüsselte Daten, Nonce)
+            Tuple aus (verschlüsselte Daten, Header als IV)
         """
-        # Dateiname als zusätzliche authentifizierte Daten (mit Unicode-Normalisierung)
-        aad = self._normalize_filename_for_aad(filename)
-        return self.encrypt(file_data, aad)
+        target = io.BytesIO()
+        header = self.encrypt_stream(io.BytesIO(file_data), target, filename, key=key)
+        return target.getvalue(), header
 
-    def decrypt_file(self, ciphertext: bytes, nonce: bytes, filename: str) -> bytes:
+    def decrypt_file(self, ciphertext: bytes, nonce: bytes, filename: str,
+                     key: Optional[bytes] = None) -> bytes:
         """
-        Entschlüsselt eine Datei.
+        Entschlüsselt eine Datei (segmentiertes oder Legacy-Format).
 
         Args:
             ciphertext: Verschlüsselte Datei
-            nonce: Der bei der Verschlüsselung verwendete Nonce
+            nonce: Der gespeicherte IV (Header bzw. Legacy-Nonce)
             filename: Dateiname (muss mit dem bei Verschlüsselung übereinstimmen)
+            key: Optionaler Schlüssel (Standard: Master-Key)
 
         Returns:
             Entschlüsselte Datei
         """
-        # Gleiche Normalisierung wie bei Verschlüsselung
+        if self.is_segmented(nonce):
+            return b"".join(self.iter_decrypt_stream(io.BytesIO(ciphertext), filename, nonce, key=key))
+
+        # Legacy: eine GCM-Nachricht, gleiche Normalisierung wie bei Verschlüsselung
         aad = self._normalize_filename_for_aad(filename)
-        return self.decrypt(ciphertext, nonce, aad)
+        return self.decrypt(ciphertext, nonce, aad, key=key)
+
+    # ==================== SEGMENTIERTES FORMAT ====================
+
+    @classmethod
+    def is_segmented(cls, nonce: Optional[bytes]) -> bool:
+        """Prüft, ob ein gespeicherter IV zum segmentierten Format gehört"""
+        return bool(nonce) and len(nonce) == cls.STREAM_HEADER_SIZE and \
+            bytes(nonce[:4]) == cls.STREAM_MAGIC
+
+    @classmethod
+    def _build_stream_header(cls, segment_size: int) -> bytes:
+        """Erstellt einen neuen Header mit zufälligem Nonce-Präfix"""
+        return (
+            cls.STREAM_MAGIC
+            + struct.pack(">BI", cls.STREAM_VERSION, segment_size)
+            + os.urandom(cls.STREAM_NONCE_PREFIX_SIZE)
+        )
+
+    @classmethod
+    def _parse_stream_header(cls, header: bytes) -> int:
+        """Prüft einen Header und gibt die Segmentgröße zurück"""
+        if not cls.is_segmented(header):
+            raise ValueError("Kein segmentiert verschlüsseltes Dokument")
+        version, segment_size = struct.unpack(">BI", header[4:9])
+        if version != cls.STREAM_VERSION:
+            raise ValueError(f"Nicht unterstützte Formatversion: {version}")
+        if segment_size <= 0:
+            raise ValueError("Ungültige Segmentgröße")
+        return segment_size
+
+    @classmethod
+    def _segment_nonce(cls, header: bytes, index: int, last: bool) -> bytes:
+        """Nonce eines Segments aus Präfix, Zähler und Letztes-Segment-Flag"""
+        if index >= 2 ** 32:
+            raise ValueError("Datei zu groß für das segmentierte Format")
+        return header[9:16] + struct.pack(">IB", index, 1 if last else 0)
+
+    @staticmethod
+    def _read_exact(source: BinaryIO, size: int) -> bytes:
+        """Liest bis zu size Bytes (auch bei kurzen Reads aus Streams)"""
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = source.read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _read_stream_header(self, source: BinaryIO, nonce: Optional[bytes]) -> Tuple[bytes, int]:
+        """Liest den Header am Dateianfang und gleicht ihn mit dem gespeicherten IV ab"""
+        header = self._read_exact(source, self.STREAM_HEADER_SIZE)
+        segment_size = self._parse_stream_header(header)
+        if nonce is not None and bytes(nonce) != header:
+            raise ValueError("Header passt nicht zum gespeicherten IV")
+        return header, segment_size
+
+    def encrypt_stream(self, source: BinaryIO, target: BinaryIO, filename: str,
+                       segment_size: int = None, key: Optional[bytes] = None) -> bytes:
+        """
+        Verschlüsselt einen Datenstrom segmentweise direkt in ein Ziel.
+
+        Es liegt immer nur ein Segment im Speicher.
+
+        Args:
+            source: Lesbarer Klartext-Stream
+            target: Schreibbarer Stream (z.B. geöffnete Datei)
+            filename: Dateiname (wird als AAD verwendet)
+            segment_size: Klartextbytes pro Segment
+            key: Optionaler Schlüssel (Standard: Master-Key)
+
+        Returns:
+            Header (als encryption_iv zu speichern)
+        """
+        segment_size = segment_size or self.STREAM_SEGMENT_SIZE
+        header = self._build_stream_header(segment_size)
+        aad = header + self._normalize_filename_for_aad(filename)
+        aesgcm = self._cipher(key)
+
+        target.write(header)
+        index = 0
+        chunk = self._read_exact(source, segment_size)
+        while True:
+            # Ein volles Segment ist nur dann das letzte, wenn danach nichts mehr kommt
+            next_chunk = self._read_exact(source, segment_size) if len(chunk) == segment_size else b""
+            last = not next_chunk
+            target.write(aesgcm.encrypt(self._segment_nonce(header, index, last), chunk, aad))
+            if last:
+                break
+            chunk = next_chunk
+            index += 1
+
+        return header
+
+    def iter_decrypt_stream(self, source: BinaryIO, filename: str,
+                            nonce: Optional[bytes] = None,
+                            key: Optional[bytes] = None) -> Iterator[bytes]:
+        """
+        Entschlüsselt einen segmentierten Stream sequentiell.
+
+        Jedes Segment wird vor der Ausgabe authentifiziert; der Stream muss
+        nicht seekbar sein (z.B. für die Auslieferung an den Browser).
+
+        Args:
+            source: Lesbarer Stream mit Header und Segmenten
+            filename: Dateiname (muss mit dem bei Verschlüsselung übereinstimmen)
+            nonce: Gespeicherter IV zum Abgleich mit dem Header (optional)
+            key: Optionaler Schlüssel (Standard: Master-Key)
+
+        Yields:
+            Klartext je Segment
+        """
+        header, segment_size = self._read_stream_header(source, nonce)
+        aad = header + self._normalize_filename_for_aad(filename)
+        aesgcm = self._cipher(key)
+        encrypted_size = segment_size + self.TAG_SIZE
+
+        index = 0
+        chunk = self._read_exact(source, encrypted_size)
+        while True:
+            next_chunk = self._read_exact(source, encrypted_size) if len(chunk) == encrypted_size else b""
+            last = not next_chunk
+            yield aesgcm.decrypt(self._segment_nonce(header, index, last), chunk, aad)
+            if last:
+                break
+            chunk = next_chunk
+            index += 1
+
+    def open_decrypted(self, source: BinaryIO, nonce: bytes, filename: str,
+                       key: Optional[bytes] = None) -> BinaryIO:
+        """
+        Öffnet eine verschlüsselte Datei als lesbaren, seekbaren Klartext-Stream.
+
+        Segmentierte Dateien werden nur in den tatsächlich gelesenen Bereichen
+        entschlüsselt (z.B. einzelne Seiten), Legacy-Dateien vollständig.
+
+        Args:
+            source: Seekbarer Stream der verschlüsselten Datei
+            nonce: Gespeicherter IV (Header bzw. Legacy-Nonce)
+            filename: Dateiname (wird als AAD verwendet)
+            key: Optionaler Schlüssel (Standard: Master-Key)
+
+        Returns:
+            Dateiähnliches Objekt mit Klartext
+        """
+        if self.is_segmented(nonce):
+            return io.BufferedReader(SegmentedDecryptReader(self, source, nonce, filename, key=key))
+        return io.BytesIO(self.decrypt_file(source.read(), nonce, filename, key=key))
+
+    def decrypt_range(self, source: BinaryIO, nonce: bytes, filename: str,
+                      offset: int, length: int, key: Optional[bytes] = None) -> bytes:
+        """
+        Liest einen Klartextbereich, ohne die ganze Datei zu entschlüsseln.
+
+        Args:
+            source: Seekbarer Stream der verschlüsselten Datei
+            nonce: Gespeicherter IV
+            filename: Dateiname (wird als AAD verwendet)
+            offset: Startposition im Klartext
+            length: Anzahl Bytes
+            key: Optionaler Schlüssel (Standard: Master-Key)
+
+        Returns:
+            Klartext des Bereichs (kürzer am Dateiende)
+        """
+        reader = self.open_decrypted(source, nonce, filename, key=key)
+        reader.seek(offset)
+        return reader.read(length)
 
     @staticmethod
     def hash_password(password: str) -> str:
@@ -203,6 +492,78 @@ class EncryptionService:
         return self.decrypt(ciphertext, nonce).decode('utf-8')
 
 
+class SegmentedDecryptReader(io.RawIOBase):
+    """
+    Seekbarer Klartext-Stream über einer segmentiert verschlüsselten Datei.
+
+    Entschlüsselt und authentifiziert nur die Segmente, die gelesen werden;
+    das zuletzt gelesene Segment wird zwischengespeichert.
+    """
+
+    def __init__(self, service: EncryptionService, source: BinaryIO, nonce: bytes, filename: str,
+                 key: Optional[bytes] = None):
+        self._service = service
+        self._source = source
+        self._header, self._segment_size = service._read_stream_header(source, nonce)
+        self._aad = self._header + service._normalize_filename_for_aad(filename)
+        self._aesgcm = service._cipher(key)
+        self._encrypted_size = self._segment_size + service.TAG_SIZE
+
+        body_size = source.seek(0, io.SEEK_END) - service.STREAM_HEADER_SIZE
+        self._segment_count = max(1, -(-body_size // self._encrypted_size))
+        self._size = body_size - self._segment_count * service.TAG_SIZE
+        if self._size < 0:
+            raise ValueError("Verschlüsselte Datei ist abgeschnitten")
+
+        self._position = 0
+        self._cached_index = None
+        self._cached_plain = b""
+
+    @property
+    def size(self) -> int:
+        """Klartextgröße in Bytes"""
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError("Negative Position")
+        self._position = offset
+        return self._position
+
+    def _segment(self, index: int) -> bytes:
+        """Entschlüsselt ein einzelnes Segment"""
+        if index != self._cached_index:
+            last = index == self._segment_count - 1
+            self._source.seek(self._service.STREAM_HEADER_SIZE + index * self._encrypted_size)
+            chunk = self._service._read_exact(self._source, self._encrypted_size)
+            nonce = self._service._segment_nonce(self._header, index, last)
+            self._cached_plain = self._aesgcm.decrypt(nonce, chunk, self._aad)
+            self._cached_index = index
+        return self._cached_plain
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self._size:
+            return 0
+        index, offset = divmod(self._position, self._segment_size)
+        data = self._segment(index)[offset:offset + len(buffer)]
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
 def get_encryption_service() -> EncryptionService:
     """Singleton für den Verschlüsselungsservice"""
     if 'encryption_service' not in st.session_state:
@@ -0,0 +1,372 @@
+"""
+Schlüsselrotation für verschlüsselte Dokumente
+
+Verschlüsselt alle Dokumentdateien vom alten auf den neuen Master-Key um:
+- Dokumente werden in Batches nach ID abgearbeitet, die Dateien parallel in
+  einem Prozess-Pool entschlüsselt und neu verschlüsselt
+- Jede Datei wird in eine temporäre Datei geschrieben und per Rename ersetzt
+- encryption_iv und der Checkpoint (KeyRotationJob) werden pro Batch in
+  einer Transaktion aktualisiert
+- Nach einem Abbruch setzt ein neuer Lauf mit denselben Schlüsseln am
+  Checkpoint fort
+
+Neu verschlüsselte Dateien nutzen immer das segmentierte Format. Dessen
+Header steht auch in der Datei, daher werden Dateien, die vor einem Absturz
+bereits ersetzt, aber noch nicht in der DB eingetragen wurden, beim
+Fortsetzen erkannt und nur noch nachgetragen.
+
+Verwendung:
+    OLD_ENCRYPTION_KEY=<base64> NEW_ENCRYPTION_KEY=<base64> \\
+        python -m services.key_rotation_service [--workers 4] [--batch-size 50]
+"""
+import argparse
+import base64
+import hashlib
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Dokumente pro Batch (= pro DB-Transaktion)
+ROTATION_BATCH_SIZE = 50
+# Maximal gespeicherte IDs fehlgeschlagener Dokumente
+ROTATION_MAX_FAILED_IDS = 500
+
+
+def _rotate_document_file(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Verschlüsselt eine Dokumentdatei neu (läuft im Worker-Prozess).
+
+    Args:
+        task: document_id, file_path, nonce, filename, old_key, new_key
+
+    Returns:
+        Dict mit status (done/skipped/failed), iv, bytes, error
+    """
+    from services.encryption import EncryptionService
+
+    result = {"document_id": task["document_id"], "status": "failed", "iv": None, "bytes": 0, "error": None}
+    file_path = task["file_path"] or ""
+
+    if file_path.startswith("cloud://"):
+        result["error"] = "Cloud-Speicher wird nicht rotiert"
+        return result
+
+    path = Path(file_path)
+    if not path.exists():
+        result["status"] = "skipped"
+        result["error"] = "Datei nicht gefunden"
+        return result
+
+    nonce = bytes(task["nonce"])
+    filename = task["filename"]
+    old_service = EncryptionService(master_key=task["old_key"], key_cache_ttl_seconds=0)
+    new_service = EncryptionService(master_key=task["new_key"], key_cache_ttl_seconds=0)
+    temp_path = path.with_name(path.name + ".rotating")
+
+    try:
+        with open(path, 'rb') as f:
+            file_header = f.read(EncryptionService.STREAM_HEADER_SIZE)
+
+        # Bereits ersetzt, aber nicht mehr in der DB eingetragen (Absturz im letzten Batch)
+        if EncryptionService.is_segmented(file_header) and file_header != nonce:
+            try:
+                with open(path, 'rb') as source:
+                    for _ in new_service.iter_decrypt_stream(source, filename, file_header):
+                        pass
+                result.update(status="done", iv=file_header, bytes=path.stat().st_size)
+                return result
+            except Exception:
+                pass  # Kein Treffer mit neuem Schlüssel - regulär rotieren
+
+        with open(path, 'rb') as source, open(temp_path, 'wb') as target:
+            plaintext = old_service.open_decrypted(source, nonce, filename)
+            header = new_service.encrypt_stream(plaintext, target, filename)
+            target.flush()
+            os.fsync(target.fileno())
+
+        os.replace(temp_path, path)
+        result.update(status="done", iv=header, bytes=path.stat().st_size)
+
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
+
+    return result
+
+
+class KeyRotationService:
+    """Fortsetzbare Neu-Verschlüsselung aller Dokumente mit einem neuen Master-Key"""
+
+    def __init__(self, old_key: bytes, new_key: bytes,
+                 batch_size: int = ROTATION_BATCH_SIZE,
+                 max_workers: Optional[int] = None,
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            old_key: Bisheriger Master-Key
+            new_key: Neuer Master-Key
+            batch_size: Dokumente pro Batch/Transaktion
+            max_workers: Prozesse für Ver-/Entschlüsselung (Standard: CPU-Anzahl)
+            progress_callback: Wird nach jedem Batch mit get_progress() aufgerufen
+        """
+        if old_key == new_key:
+            raise ValueError("Alter und neuer Schlüssel sind identisch")
+        self.old_key = old_key
+        self.new_key = new_key
+        self.batch_size = batch_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.progress_callback = progress_callback
+
+        self.job_id: Optional[int] = None
+        self._run_started: Optional[float] = None
+        self._run_documents = 0
+        self._run_bytes = 0
+
+    @staticmethod
+    def key_fingerprint(key: bytes) -> str:
+        """Fingerabdruck eines Schlüssels zur Zuordnung des Checkpoints"""
+        return hashlib.sha256(key).hexdigest()[:16]
+
+    def _pending_query(self, session, after_id: int):
+        """Verschlüsselte Dokumente nach dem Checkpoint"""
+        from database.models import Document
+
+        return session.query(Document).filter(
+            Document.is_encrypted == True,
+            Document.encryption_iv != None,
+            Document.id > after_id
+        )
+
+    def _get_or_create_job(self):
+        """Setzt einen abgebrochenen Lauf mit denselben Schlüsseln fort oder legt einen neuen an"""
+        from database.db import get_db
+        from database.extended_models import KeyRotationJob
+
+        old_fp = self.key_fingerprint(self.old_key)
+        new_fp = self.key_fingerprint(self.new_key)
+
+        with get_db() as session:
+            job = session.query(KeyRotationJob).filter(
+                KeyRotationJob.old_key_fingerprint == old_fp,
+                KeyRotationJob.new_key_fingerprint == new_fp,
+                KeyRotationJob.status.in_(["running", "interrupted", "failed"])
+            ).order_by(KeyRotationJob.id.desc()).first()
+
+            if job:
+                logger.info(f"Setze Schlüsselrotation {job.id} ab Dokument {job.last_document_id} fort")
+                job.status = "running"
+                job.error_message = None
+            else:
+                job = KeyRotationJob(
+                    old_key_fingerprint=old_fp,
+                    new_key_fingerprint=new_fp,
+                    status="running",
+                    last_document_id=0,
+                    documents_total=self._pending_query(session, 0).count(),
+                    failed_document_ids=[]
+                )
+                session.add(job)
+
+            session.flush()
+            self.job_id = job.id
+            return job.last_document_id or 0
+
+    def _next_batch(self, after_id: int) -> List[Dict[str, Any]]:
+        """Lädt den nächsten Batch (nur benötigte Spalten)"""
+        from database.db import get_db
+        from database.models import Document
+
+        with get_db() as session:
+            rows = self._pending_query(session, after_id).with_entities(
+                Document.id, Document.file_path, Document.filename, Document.encryption_iv
+            ).order_by(Document.id).limit(self.batch_size).all()
+
+        return [
+            {
+                "document_id": row.id,
+                "file_path": row.file_path,
+                "nonce": bytes(row.encryption_iv),
+                "filename": row.filename,
+                "old_key": self.old_key,
+                "new_key": self.new_key
+            }
+            for row in rows
+        ]
+
+    def _commit_batch(self, last_id: int, results: List[Dict[str, Any]]):
+        """Trägt neue IVs und den Checkpoint in einer Transaktion ein"""
+        from database.db import get_db
+        from database.models import Document
+        from database.extended_models import KeyRotationJob
+
+        done = [r for r in results if r["status"] == "done"]
+        failed = [r for r in results if r["status"] == "failed"]
+        skipped = [r for r in results if r["status"] == "skipped"]
+
+        with get_db() as session:
+            if done:
+                session.bulk_update_mappings(Document, [
+                    {"id": r["document_id"], "encryption_iv": r["iv"]} for r in done
+                ])
+
+            job = session.get(KeyRotationJob, self.job_id)
+            job.last_document_id = last_id
+            job.documents_done = (job.documents_done or 0) + len(done)
+            job.documents_failed = (job.documents_failed or 0) + len(failed)
+            job.documents_skipped = (job.documents_skipped or 0) + len(skipped)
+            job.bytes_processed = (job.bytes_processed or 0) + sum(r["bytes"] for r in done)
+            if failed:
+                failed_ids = list(job.failed_document_ids or [])
+                failed_ids.extend(r["document_id"] for r in failed)
+                job.failed_document_ids = failed_ids[:ROTATION_MAX_FAILED_IDS]
+
+        for r in failed:
+            logger.warning(f"Dokument {r['document_id']} nicht rotiert: {r['error']}")
+
+    def get_progress(self) -> Dict[str, Any]:
+        """
+        Fortschritt, Durchsatz und Restzeit des Jobs.
+
+        Durchsatz und Restzeit beziehen sich auf den aktuellen Lauf, damit
+        Pausen zwischen Abbruch und Fortsetzung nicht einfließen.
+        """
+        from database.db import get_db
+        from database.extended_models import KeyRotationJob
+
+        with get_db() as session:
+            job = session.get(KeyRotationJob, self.job_id)
+            processed = (job.documents_done or 0) + (job.documents_failed or 0) + (job.documents_skipped or 0)
+            progress = {
+                "job_id": job.id,
+                "status": job.status,
+                "documents_total": job.documents_total or 0,
+                "documents_processed": processed,
+                "documents_done": job.documents_done or 0,
+                "documents_failed": job.documents_failed or 0,
+                "documents_skipped": job.documents_skipped or 0,
+                "bytes_processed": job.bytes_processed or 0,
+                "last_document_id": job.last_document_id,
+            }
+
+        elapsed = time.perf_counter() - self._run_started if self._run_started else 0
+        docs_per_second = self._run_documents / elapsed if elapsed > 0 else 0
+        remaining = max(0, progress["documents_total"] - processed)
+        progress.update({
+            "elapsed_seconds": round(elapsed, 1),
+            "documents_per_second": round(docs_per_second, 2),
+            "mb_per_second": round(self._run_bytes / elapsed / 1024 / 1024, 2) if elapsed > 0 else 0,
+            "eta_seconds": round(remaining / docs_per_second) if docs_per_second > 0 else None,
+        })
+        return progress
+
+    def _finish_job(self, status: str, error: str = None):
+        """Setzt den Endstatus des Jobs"""
+        from database.db import get_db
+        from database.extended_models import KeyRotationJob
+
+        with get_db() as session:
+            job = session.get(KeyRotationJob, self.job_id)
+            job.status = status
+            job.error_message = error
+            if status == "completed":
+                job.completed_at = datetime.now()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Führt die Rotation aus bzw. setzt sie fort.
+
+        Nach erfolgreichem Abschluss muss der neue Schlüssel als Master-Key
+        hinterlegt werden; Dokumente mit Fehlern (failed_document_ids) sind
+        weiterhin mit dem alten Schlüssel verschlüsselt.
+
+        Returns:
+            Abschließender Fortschritt (siehe get_progress)
+        """
+        last_id = self._get_or_create_job()
+        self._run_started = time.perf_counter()
+        self._run_documents = 0
+        self._run_bytes = 0
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                while True:
+                    tasks = self._next_batch(last_id)
+                    if not tasks:
+                        break
+
+                    results = list(pool.map(_rotate_document_file, tasks))
+                    last_id = tasks[-1]["document_id"]
+                    self._commit_batch(last_id, results)
+
+                    self._run_documents += len(results)
+                    self._run_bytes += sum(r["bytes"] for r in results)
+
+                    progress = self.get_progress()
+                    eta = progress["eta_seconds"]
+                    logger.info(
+                        f"Schlüsselrotation: {progress['documents_processed']}/{progress['documents_total']} "
+                        f"({progress['documents_per_second']} Dok/s, {progress['mb_per_second']} MB/s, "
+                        f"Restzeit {f'{eta}s' if eta is not None else '?'})"
+                    )
+                    if self.progress_callback:
+                        self.progress_callback(progress)
+
+        except KeyboardInterrupt:
+            self._finish_job("interrupted")
+            raise
+        except Exception as e:
+            logger.exception(f"Schlüsselrotation abgebrochen: {e}")
+            self._finish_job("failed", str(e))
+            return self.get_progress()
+
+        self._finish_job("completed")
+        return self.get_progress()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Kommandozeilen-Einstieg (Schlüssel als Base64 in Umgebungsvariablen)"""
+    parser = argparse.ArgumentParser(description="Dokumente mit neuem Master-Key neu verschlüsseln")
+    parser.add_argument("--workers", type=int, default=None, help="Prozesse (Standard: CPU-Anzahl)")
+    parser.add_argument("--batch-size", type=int, default=ROTATION_BATCH_SIZE,
+                        help="Dokumente pro Transaktion (Standard: %(default)s)")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    try:
+        old_key = base64.b64decode(os.environ["OLD_ENCRYPTION_KEY"])
+        new_key = base64.b64decode(os.environ["NEW_ENCRYPTION_KEY"])
+    except KeyError as e:
+        logger.error(f"Umgebungsvariable {e} fehlt")
+        return 2
+
+    from database.db import init_db
+    init_db()
+
+    progress = KeyRotationService(
+        old_key, new_key, batch_size=args.batch_size, max_workers=args.workers
+    ).run()
+
+    logger.info(
+        f"Status {progress['status']}: {progress['documents_done']} rotiert, "
+        f"{progress['documents_failed']} fehlgeschlagen, {progress['documents_skipped']} übersprungen"
+    )
+    return 0 if progress["status"] == "completed" and progress["documents_failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Mehrfach-Mustersuche (Aho-Corasick) für die Dokumentenklassifikation
+
+Alle Muster werden einmalig in einen Automaten übersetzt; ein Text wird
+danach in einem einzigen Durchlauf nach sämtlichen Mustern durchsucht.
+Die Treffer entsprechen exakt ``muster in text`` (Teilstring-Semantik).
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class KeywordAutomaton:
+    """Aho-Corasick-Automat über Kleinbuchstaben-Muster"""
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        # Zustand 0 ist die Wurzel
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        self._patterns = set()
+        self._has_empty = False
+        self._built = False
+
+        for pattern in patterns:
+            self.add(pattern)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, pattern: str):
+        """Fügt ein Muster hinzu (vor build() aufrufen)"""
+        if pattern is None or pattern in self._patterns:
+            return
+        if self._built:
+            raise RuntimeError("Automat ist bereits kompiliert")
+
+        self._patterns.add(pattern)
+        if pattern == '':
+            # '' in text ist immer wahr
+            self._has_empty = True
+            return
+
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._out[state] = self._out[state] + (pattern,)
+
+    def build(self) -> 'KeywordAutomaton':
+        """Berechnet die Fehlerübergänge (Breitensuche über den Trie)"""
+        goto, fail, out = self._goto, self._fail, self._out
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(ch, 0)
+                fail[next_state] = target if target != next_state else 0
+
+                # Ausgaben des Suffix-Zustands übernehmen
+                if out[fail[next_state]]:
+                    out[next_state] = out[next_state] + out[fail[next_state]]
+
+        self._built = True
+        return self
+
+    def scan(self, text: str) -> Dict[str, int]:
+        """
+        Durchsucht den Text in einem Durchlauf.
+
+        Args:
+            text: Zu durchsuchender Text (bereits kleingeschrieben)
+
+        Returns:
+            Dictionary Muster -> Endposition des ersten Vorkommens.
+            ``hits.get(p, inf) <= n`` entspricht damit ``p in text[:n]``.
+        """
+        if not self._built:
+            self.build()
+
+        hits: Dict[str, int] = {'': 0} if self._has_empty else {}
+        if not text or len(self._goto) == 1:
+            return hits
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for pos, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for pattern in out[state]:
+                    if pattern not in hits:
+                        hits[pattern] = pos
+        return hits
+
+    def scan_naive(self, text: str) -> Dict[str, int]:
+        """Referenz-Implementierung mit einzelnen Teilstring-Suchen (für Benchmarks)"""
+        hits = {}
+        for pattern in self._patterns:
+            if pattern in text:
+                hits[pattern] = text.find(pattern) + len(pattern)
+        return hits
+
+    def get_stats(self) -> Dict:
+        """Gibt Größenangaben des Automaten zurück"""
+        return {
+            'patterns': len(self._patterns),
+            'states': len(self._goto),
+            'built': self._built
+        }
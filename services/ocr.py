@@ -2,14 +2,120 @@
 OCR-Service für Texterkennung aus Dokumenten und Bildern
 """
 import io
+import os
 import re
+import time
 import base64
-from typing import Dict, List, Optional, Tuple
+import hashlib
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Iterator
 from datetime import datetime
 from PIL import Image
 import streamlit as st
 
 from config.settings import get_settings
+from utils.pdf_utils import PdfSource, open_pdf_document, read_pdf_source, hash_pdf_source
+
+logger = logging.getLogger(__name__)
+
+# Ab dieser Seitenzahl lohnt sich der Prozess-Pool für die Seiten-OCR
+PARALLEL_OCR_MIN_PAGES = 3
+
+# Tesseract-Ergebnisse unterhalb dieser Konfidenz gehen an die KI-OCR
+TESSERACT_MIN_CONFIDENCE = 0.3
+
+# Version des OCR-Verfahrens - erhöhen, wenn sich Ergebnisse ändern würden
+OCR_CACHE_VERSION = 1
+OCR_DEFAULT_LANG = 'deu+eng'
+OCR_TARGET_MAX_PX = 3000
+
+# Seiten mit mehr eingebettetem Text werden nicht gerastert
+EMBEDDED_TEXT_MIN_CHARS = 50
+
+# Verarbeitungspfade einer PDF-Seite (für die Instrumentierung)
+PAGE_ROUTES = ('cache', 'text', 'ocr', 'error')
+
+
+def _render_page_gray(page, target_max_px: int) -> Image.Image:
+    """
+    Rendert eine PyMuPDF-Seite als Graustufenbild.
+
+    Große Seiten (z.B. Baupläne) werden auf target_max_px herunterskaliert.
+    """
+    import fitz  # PyMuPDF
+
+    rect = page.rect
+
+    # Dynamische Skalierung basierend auf Seitengröße
+    # PyMuPDF: 1.0 entspricht 72 DPI
+    zoom = target_max_px / max(rect.width, rect.height)
+    zoom = min(zoom, 6.0)  # Cap bei ~432 DPI (6 * 72)
+    zoom = max(zoom, 1.0)  # Minimum 72 DPI
+
+    mat = fitz.Matrix(zoom, zoom).prerotate(page.rotation)
+    # Direkt in Graustufen rendern (spart RAM, oft bessere Erkennung)
+    pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    del pix
+    return img
+
+
+def _tesseract_text(image: Image.Image, lang: str) -> Tuple[str, float]:
+    """Tesseract-OCR mit gemittelter Wort-Konfidenz (0.0 - 1.0)"""
+    import pytesseract
+
+    # OCR mit Detailinformationen
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+
+    # Text zusammenbauen und Konfidenz berechnen
+    text_parts = []
+    confidences = []
+
+    for i, conf in enumerate(data['conf']):
+        if int(float(conf)) > 0:  # Nur Wörter mit Konfidenz > 0
+            text_parts.append(data['text'][i])
+            confidences.append(int(float(conf)))
+
+    text = ' '.join(text_parts)
+    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+
+    return text, avg_confidence / 100.0
+
+
+# Zustand der OCR-Worker-Prozesse (pro Prozess einmal geöffnet)
+_worker_doc = None
+
+
+def _init_ocr_worker(source: PdfSource):
+    """Initialisiert einen Worker: PDF einmal öffnen, Tesseract single-threaded"""
+    global _worker_doc
+
+    # Mehrere Tesseract-Instanzen sollen sich nicht gegenseitig ausbremsen
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    _worker_doc = open_pdf_document(source)
+
+
+def _stream_worker_page(page_num: int, target_max_px: int, lang: str,
+                        min_chars: int) -> Tuple[int, str, float, str, Optional[str]]:
+    """
+    Verarbeitet eine Seite im Worker: eingebetteter Text oder Tesseract-OCR.
+
+    Returns:
+        (Seitennummer, Text, Konfidenz, Pfad 'text'/'ocr', Fehlermeldung oder None)
+    """
+    try:
+        page = _worker_doc[page_num]
+        text = page.get_text() or ""
+        if len(text.strip()) > min_chars:
+            return page_num, text, 1.0, 'text', None
+
+        img = _render_page_gray(page, target_max_px)
+        text, confidence = _tesseract_text(img, lang)
+        del img
+        return page_num, text, confidence, 'ocr', None
+    except Exception as e:
+        return page_num, "", 0.0, 'error', str(e)[:100]
 
 
 class OCRService:
@@ -18,6 +124,9 @@ class OCRService:
     def __init__(self):
         self.settings = get_settings()
         self._tesseract_available = None
+        # Seiten pro Verarbeitungspfad (letztes Dokument / seit Start)
+        self._last_page_routes = {route: 0 for route in PAGE_ROUTES}
+        self._page_route_totals = {route: 0 for route in PAGE_ROUTES}
 
     @property
     def tesseract_available(self) -> bool:
@@ -108,31 +217,46 @@ class OCRService:
         # Fallback: KI-basierte OCR
         return self._extract_with_ai(image)  # Original-Bild für bessere KI-Erkennung
 
+    def extract_text_from_image_bytes(self, image_bytes: bytes, content_hash: Optional[str] = None,
+                                      use_cache: bool = True, **kwargs) -> Tuple[str, float]:
+        """
+        Extrahiert Text aus Bilddaten mit Cache-Prüfung vor dem Dekodieren.
+
+        Args:
+            image_bytes: Bilddatei als Bytes
+            content_hash: SHA-256 des Inhalts (wird sonst berechnet)
+            use_cache: OCR-Cache verwenden
+            **kwargs: Weitere Parameter für extract_text_from_image
+
+        Returns:
+            Tuple aus (extrahierter Text, Konfidenz)
+        """
+        cache = self._get_cache() if use_cache else None
+        settings_key = self._ocr_settings_key('image', kwargs.get('lang', OCR_DEFAULT_LANG))
+
+        if cache:
+            content_hash = content_hash or hashlib.sha256(image_bytes).hexdigest()
+            _, known = cache.get_ocr_pages(content_hash, settings_key)
+            if 0 in known:
+                return known[0]
+
+        image = Image.open(io.BytesIO(image_bytes))
+        text, confidence = self.extract_text_from_image(image, **kwargs)
+
+        if cache and self._is_cacheable(text, confidence):
+            cache.set_ocr_page(content_hash, settings_key, 0, text, confidence)
+            cache.set_ocr_page_count(content_hash, settings_key, 1)
+
+        return text, confidence
+
     def _extract_with_tesseract(self, image: Image.Image, lang: str) -> Tuple[str, float]:
         """Tesseract-basierte Texterkennung"""
-        import pytesseract
-
-        # OCR mit Detailinformationen
         try:
-            data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+            return _tesseract_text(image, lang)
         except Exception as e:
             st.warning(f"Tesseract-Fehler: {e}")
             return "", 0.0
 
-        # Text zusammenbauen und Konfidenz berechnen
-        text_parts = []
-        confidences = []
-
-        for i, conf in enumerate(data['conf']):
-            if int(conf) > 0:  # Nur Wörter mit Konfidenz > 0
-                text_parts.append(data['text'][i])
-                confidences.append(int(conf))
-
-        text = ' '.join(text_parts)
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-
-        return text, avg_confidence / 100.0
-
     def _extract_with_ai(self, image: Image.Image) -> Tuple[str, float]:
         """
         KI-basierte Texterkennung (GPT-4 Vision oder Claude).
@@ -242,17 +366,69 @@ Der Text ist auf Deutsch."""
 
         return response.content[0].text
 
-    def extract_text_from_pdf(self, pdf_bytes: bytes) -> List[Tuple[str, float]]:
+    def _get_cache(self):
+        """Cache-Service für OCR-Ergebnisse (None wenn nicht verfügbar)"""
+        try:
+            from services.cache_service import get_cache_service
+            return get_cache_service()
+        except Exception:
+            return None
+
+    @staticmethod
+    def _ocr_settings_key(kind: str = 'pdf', lang: str = OCR_DEFAULT_LANG,
+                          target_max_px: int = OCR_TARGET_MAX_PX) -> str:
+        """Fingerabdruck der OCR-Einstellungen für Cache-Keys"""
+        return f"v{OCR_CACHE_VERSION}-{kind}-{lang}-{target_max_px}"
+
+    @staticmethod
+    def _is_cacheable(text: str, confidence: float) -> bool:
+        """Fehlerseiten und leere Ergebnisse werden nicht gecacht (erneuter Versuch)"""
+        return confidence > 0 and not (text.startswith('[Seite ') and ' Fehler: ' in text)
+
+    def extract_text_from_pdf(self, pdf_bytes: bytes, content_hash: Optional[str] = None,
+                              use_cache: bool = True) -> List[Tuple[str, float]]:
         """
         Extrahiert Text aus allen Seiten eines PDFs.
 
+        Die Entscheidung fällt pro Seite: eingebetteter Text (PyMuPDF-Textebene)
+        wird direkt übernommen, nur Seiten ohne Text werden gerastert und per
+        OCR erkannt. Ergebnisse werden pro Seite unter Inhalts-Hash,
+        Seitenindex und OCR-Einstellungen gecacht und vor jedem Rendern geprüft.
+
         Args:
             pdf_bytes: PDF als Bytes
+            content_hash: SHA-256 des Inhalts (wird sonst berechnet)
+            use_cache: OCR-Cache verwenden
 
         Returns:
             Liste von (Text, Konfidenz) pro Seite
         """
-        results = []
+        return [
+            (text, confidence)
+            for _, text, confidence, _ in self._iter_pdf_pages(
+                pdf_bytes, content_hash, use_cache, None, OCR_TARGET_MAX_PX
+            )
+        ]
+
+    def _extract_text_from_pdf(self, pdf_bytes: bytes,
+                               known_pages: Optional[Dict[int, Tuple[str, float]]] = None
+                               ) -> List[Tuple[str, float, str]]:
+        """
+        Fallback ohne PyMuPDF-Textebene: PyPDF2-Text und Seiten-OCR.
+
+        Auch hier wird pro Seite entschieden - nur Seiten ohne eingebetteten
+        Text werden an die Bild-OCR übergeben.
+
+        Args:
+            pdf_bytes: PDF als Bytes
+            known_pages: Bereits bekannte Seitenergebnisse, die nicht erneut
+                         gerendert werden
+
+        Returns:
+            Liste von (Text, Konfidenz, Pfad) pro Seite
+        """
+        known_pages = dict(known_pages or {})
+        text_pages = set()
 
         try:
             from PyPDF2 import PdfReader
@@ -264,11 +440,11 @@ Der Text ist auf Deutsch."""
             except (PdfReadError, Exception) as pdf_err:
                 # PDF ist beschädigt oder unvollständig - versuche Bild-OCR
                 logger.warning(f"PDF-Lesefehler: {pdf_err}, versuche Bild-OCR...")
-                results = self._ocr_pdf_images(pdf_bytes)
+                results = self._ocr_pdf_images(pdf_bytes, known_pages=known_pages)
                 if results:
-                    return results
+                    return self._with_routes(results, known_pages, text_pages)
                 # Fallback: Leeres Ergebnis mit Fehlermeldung
-                return [("", 0.0)]
+                return [("", 0.0, 'error')]
 
             # Prüfen ob PDF verschlüsselt ist
             if reader.is_encrypted:
@@ -278,109 +454,345 @@ Der Text ist auf Deutsch."""
                 except Exception:
                     # Verschlüsseltes PDF - versuche OCR auf Bilder
                     logger.info("Verschlüsseltes PDF - verwende Bildverarbeitung...")
-                    results = self._ocr_pdf_images(pdf_bytes)
-                    return results if results else []
+                    results = self._ocr_pdf_images(pdf_bytes, known_pages=known_pages)
+                    return self._with_routes(results, known_pages, text_pages)
 
-            for page in reader.pages:
+            page_count = len(reader.pages)
+            for page_num, page in enumerate(reader.pages):
+                if page_num in known_pages:
+                    continue
                 try:
                     text = page.extract_text()
-                    if text and len(text.strip()) > 50:
-                        # Eingebetteter Text gefunden
-                        results.append((text, 1.0))
-                    else:
-                        # Kein Text - OCR nötig
-                        results.append(("", 0.0))
+                    if text and len(text.strip()) > EMBEDDED_TEXT_MIN_CHARS:
+                        # Eingebetteter Text gefunden - Seite nicht rastern
+                        known_pages[page_num] = (text, 1.0)
+                        text_pages.add(page_num)
                 except Exception:
-                    results.append(("", 0.0))
+                    pass
 
-            # Wenn zu wenig Text gefunden, OCR auf Bilder anwenden
-            if all(conf < 0.5 for _, conf in results) or not results:
-                results = self._ocr_pdf_images(pdf_bytes)
+            if page_count and len(known_pages) >= page_count:
+                results = [known_pages[i] for i in range(page_count)]
+            else:
+                # Nur die Seiten ohne Text per OCR erkennen
+                results = self._ocr_pdf_images(pdf_bytes, known_pages=known_pages)
 
         except Exception as e:
             # Bei jedem Fehler versuche OCR auf Bilder
             error_msg = str(e).lower()
             if "pycryptodome" in error_msg or "aes" in error_msg or "encrypt" in error_msg:
                 st.info("📄 PDF erfordert spezielle Verarbeitung - verwende Bildverarbeitung...")
-                results = self._ocr_pdf_images(pdf_bytes)
             else:
                 st.warning(f"PDF-Verarbeitungsfehler: {e}")
-                # Fallback: Versuche trotzdem OCR
-                results = self._ocr_pdf_images(pdf_bytes)
-
-        return results
-
-    def _ocr_pdf_images(self, pdf_bytes: bytes, target_max_px: int = 3000) -> List[Tuple[str, float]]:
+            # Fallback: Versuche trotzdem OCR
+            results = self._ocr_pdf_images(pdf_bytes, known_pages=known_pages)
+
+        return self._with_routes(results, known_pages, text_pages)
+
+    def _with_routes(self, results: List[Tuple[str, float]],
+                     known_pages: Dict[int, Tuple[str, float]],
+                     text_pages: set) -> List[Tuple[str, float, str]]:
+        """Ergänzt Seitenergebnisse um den Verarbeitungspfad"""
+        routed = []
+        for page_num, (text, confidence) in enumerate(results):
+            if page_num in text_pages:
+                route = 'text'
+            elif page_num in known_pages:
+                route = 'cache'
+            elif not self._is_cacheable(text, 1.0):
+                route = 'error'
+            else:
+                route = 'ocr'
+            routed.append((text, confidence, route))
+        return routed
+
+    def iter_text_from_pdf(self, source: PdfSource, content_hash: Optional[str] = None,
+                           use_cache: bool = True, workers: Optional[int] = None,
+                           target_max_px: int = OCR_TARGET_MAX_PX
+                           ) -> Iterator[Tuple[int, str, float]]:
         """
-        Konvertiert PDF zu Bildern und führt OCR durch.
+        Extrahiert Text seitenweise als Generator.
 
-        Verwendet PyMuPDF (fitz) für speichereffiziente Verarbeitung.
-        Große Seiten (z.B. Baupläne) werden automatisch herunterskaliert.
+        Jede Seite wird einzeln verarbeitet und sofort geliefert: Seiten mit
+        eingebettetem Text direkt, alle anderen werden gerastert und per OCR
+        erkannt. Es liegen nie mehr als die gerade bearbeiteten Seitenbilder
+        im Speicher, daher eignet sich der Generator auch für sehr große Scans.
 
         Args:
-            pdf_bytes: PDF als Bytes
-            target_max_px: Maximale Kantenlänge in Pixeln (Standard: 3000)
-
-        Returns:
-            Liste von (Text, Konfidenz) pro Seite
+            source: PDF als Bytes, Dateipfad oder mmap
+            content_hash: SHA-256 des Inhalts (wird sonst blockweise berechnet)
+            use_cache: OCR-Cache verwenden
+            workers: Anzahl OCR-Prozesse (None = laut Einstellungen, 1 = seriell)
+            target_max_px: Maximale Kantenlänge beim Rastern
+
+        Yields:
+            (Seitenindex ab 0, Text, Konfidenz)
         """
-        results = []
-
-        # Versuche zuerst PyMuPDF (speichereffizienter)
-        try:
-            import fitz  # PyMuPDF
-
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-
-            for page_num in range(len(doc)):
-                try:
-                    page = doc[page_num]
-                    rect = page.rect
+        for page_num, text, confidence, _ in self._iter_pdf_pages(
+            source, content_hash, use_cache, workers, target_max_px
+        ):
+            yield page_num, text, confidence
 
-                    # Dynamische Skalierung basierend auf Seitengröße
-                    # PyMuPDF: 1.0 entspricht 72 DPI
-                    zoom = target_max_px / max(rect.width, rect.height)
-                    zoom = min(zoom, 6.0)  # Cap bei ~432 DPI (6 * 72)
-                    zoom = max(zoom, 1.0)  # Minimum 72 DPI
+    def get_page_route_stats(self) -> Dict:
+        """
+        Gibt an, wie viele Seiten welchen Verarbeitungspfad genommen haben.
 
-                    mat = fitz.Matrix(zoom, zoom).prerotate(page.rotation)
-                    pix = page.get_pixmap(matrix=mat, alpha=False)  # alpha=False spart RAM
+        Returns:
+            Dictionary mit 'last' (letztes Dokument) und 'total' (seit Start),
+            jeweils mit Seitenzahlen für cache, text, ocr und error
+        """
+        return {
+            'last': dict(self._last_page_routes),
+            'total': dict(self._page_route_totals)
+        }
 
-                    # Zu PIL Image konvertieren
-                    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    def _iter_pdf_pages(self, source: PdfSource, content_hash: Optional[str],
+                        use_cache: bool, workers: Optional[int],
+                        target_max_px: int) -> Iterator[Tuple[int, str, float, str]]:
+        """Seitengenerator mit Pfadangabe und Zählung pro Pfad"""
+        self._last_page_routes = {route: 0 for route in PAGE_ROUTES}
+        start = time.perf_counter()
+
+        for page_num, text, confidence, route in self._iter_pdf_pages_routed(
+            source, content_hash, use_cache, workers, target_max_px
+        ):
+            self._last_page_routes[route] += 1
+            self._page_route_totals[route] += 1
+            yield page_num, text, confidence, route
+
+        self._last_page_routes['seconds'] = round(time.perf_counter() - start, 3)
+        logger.info(
+            "PDF-Textextraktion: " + ", ".join(
+                f"{route}={self._last_page_routes[route]}" for route in PAGE_ROUTES
+            ) + f" ({self._last_page_routes['seconds']}s)"
+        )
 
-                    # Für OCR in Graustufen konvertieren (spart RAM, oft bessere Erkennung)
-                    img_gray = img.convert("L")
+    def _iter_pdf_pages_routed(self, source: PdfSource, content_hash: Optional[str],
+                               use_cache: bool, workers: Optional[int],
+                               target_max_px: int) -> Iterator[Tuple[int, str, float, str]]:
+        """Seitengenerator mit Pfadangabe ('cache', 'text', 'ocr', 'error')"""
+        cache = self._get_cache() if use_cache else None
+        settings_key = self._ocr_settings_key(target_max_px=target_max_px)
+        known_pages = {}
+
+        # Cache vor dem Öffnen prüfen - vollständige Treffer ohne Rendern
+        if cache:
+            content_hash = content_hash or hash_pdf_source(source)
+            page_count, known_pages = cache.get_ocr_pages(content_hash, settings_key)
+            if page_count and len(known_pages) == page_count:
+                for page_num in range(page_count):
+                    text, confidence = known_pages[page_num]
+                    yield page_num, text, confidence, 'cache'
+                return
 
-                    # OCR durchführen
-                    text, confidence = self.extract_text_from_image(img_gray, preprocess=False)
-                    results.append((text, confidence))
+        try:
+            doc = open_pdf_document(source)
+            if doc.needs_pass and not doc.authenticate(""):
+                doc.close()
+                raise ValueError("PDF ist passwortgeschützt")
+        except Exception as e:
+            # Ohne PyMuPDF oder bei beschädigten PDFs: PyPDF2-Pfad mit Fallbacks
+            if not isinstance(e, ImportError):
+                logger.warning(f"PDF konnte nicht seitenweise geöffnet werden: {e}")
+            results = self._extract_text_from_pdf(read_pdf_source(source), known_pages)
+            if cache and results:
+                cache.set_ocr_page_count(content_hash, settings_key, len(results))
+            for page_num, (text, confidence, route) in enumerate(results):
+                if cache and route in ('text', 'ocr') and self._is_cacheable(text, confidence):
+                    cache.set_ocr_page(content_hash, settings_key, page_num, text, confidence)
+                yield page_num, text, confidence, route
+            return
+
+        with doc:
+            page_count = len(doc)
+
+            if cache:
+                # Seitenzahl sofort speichern, damit auch ein abgebrochener
+                # Durchlauf verwertbare Teilergebnisse hinterlässt
+                cache.set_ocr_page_count(content_hash, settings_key, page_count)
+
+            pages = self._iter_doc_pages(source, doc, page_count, known_pages, workers, target_max_px)
+
+            for page_num, text, confidence, route in pages:
+                if cache and route in ('text', 'ocr') and self._is_cacheable(text, confidence):
+                    cache.set_ocr_page(content_hash, settings_key, page_num, text, confidence)
+                yield page_num, text, confidence, route
+
+    def _iter_doc_pages(self, source: PdfSource, doc, page_count: int,
+                        known_pages: Dict[int, Tuple[str, float]],
+                        workers: Optional[int], target_max_px: int
+                        ) -> Iterator[Tuple[int, str, float, str]]:
+        """Seiten eines geöffneten PDFs seriell oder im Prozess-Pool verarbeiten"""
+        if workers is None:
+            workers = self._ocr_workers()
+
+        if (workers > 1 and self.tesseract_available
+                and page_count - len(known_pages) >= PARALLEL_OCR_MIN_PAGES):
+            return self._iter_pdf_pages_parallel(
+                source, doc, page_count, known_pages, workers, target_max_px
+            )
+        return self._iter_pdf_pages_serial(doc, page_count, known_pages, target_max_px)
+
+    def _process_page(self, page, target_max_px: int,
+                      lang: str = OCR_DEFAULT_LANG) -> Tuple[str, float, str]:
+        """Eingebetteter Text oder Rastern + OCR für eine einzelne Seite"""
+        text = page.get_text() or ""
+        if len(text.strip()) > EMBEDDED_TEXT_MIN_CHARS:
+            return text, 1.0, 'text'
+
+        img = _render_page_gray(page, target_max_px)
+        text, confidence = self.extract_text_from_image(img, lang=lang, preprocess=False)
+        del img
+        return text, confidence, 'ocr'
+
+    def _iter_pdf_pages_serial(self, doc, page_count: int,
+                               known_pages: Dict[int, Tuple[str, float]],
+                               target_max_px: int) -> Iterator[Tuple[int, str, float, str]]:
+        """Seiten nacheinander im aktuellen Prozess verarbeiten"""
+        for page_num in range(page_count):
+            if page_num in known_pages:
+                text, confidence = known_pages[page_num]
+                yield page_num, text, confidence, 'cache'
+                continue
+            try:
+                text, confidence, route = self._process_page(doc[page_num], target_max_px)
+                yield page_num, text, confidence, route
+            except Exception as page_error:
+                yield page_num, f"[Seite {page_num + 1} Fehler: {str(page_error)[:100]}]", 0.0, 'error'
+
+    def _iter_pdf_pages_parallel(self, source: PdfSource, doc, page_count: int,
+                                 known_pages: Dict[int, Tuple[str, float]],
+                                 workers: int, target_max_px: int,
+                                 lang: str = OCR_DEFAULT_LANG
+                                 ) -> Iterator[Tuple[int, str, float, str]]:
+        """
+        Seiten im Prozess-Pool verarbeiten und in Seitenreihenfolge liefern.
 
-                    # Speicher freigeben
-                    del pix, img, img_gray
+        Es werden höchstens so viele Seiten vorausgeplant, wie das RAM-Budget
+        erlaubt; die nächste Seite wird erst eingereiht, wenn die älteste
+        geliefert wurde.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        max_in_flight = self._max_pages_in_flight(workers, target_max_px)
+        workers = max(1, min(workers, max_in_flight, page_count - len(known_pages)))
+
+        # Worker öffnen Pfade selbst, Bytes werden einmal pro Worker übergeben
+        worker_source = source if isinstance(source, (str, os.PathLike, bytes)) else read_pdf_source(source)
+
+        window = deque()
+        in_flight = 0
+        next_page = 0
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_ocr_worker,
+            initargs=(worker_source,)
+        ) as pool:
+            while window or next_page < page_count:
+                while next_page < page_count and in_flight < max_in_flight:
+                    if next_page in known_pages:
+                        window.append((next_page, None))
+                    else:
+                        window.append((next_page, pool.submit(
+                            _stream_worker_page, next_page, target_max_px, lang, EMBEDDED_TEXT_MIN_CHARS
+                        )))
+                        in_flight += 1
+                    next_page += 1
+
+                page_num, future = window.popleft()
+                if future is None:
+                    text, confidence = known_pages[page_num]
+                    yield page_num, text, confidence, 'cache'
+                    continue
+
+                in_flight -= 1
+                _, text, confidence, route, error = future.result()
+                if error:
+                    yield page_num, f"[Seite {page_num + 1} Fehler: {error}]", 0.0, 'error'
+                    continue
+
+                if route == 'ocr' and (not text.strip() or confidence <= TESSERACT_MIN_CONFIDENCE):
+                    # KI-Fallback wie in extract_text_from_image
+                    try:
+                        img = _render_page_gray(doc[page_num], target_max_px)
+                        text, confidence = self._extract_with_ai(img)
+                        del img
+                    except Exception as page_error:
+                        yield page_num, f"[Seite {page_num + 1} Fehler: {str(page_error)[:100]}]", 0.0, 'error'
+                        continue
+
+                yield page_num, text, confidence, route
+
+    def _max_pages_in_flight(self, workers: int, target_max_px: int) -> int:
+        """Wie viele Seiten gleichzeitig gerendert werden dürfen (RAM-Budget)"""
+        # Graustufenseite (1 Byte/Pixel) plus Tesseract-Arbeitsspeicher (~4x)
+        page_bytes = target_max_px * target_max_px * 5
+        budget_mb = getattr(self.settings, 'ocr_memory_budget_mb', 512) or 512
+        return max(1, min(workers * 2, (budget_mb * 1024 * 1024) // page_bytes))
+
+    def _ocr_workers(self) -> int:
+        """Anzahl der Prozesse für die Seiten-OCR laut Einstellungen"""
+        workers = getattr(self.settings, 'ocr_parallel_workers', 0) or 0
+        if workers <= 0:
+            # Automatisch: alle Kerne bis auf einen, höchstens 8
+            workers = min(8, max(1, (os.cpu_count() or 1) - 1))
+        return workers
+
+    def _ocr_pdf_images(self, pdf_bytes: bytes, target_max_px: int = OCR_TARGET_MAX_PX,
+                        known_pages: Optional[Dict[int, Tuple[str, float]]] = None
+                        ) -> List[Tuple[str, float]]:
+        """
+        Bild-OCR für den PyPDF2-Fallback.
 
-                except Exception as page_error:
-                    # Einzelne Seite fehlgeschlagen, weiter mit nächster
-                    results.append((f"[Seite {page_num + 1} Fehler: {str(page_error)[:100]}]", 0.0))
+        Nutzt denselben Seitengenerator wie der Hauptpfad; nur wenn PyMuPDF
+        fehlt oder das PDF nicht öffnen kann, wird per pdf2image gerastert.
 
-            doc.close()
-            return results
+        Args:
+            pdf_bytes: PDF als Bytes
+            target_max_px: Maximale Kantenlänge in Pixeln (Standard: 3000)
+            known_pages: Bereits bekannte Seitenergebnisse (z.B. eingebetteter
+                         Text oder Cache), die nicht erneut gerendert werden
 
+        Returns:
+            Liste von (Text, Konfidenz) pro Seite
+        """
+        known_pages = known_pages or {}
+        try:
+            doc = open_pdf_document(pdf_bytes)
         except ImportError:
-            # PyMuPDF nicht verfügbar, Fallback auf pdf2image
-            pass
+            doc = None
         except Exception as e:
-            # PyMuPDF Fehler, versuche Fallback
-            if results:
-                return results
+            logger.warning(f"PyMuPDF konnte das PDF nicht öffnen, verwende pdf2image: {e}")
+            doc = None
+
+        if doc is None:
+            return self._ocr_pdf2image_pages(pdf_bytes, target_max_px, known_pages)
+
+        with doc:
+            return [
+                (text, confidence)
+                for _, text, confidence, _ in self._iter_doc_pages(
+                    pdf_bytes, doc, len(doc), known_pages, None, target_max_px
+                )
+            ]
 
-        # Fallback: pdf2image (weniger speichereffizient)
+    def _ocr_pdf2image_pages(self, pdf_bytes: bytes, target_max_px: int,
+                             known_pages: Dict[int, Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """Seiten-OCR ohne PyMuPDF: seitenweise per pdf2image rastern"""
+        results = []
         try:
-            from pdf2image import convert_from_bytes
-
-            # Niedrigere DPI für große Dokumente
-            images = convert_from_bytes(pdf_bytes, dpi=200, fmt='jpeg')
-            for image in images:
+            from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+            page_count = int(pdfinfo_from_bytes(pdf_bytes).get('Pages', 0))
+            for page_num in range(page_count):
+                if page_num in known_pages:
+                    results.append(known_pages[page_num])
+                    continue
+
+                # Seitenweise konvertieren, niedrigere DPI für große Dokumente
+                image = convert_from_bytes(
+                    pdf_bytes, dpi=200, fmt='jpeg', first_page=page_num + 1, last_page=page_num + 1
+                )[0]
                 # Größe prüfen und ggf. reduzieren
                 max_dim = max(image.size)
                 if max_dim > target_max_px:
@@ -399,6 +811,47 @@ Der Text ist auf Deutsch."""
 
         return results
 
+    def benchmark_pdf_ocr(self, pdf_bytes: bytes, workers: Optional[int] = None,
+                          target_max_px: int = 3000) -> Dict:
+        """
+        Vergleicht die serielle mit der parallelen Seitenverarbeitung
+        (derselbe Seitengenerator wie in der App, ohne Cache).
+
+        Args:
+            pdf_bytes: PDF als Bytes
+            workers: Anzahl Prozesse für den parallelen Lauf
+            target_max_px: Maximale Kantenlänge in Pixeln
+
+        Returns:
+            Dictionary mit Laufzeiten, Seiten/s und Speedup
+        """
+        workers = workers or self._ocr_workers()
+
+        def run(run_workers: int) -> Tuple[List[Tuple[str, float]], float]:
+            start = time.perf_counter()
+            pages = [
+                (text, confidence)
+                for _, text, confidence, _ in self._iter_pdf_pages(
+                    pdf_bytes, None, False, run_workers, target_max_px
+                )
+            ]
+            return pages, time.perf_counter() - start
+
+        serial, serial_seconds = run(1)
+        parallel, parallel_seconds = run(workers)
+
+        pages = len(serial)
+        return {
+            'pages': pages,
+            'workers': workers,
+            'serial_seconds': round(serial_seconds, 2),
+            'parallel_seconds': round(parallel_seconds, 2),
+            'serial_pages_per_second': round(pages / serial_seconds, 2) if serial_seconds else 0.0,
+            'parallel_pages_per_second': round(pages / parallel_seconds, 2) if parallel_seconds else 0.0,
+            'speedup': round(serial_seconds / parallel_seconds, 2) if parallel_seconds else 0.0,
+            'identical_text': [t for t, _ in serial] == [t for t, _ in parallel]
+        }
+
     def extract_metadata(self, text: str) -> Dict:
         """
         Extrahiert strukturierte Metadaten aus Text.
@@ -12,12 +12,249 @@ warnings.filterwarnings('ignore', category=SyntaxWarning, module=r'whoosh')
 warnings.filterwarnings('ignore', category=DeprecationWarning, module=r'whoosh\..*')
 warnings.filterwarnings('ignore', category=DeprecationWarning, module=r'whoosh')
 
-from typing import List, Dict, Optional
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Iterable, Tuple, Callable
 from datetime import datetime
 import streamlit as st
 
 from config.settings import INDEX_DIR
 
+logger = logging.getLogger(__name__)
+
+# Standardwerte für den Bulk-Indexierungsmodus
+BULK_CHUNK_SIZE = 500       # Dokumente pro DB-Abrufblock
+BULK_WRITER_LIMIT_MB = 256  # RAM-Puffer des Whoosh-Writers pro Prozess
+
+# Maximale Anzahl gleichzeitig offener Index-Handles im Prozess (LRU)
+MAX_OPEN_INDEXES = 32
+
+# Markierungsdatei im Index-Verzeichnis: alle Dokumente haben Lookup-Werte
+LOOKUP_FIELDS_MARKER = "lookup_fields.ok"
+
+
+def _lookup_fields() -> Dict:
+    """
+    Strukturierte Felder für exakte Lookups (ohne Query-Parser und Scoring).
+
+    Beträge werden als Integer-Cent in einem NUMERIC-Trie-Feld abgelegt, sodass
+    Bereichsabfragen mit Toleranz in O(log n) beantwortet werden. IBANs und
+    Vertragsnummern werden normalisiert als exakte Keywords gespeichert.
+    """
+    from whoosh.fields import NUMERIC, KEYWORD
+
+    return {
+        'amount_cents': NUMERIC(bits=64, signed=True, stored=False),
+        'iban_keys': KEYWORD(commas=True, scorable=False),
+        'contract_keys': KEYWORD(commas=True, scorable=False),
+    }
+
+
+def _to_cents(amount) -> Optional[int]:
+    """Wandelt einen Betrag in Integer-Cent um"""
+    try:
+        return int(round(float(amount) * 100))
+    except (TypeError, ValueError):
+        return None
+
+
+def _normalize_key(value: str) -> str:
+    """Normalisiert IBANs/Vertragsnummern (ohne Leerzeichen, Großschreibung)"""
+    return ''.join(str(value).split()).upper()
+
+
+class _IndexHandle:
+    """Geteilter Index-Handle eines Benutzers inkl. wiederverwendbarem Searcher"""
+
+    def __init__(self, index, lookup_backfill_needed: bool = False):
+        self.index = index
+        self.searcher = None
+        # Schützt nur Öffnen/Aktualisieren des Searchers; gesucht wird ohne Lock
+        self.lock = threading.RLock()
+        # Anzahl laufender Suchen - verdrängte Handles schließen erst danach
+        self.active = 0
+        self.last_used = time.time()
+        # True, solange bestehende Dokumente noch keine Lookup-Werte haben
+        # (Lookups nutzen bis dahin die Textfelder)
+        self.lookup_backfill_needed = lookup_backfill_needed
+        self.lookup_backfill_started = False
+        # Verdrängte Handles öffnen keinen neuen Searcher mehr
+        self.closed = False
+
+    def close(self):
+        """Schließt den Searcher des Handles endgültig (nach der letzten laufenden Suche)"""
+        with self.lock:
+            self.closed = True
+            if self.active == 0:
+                self._close_searcher()
+
+    def release(self):
+        """Meldet das Ende einer Suche"""
+        with self.lock:
+            self.active -= 1
+            if self.closed and self.active == 0:
+                self._close_searcher()
+
+    def _close_searcher(self):
+        if self.searcher is not None:
+            try:
+                self.searcher.close()
+            except Exception:
+                pass
+            self.searcher = None
+
+
+class IndexRegistry:
+    """
+    Prozessweite Registry der Whoosh-Index-Handles.
+
+    Pro Index-Verzeichnis existiert genau ein geöffneter Index mit einem
+    Searcher, der über alle Sessions und Tabs wiederverwendet und erst bei
+    einer neuen Index-Generation aktualisiert wird. Inaktive Mandanten werden
+    nach LRU verdrängt.
+    """
+
+    def __init__(self, max_open: int = MAX_OPEN_INDEXES):
+        self.max_open = max_open
+        self._handles: 'OrderedDict[str, _IndexHandle]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Ein Öffner pro Index-Verzeichnis (Migration nur einmal ausführen)
+        self._open_locks: Dict[str, threading.Lock] = {}
+        self._stats = {
+            'hits': 0,
+            'opens': 0,
+            'searcher_opens': 0,
+            'searcher_reuses': 0,
+            'refreshes': 0,
+            'evictions': 0
+        }
+
+    def get(self, index_dir: str, opener: Callable[[], _IndexHandle]) -> _IndexHandle:
+        """
+        Gibt den Handle für ein Index-Verzeichnis zurück.
+
+        Args:
+            index_dir: Index-Verzeichnis (Schlüssel)
+            opener: Öffnet/erstellt den Index, falls noch kein Handle existiert
+
+        Returns:
+            Geteilter Index-Handle
+        """
+        key = str(index_dir)
+        handle = self._lookup(key)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            open_lock = self._open_locks.setdefault(key, threading.Lock())
+
+        # Öffnen (inkl. Migration) ohne Registry-Lock, damit andere
+        # Mandanten nicht warten müssen; derselbe Index wird nur einmal geöffnet
+        with open_lock:
+            handle = self._lookup(key)
+            if handle is not None:
+                return handle
+
+            handle = opener()
+            with self._lock:
+                self._handles[key] = handle
+                self._stats['opens'] += 1
+                handle.last_used = time.time()
+                evicted = self._pop_lru()
+
+        # Schließen außerhalb des Locks
+        for old in evicted:
+            old.close()
+        return handle
+
+    def _lookup(self, key: str) -> Optional[_IndexHandle]:
+        """Vorhandener Handle (zählt als Treffer) oder None"""
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                self._handles.move_to_end(key)
+                self._stats['hits'] += 1
+                handle.last_used = time.time()
+            return handle
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _pop_lru(self) -> List[_IndexHandle]:
+        """Entfernt die am längsten ungenutzten Handles (Lock muss gehalten werden)"""
+        evicted = []
+        while len(self._handles) > self.max_open:
+            _, handle = self._handles.popitem(last=False)
+            evicted.append(handle)
+            self._stats['evictions'] += 1
+        return evicted
+
+    @contextmanager
+    def searcher(self, handle: _IndexHandle):
+        """
+        Liefert den wiederverwendbaren Searcher eines Handles.
+
+        Der Searcher wird nur neu geöffnet, wenn sich die Index-Generation
+        seit dem letzten Zugriff geändert hat. Der Handle-Lock gilt nur für
+        das Holen/Aktualisieren; Whoosh-Searcher erlauben parallele Lesezugriffe.
+
+        Raises:
+            RuntimeError: wenn der Handle inzwischen verdrängt wurde
+        """
+        with handle.lock:
+            if handle.closed:
+                raise RuntimeError("Index-Handle wurde verdrängt")
+            if handle.searcher is None:
+                handle.searcher = handle.index.searcher()
+                event = 'searcher_opens'
+            elif not handle.searcher.up_to_date():
+                handle.searcher = handle.searcher.refresh()
+                event = 'refreshes'
+            else:
+                event = 'searcher_reuses'
+            handle.active += 1
+            handle.last_used = time.time()
+            searcher = handle.searcher
+
+        self._count(event)
+        try:
+            yield searcher
+        finally:
+            handle.release()
+
+    def evict(self, index_dir: str):
+        """Entfernt den Handle eines Index-Verzeichnisses (z.B. vor dem Neuaufbau)"""
+        with self._lock:
+            handle = self._handles.pop(str(index_dir), None)
+            if handle is not None:
+                self._stats['evictions'] += 1
+        if handle is not None:
+            handle.close()
+
+    def get_stats(self) -> Dict:
+        """Gibt Statistiken zu Treffern, Öffnungen und Aktualisierungen zurück"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_indexes'] = len(self._handles)
+            stats['open_searchers'] = sum(
+                1 for h in self._handles.values() if h.searcher is not None
+            )
+            stats['max_open'] = self.max_open
+        return stats
+
+
+# Prozessweite Registry (geteilt über alle Streamlit-Sessions)
+_index_registry = IndexRegistry()
+
+
+def get_index_registry() -> IndexRegistry:
+    """Gibt die prozessweite Index-Registry zurück"""
+    return _index_registry
+
 
 class SearchService:
     """Volltext-Suchservice für Dokumente"""
@@ -25,7 +262,6 @@ class SearchService:
     def __init__(self, user_id: int):
         self.user_id = user_id
         self.index_dir = INDEX_DIR / str(user_id)
-        self._index = None
         self._index_available = True
         try:
             self._ensure_index()
@@ -37,42 +273,194 @@ class SearchService:
     def _ensure_index(self):
         """Stellt sicher dass der Index existiert"""
         try:
-            os.makedirs(self.index_dir, exist_ok=True)
-
-            from whoosh.fields import Schema, TEXT, ID, NUMERIC, DATETIME, KEYWORD
-            from whoosh.index import create_in, open_dir, exists_in
-
-            # Schema definieren
-            schema = Schema(
-                id=ID(stored=True, unique=True),
-                title=TEXT(stored=True),
-                content=TEXT(stored=True),
-                sender=TEXT(stored=True),
-                category=KEYWORD(stored=True),
-                folder_id=ID(stored=True),
-                document_date=DATETIME(stored=True),
-                amounts=TEXT(stored=True),  # Komma-getrennte Beträge
-                ibans=TEXT(stored=True),    # Komma-getrennte IBANs
-                contract_numbers=TEXT(stored=True),
-                created_at=DATETIME(stored=True)
-            )
-
-            if exists_in(self.index_dir):
-                self._index = open_dir(self.index_dir)
-            else:
-                self._index = create_in(self.index_dir, schema)
+            handle = _index_registry.get(self.index_dir, self._open_index)
             self._index_available = True
+            self._start_lookup_backfill(handle)
         except Exception as e:
             self._index_available = False
-            self._index = None
+
+    def _open_index(self) -> _IndexHandle:
+        """Öffnet oder erstellt den Index (nur beim ersten Zugriff im Prozess)"""
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        from whoosh.fields import Schema, TEXT, ID, NUMERIC, DATETIME, KEYWORD
+        from whoosh.index import create_in, open_dir, exists_in
+
+        # Schema definieren
+        schema = Schema(
+            id=ID(stored=True, unique=True),
+            title=TEXT(stored=True),
+            content=TEXT(stored=False),  # Volltext liegt im Content-Store
+            sender=TEXT(stored=True),
+            category=KEYWORD(stored=True),
+            folder_id=ID(stored=True),
+            document_date=DATETIME(stored=True),
+            amounts=TEXT(stored=True),  # Komma-getrennte Beträge
+            ibans=TEXT(stored=True),    # Komma-getrennte IBANs
+            contract_numbers=TEXT(stored=True),
+            created_at=DATETIME(stored=True),
+            **_lookup_fields()
+        )
+
+        if exists_in(self.index_dir):
+            index = open_dir(self.index_dir)
+            self._migrate_lookup_fields(index)
+            return _IndexHandle(index, not self._lookup_fields_complete(index))
+
+        index = create_in(self.index_dir, schema)
+        self._mark_lookup_fields_complete()
+        return _IndexHandle(index)
+
+    def _migrate_lookup_fields(self, index):
+        """Ergänzt fehlende Lookup-Felder in einem bestehenden Index"""
+        missing = {
+            name: field for name, field in _lookup_fields().items()
+            if name not in index.schema
+        }
+        if not missing:
+            return
+
+        writer = index.writer()
+        for name, field in missing.items():
+            writer.add_field(name, field)
+        writer.commit()
+        logger.info(f"Lookup-Felder für Benutzer {self.user_id} ergänzt")
+
+    def _lookup_fields_complete(self, index) -> bool:
+        """
+        Ob alle Dokumente Lookup-Werte haben.
+
+        Der Zustand liegt als Markierungsdatei im Index-Verzeichnis, damit
+        ein unterbrochenes Nachfüllen auch nach einem Neustart erkannt wird.
+        """
+        if (self.index_dir / LOOKUP_FIELDS_MARKER).exists():
+            return True
+        if index.doc_count() == 0:
+            self._mark_lookup_fields_complete()
+            return True
+        return False
+
+    def _mark_lookup_fields_complete(self):
+        (self.index_dir / LOOKUP_FIELDS_MARKER).touch()
+
+    def _start_lookup_backfill(self, handle: _IndexHandle):
+        """Füllt fehlende Lookup-Werte einmalig im Hintergrund nach"""
+        with handle.lock:
+            if not handle.lookup_backfill_needed or handle.lookup_backfill_started:
+                return
+            handle.lookup_backfill_started = True
+
+        threading.Thread(
+            target=self._backfill_lookup_fields, args=(handle,),
+            name=f"lookup-backfill-{self.user_id}", daemon=True
+        ).start()
+
+    def _backfill_lookup_fields(self, handle: _IndexHandle):
+        """Indexiert alle Dokumente neu, damit bestehende Einträge Lookup-Werte erhalten"""
+        try:
+            stats = self.bulk_index_documents(self._iter_user_documents(), optimize=False)
+        except Exception as e:
+            # Nächster Versuch beim nächsten Öffnen; bis dahin Textsuche
+            logger.warning(f"Nachfüllen der Lookup-Felder für Benutzer {self.user_id} fehlgeschlagen: {e}")
+            with handle.lock:
+                handle.lookup_backfill_started = False
+            return
+
+        self._mark_lookup_fields_complete()
+        handle.lookup_backfill_needed = False
+        logger.info(f"Lookup-Felder für Benutzer {self.user_id} nachgefüllt ({stats['indexed']} Dokumente)")
+
+    def _handle(self) -> Optional[_IndexHandle]:
+        """Holt den geteilten Index-Handle aus der Registry"""
+        if not self._index_available:
+            return None
+        try:
+            handle = _index_registry.get(self.index_dir, self._open_index)
+        except Exception:
+            self._index_available = False
+            return None
+        self._start_lookup_backfill(handle)
+        return handle
+
+    @property
+    def _index(self):
+        handle = self._handle()
+        return handle.index if handle else None
 
     @property
     def index(self):
-        """Lazy-Loading des Index"""
-        if self._index is None and self._index_available:
-            self._ensure_index()
+        """Geteilter Index aus der prozessweiten Registry"""
         return self._index
 
+    @property
+    def _lookup_backfill_needed(self) -> bool:
+        handle = self._handle()
+        return bool(handle and handle.lookup_backfill_needed)
+
+    @contextmanager
+    def _searcher(self):
+        """Wiederverwendbarer Searcher des geteilten Index-Handles"""
+        handle = self._handle()
+        if handle is not None and handle.closed:
+            # Zwischenzeitlich verdrängt - neuen Handle holen
+            handle = self._handle()
+        if handle is None:
+            raise RuntimeError("Suchindex nicht verfügbar")
+        with _index_registry.searcher(handle) as searcher:
+            yield searcher
+
+    @staticmethod
+    def _build_fields(document_id: int, data: Dict) -> Dict:
+        """Wandelt Dokumentdaten in Whoosh-Felder um"""
+        # Beträge und IBANs als durchsuchbare Strings
+        amounts_str = ','.join(str(a) for a in data.get('amounts', []))
+        ibans_str = ','.join(data.get('ibans', []))
+        contracts_str = ','.join(data.get('contract_numbers', []))
+
+        cents = [c for c in (_to_cents(a) for a in data.get('amounts', [])) if c is not None]
+        iban_keys = ','.join(_normalize_key(i) for i in data.get('ibans', []) if i)
+        contract_keys = ','.join(_normalize_key(c) for c in data.get('contract_numbers', []) if c)
+
+        fields = dict(
+            id=str(document_id),
+            title=data.get('title', ''),
+            content=data.get('content', ''),
+            sender=data.get('sender', ''),
+            category=data.get('category', ''),
+            folder_id=str(data.get('folder_id', '')),
+            document_date=data.get('document_date'),
+            amounts=amounts_str,
+            ibans=ibans_str,
+            contract_numbers=contracts_str,
+            created_at=data.get('created_at', datetime.now())
+        )
+
+        # Lookup-Felder nur setzen, wenn Werte vorhanden sind
+        if cents:
+            fields['amount_cents'] = cents
+        if iban_keys:
+            fields['iban_keys'] = iban_keys
+        if contract_keys:
+            fields['contract_keys'] = contract_keys
+
+        return fields
+
+    @staticmethod
+    def _document_to_data(doc) -> Dict:
+        """Extrahiert die zu indexierenden Daten aus einem Document"""
+        return {
+            'title': doc.title or doc.filename,
+            'content': doc.ocr_text or '',
+            'sender': doc.sender or '',
+            'category': doc.category or '',
+            'folder_id': doc.folder_id,
+            'document_date': doc.document_date,
+            'amounts': [doc.invoice_amount] if doc.invoice_amount else [],
+            'ibans': [doc.iban] if doc.iban else [],
+            'contract_numbers': [doc.contract_number] if doc.contract_number else [],
+            'created_at': doc.created_at
+        }
+
     def index_document(self, document_id: int, data: Dict):
         """
         Fügt ein Dokument zum Index hinzu.
@@ -88,31 +476,92 @@ class SearchService:
             from whoosh.writing import AsyncWriter
 
             writer = AsyncWriter(self.index)
-
-            # Beträge und IBANs als durchsuchbare Strings
-            amounts_str = ','.join(str(a) for a in data.get('amounts', []))
-            ibans_str = ','.join(data.get('ibans', []))
-            contracts_str = ','.join(data.get('contract_numbers', []))
-
-            writer.update_document(
-                id=str(document_id),
-                title=data.get('title', ''),
-                content=data.get('content', ''),
-                sender=data.get('sender', ''),
-                category=data.get('category', ''),
-                folder_id=str(data.get('folder_id', '')),
-                document_date=data.get('document_date'),
-                amounts=amounts_str,
-                ibans=ibans_str,
-                contract_numbers=contracts_str,
-                created_at=data.get('created_at', datetime.now())
-            )
-
+            writer.update_document(**self._build_fields(document_id, data))
             writer.commit()
         except Exception:
             # Indexierungsfehler ignorieren - Dokument wurde trotzdem gespeichert
             pass
 
+    def bulk_index_documents(
+        self,
+        documents: Iterable[Tuple[int, Dict]],
+        procs: int = 1,
+        multisegment: bool = False,
+        limitmb: int = BULK_WRITER_LIMIT_MB,
+        optimize: bool = True,
+        replace: bool = True
+    ) -> Dict:
+        """
+        Indexiert viele Dokumente über einen einzigen Writer.
+
+        Im Gegensatz zu index_document() wird nur einmal committet, sodass
+        kein Segment pro Dokument entsteht.
+
+        Args:
+            documents: Iterable von (document_id, data)-Tupeln
+            procs: Anzahl Writer-Prozesse (>1 aktiviert Whoosh-Multiprocessing)
+            multisegment: Bei procs > 1 ein Segment pro Prozess behalten
+                          statt am Ende zusammenzuführen (schneller)
+            limitmb: RAM-Puffer pro Writer-Prozess in MB
+            optimize: Nach dem Commit alle Segmente zusammenführen
+            replace: update_document statt add_document verwenden
+                     (bei frisch geleertem Index nicht nötig)
+
+        Returns:
+            Statistik mit indexed, errors, seconds, docs_per_second, segments
+        """
+        procs = procs or 1
+        stats = {
+            'indexed': 0,
+            'errors': 0,
+            'seconds': 0.0,
+            'docs_per_second': 0.0,
+            'procs': procs,
+            'multisegment': multisegment,
+            'optimized': optimize,
+            'segments': None
+        }
+
+        if not self._index_available or self.index is None:
+            return stats
+
+        start = time.perf_counter()
+        writer_kwargs = {'limitmb': limitmb}
+        if procs > 1:
+            writer_kwargs['procs'] = procs
+            writer_kwargs['multisegment'] = multisegment
+
+        writer = self.index.writer(**writer_kwargs)
+        try:
+            add = writer.update_document if replace else writer.add_document
+            for document_id, data in documents:
+                try:
+                    add(**self._build_fields(document_id, data))
+                    stats['indexed'] += 1
+                except Exception:
+                    stats['errors'] += 1
+            # Multisegment und Optimize schließen sich aus
+            writer.commit(optimize=optimize and not (procs > 1 and multisegment))
+        except Exception as e:
+            writer.cancel()
+            logger.warning(f"Bulk-Indexierung abgebrochen: {e}")
+            raise
+
+        stats['seconds'] = round(time.perf_counter() - start, 3)
+        if stats['seconds'] > 0:
+            stats['docs_per_second'] = round(stats['indexed'] / stats['seconds'], 1)
+
+        try:
+            stats['segments'] = len(self.index._segments())
+        except Exception:
+            pass
+
+        logger.info(
+            f"Bulk-Indexierung: {stats['indexed']} Dokumente in {stats['seconds']}s "
+            f"({stats['docs_per_second']} Dok/s, {stats['errors']} Fehler)"
+        )
+        return stats
+
     def remove_document(self, document_id: int):
         """Entfernt ein Dokument aus dem Index"""
         if not self._index_available or self._index is None:
@@ -132,7 +581,8 @@ class SearchService:
         query: str,
         filters: Optional[Dict] = None,
         limit: int = 50,
-        page: int = 1
+        page: int = 1,
+        highlights: bool = True
     ) -> Dict:
         """
         Durchsucht den Index.
@@ -142,6 +592,7 @@ class SearchService:
             filters: Optionale Filter (category, folder_id, date_from, date_to)
             limit: Maximale Ergebnisse pro Seite
             page: Seitennummer
+            highlights: Textausschnitte für die Treffer der Seite erzeugen
 
         Returns:
             Dictionary mit Ergebnissen und Metadaten
@@ -160,7 +611,7 @@ class SearchService:
             from whoosh.qparser import MultifieldParser, OrGroup
             from whoosh.query import And, Term, DateRange
 
-            with self.index.searcher() as searcher:
+            with self._searcher() as searcher:
                 # Multi-Feld-Parser für Freitextsuche
                 parser = MultifieldParser(
                     ['title', 'content', 'sender', 'amounts', 'ibans', 'contract_numbers'],
@@ -195,15 +646,26 @@ class SearchService:
                 if filter_queries:
                     q = And([q] + filter_queries)
 
-                # Suche ausführen
-                offset = (page - 1) * limit
-                search_results = searcher.search(q, limit=None)
+                # Nur das Top-N-Fenster bis zur angefragten Seite bewerten
+                # statt den gesamten Treffer-Korpus zu sortieren
+                page = max(1, page)
+                result_page = searcher.search_page(q, page, pagelen=limit, terms=False)
 
-                results['total'] = len(search_results)
+                # Die Gesamtzahl ermittelt Whoosh über die ungewertete
+                # Dokumentmenge (docs_for_query) statt über gescorte Treffer
+                results['total'] = result_page.total
                 results['pages'] = (results['total'] + limit - 1) // limit
 
-                # Paginierte Ergebnisse
-                for hit in search_results[offset:offset + limit]:
+                # search_page springt bei zu großer Seitenzahl auf die letzte
+                # Seite - wie bisher leere Ergebnisse zurückgeben
+                if result_page.pagenum != page:
+                    return results
+
+                # Highlights nur für die sichtbare Seite berechnen; ältere
+                # Indizes speichern den Volltext noch selbst
+                content_stored = self.index.schema['content'].stored
+
+                for hit in result_page:
                     results['items'].append({
                         'id': int(hit['id']),
                         'title': hit.get('title', ''),
@@ -213,28 +675,78 @@ class SearchService:
                         'document_date': hit.get('document_date'),
                         'score': hit.score,
                         'highlights': hit.highlights('content', top=3)
+                        if highlights and content_stored else ''
                     })
         except Exception:
             # Suchfehler ignorieren - leere Ergebnisse zurückgeben
-            pass
+            return results
+
+        if highlights and not content_stored and results['items']:
+            # Texte erst nach dem Searcher-Block aus dem Content-Store laden
+            try:
+                texts = self._load_contents([item['id'] for item in results['items']])
+                for item, hit in zip(results['items'], result_page):
+                    item['highlights'] = hit.highlights('content', text=texts.get(item['id'], ''), top=3)
+            except Exception:
+                # Ohne Highlights weiter
+                pass
 
         return results
 
+    @staticmethod
+    def _load_contents(document_ids: List[int]) -> Dict[int, str]:
+        """OCR-Texte der Trefferseite mit einer Abfrage aus dem Content-Store"""
+        from database import get_db, Document
+        from sqlalchemy.orm import joinedload
+
+        with get_db() as session:
+            docs = session.query(Document).options(
+                joinedload(Document.ocr_content)
+            ).filter(Document.id.in_(document_ids)).all()
+            return {doc.id: doc.ocr_text or '' for doc in docs}
+
+    def _lookup_ids(self, q) -> List[int]:
+        """Liefert Dokument-IDs für eine strukturierte Query ohne Scoring"""
+        ids = []
+        with self._searcher() as searcher:
+            for docnum in searcher.docs_for_query(q):
+                stored = searcher.stored_fields(docnum)
+                if stored.get('id'):
+                    ids.append(int(stored['id']))
+        return sorted(ids)
+
     def search_by_amount(self, amount: float, tolerance: float = 0.01) -> List[int]:
         """
         Sucht Dokumente mit einem bestimmten Betrag.
 
         Args:
             amount: Gesuchter Betrag
-            tolerance: Toleranz für Betragsvergleich
+            tolerance: Toleranz für Betragsvergleich (absolut, in Euro)
 
         Returns:
             Liste von Dokument-IDs
         """
-        # Formatiere Betrag für Textsuche
-        amount_str = f"{amount:.2f}"
-        results = self.search(amount_str, limit=100)
-        return [item['id'] for item in results['items']]
+        if not self._index_available or self._index is None:
+            return []
+
+        if self._lookup_backfill_needed:
+            # Alter Index ohne Cent-Feld: Textsuche wie bisher
+            results = self.search(f"{amount:.2f}", limit=100, highlights=False)
+            return [item['id'] for item in results['items']]
+
+        try:
+            from whoosh.query import NumericRange
+
+            cents = _to_cents(amount)
+            tolerance_cents = _to_cents(abs(tolerance or 0)) or 0
+            if cents is None:
+                return []
+
+            return self._lookup_ids(NumericRange(
+                'amount_cents', cents - tolerance_cents, cents + tolerance_cents
+            ))
+        except Exception:
+            return []
 
     def search_by_iban(self, iban: str) -> List[int]:
         """
@@ -246,47 +758,121 @@ class SearchService:
         Returns:
             Liste von Dokument-IDs
         """
-        # IBAN normalisieren (Leerzeichen entfernen)
-        iban_clean = iban.replace(' ', '').upper()
-        results = self.search(iban_clean, limit=100)
-        return [item['id'] for item in results['items']]
+        return self._lookup_key('iban_keys', iban)
 
-    def rebuild_index(self):
-        """Baut den gesamten Index neu auf"""
+    def search_by_contract_number(self, contract_number: str) -> List[int]:
+        """
+        Sucht Dokumente mit einer bestimmten Vertragsnummer.
+
+        Args:
+            contract_number: Die Vertragsnummer
+
+        Returns:
+            Liste von Dokument-IDs
+        """
+        return self._lookup_key('contract_keys', contract_number)
+
+    def _lookup_key(self, field: str, value: str) -> List[int]:
+        """Exakter Keyword-Lookup für IBANs und Vertragsnummern"""
+        if not self._index_available or self._index is None or not value:
+            return []
+
+        # IBAN/Nummer normalisieren (Leerzeichen entfernen)
+        key = _normalize_key(value)
+
+        if self._lookup_backfill_needed:
+            results = self.search(key, limit=100, highlights=False)
+            return [item['id'] for item in results['items']]
+
+        try:
+            from whoosh.query import Term
+            return self._lookup_ids(Term(field, key))
+        except Exception:
+            return []
+
+    def _iter_user_documents(self, chunk_size: int = BULK_CHUNK_SIZE):
+        """Streamt die Dokumente des Benutzers blockweise aus der Datenbank"""
         from database import get_db, Document
+        from sqlalchemy.orm import joinedload
+
+        with get_db() as session:
+            query = session.query(Document).options(
+                joinedload(Document.ocr_content)
+            ).filter(
+                Document.user_id == self.user_id
+            ).order_by(Document.id).yield_per(chunk_size)
+
+            for doc in query:
+                yield doc.id, self._document_to_data(doc)
 
-        # Alten Index löschen
+    def rebuild_index(
+        self,
+        bulk: bool = True,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        procs: int = 1,
+        multisegment: bool = False,
+        optimize: bool = True
+    ) -> Dict:
+        """
+        Baut den gesamten Index neu auf.
+
+        Args:
+            bulk: Alle Dokumente über einen Writer mit einem Commit
+                  indexieren (False = alter Pfad mit einem Commit pro Dokument)
+            chunk_size: Dokumente pro DB-Abrufblock
+            procs: Anzahl Whoosh-Writer-Prozesse
+            multisegment: Segmente der Writer-Prozesse nicht zusammenführen
+            optimize: Index nach dem Commit optimieren
+
+        Returns:
+            Statistik des Neuaufbaus (Anzahl, Dauer, Durchsatz)
+        """
+        # Geteilten Handle schließen und alten Index löschen
         import shutil
+        _index_registry.evict(self.index_dir)
         if self.index_dir.exists():
             shutil.rmtree(self.index_dir)
 
         # Neu erstellen
-        self._index = None
+        self._index_available = True
         self._ensure_index()
 
-        # Alle Dokumente des Benutzers indexieren
-        with get_db() as session:
-            documents = session.query(Document).filter(
-                Document.user_id == self.user_id
-            ).all()
-
-            for doc in documents:
-                self.index_document(doc.id, {
-                    'title': doc.title or doc.filename,
-                    'content': doc.ocr_text or '',
-                    'sender': doc.sender or '',
-                    'category': doc.category or '',
-                    'folder_id': doc.folder_id,
-                    'document_date': doc.document_date,
-                    'amounts': [doc.invoice_amount] if doc.invoice_amount else [],
-                    'ibans': [doc.iban] if doc.iban else [],
-                    'contract_numbers': [doc.contract_number] if doc.contract_number else [],
-                    'created_at': doc.created_at
-                })
+        if bulk:
+            return self.bulk_index_documents(
+                self._iter_user_documents(chunk_size),
+                procs=procs,
+                multisegment=multisegment,
+                optimize=optimize,
+                replace=False
+            )
+
+        # Einzelpfad: ein Commit pro Dokument (zum Vergleich)
+        start = time.perf_counter()
+        count = 0
+        for document_id, data in self._iter_user_documents(chunk_size):
+            self.index_document(document_id, data)
+            count += 1
+
+        seconds = round(time.perf_counter() - start, 3)
+        return {
+            'indexed': count,
+            'errors': 0,
+            'seconds': seconds,
+            'docs_per_second': round(count / seconds, 1) if seconds > 0 else 0.0,
+            'procs': 1,
+            'multisegment': False,
+            'optimized': False,
+            'segments': None
+        }
 
 
 def get_search_service(user_id: int) -> SearchService:
-    """Factory für SearchService"""
+    """
+    Factory für SearchService.
+
+    Der Service selbst ist leichtgewichtig - Index-Handles und Searcher
+    werden prozessweit über die IndexRegistry geteilt.
+    """
     key = f'search_service_{user_id}'
     if key not in st.session_state:
         st.session_state[key] = SearchService(user_id)
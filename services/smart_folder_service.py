@@ -0,0 +1,495 @@
+"""
+Abfrage-Engine für intelligente Ordner
+
+Übersetzt SmartFolder.query_json (bzw. die alten filter_rules) in eine
+einzige SQLAlchemy-Abfrage. Dokumente werden seitenweise geladen,
+Aggregationen (z.B. "sum:invoice_amount", "count:category") in SQL
+berechnet.
+
+SmartFolder.cached_count wird bei jedem Flush geänderter Dokumente
+inkrementell angepasst: Die Bedingungen werden dazu auch in Python gegen
+alten und neuen Stand des Dokuments ausgewertet. Nicht so auswertbare
+Ordner (Entity-Bedingungen, unbekannte Altwerte) werden stattdessen
+invalidiert und beim nächsten Zugriff neu gezählt.
+
+Format query_json:
+    {"operator": "AND", "conditions": [
+        {"field": "category", "op": "=", "value": "Rechnung"},
+        {"field": "invoice_status", "op": "IN", "value": ["open", "overdue"]},
+        {"field": "contract_end", "op": "<=", "value": "today+90d"},
+        {"operator": "OR", "conditions": [...]}
+    ]}
+"""
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import LargeBinary, and_, false, func, inspect, not_, or_, select, true, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import sqltypes
+
+logger = logging.getLogger(__name__)
+
+SMART_FOLDER_PAGE_SIZE = 25
+# Gezählte Werte werden spätestens nach dieser Zeit neu gezählt (Bulk-Updates, Zeitbezug)
+SMART_FOLDER_COUNT_MAX_AGE_HOURS = 24
+# Maximale Gruppen bei "count:feld"
+SMART_FOLDER_MAX_GROUPS = 20
+
+OPERATORS = {"=", "!=", ">", ">=", "<", "<=", "IN", "NOT IN", "CONTAINS", "IS NULL", "IS NOT NULL"}
+GROUP_OPERATORS = {"AND", "OR", "NOT"}
+AGGREGATE_FUNCTIONS = {"sum", "avg", "min", "max", "count"}
+
+# Spalten für Listenansichten (keine OCR-Texte etc.)
+LIST_COLUMNS = (
+    "id", "title", "filename", "sender", "category", "document_date", "created_at",
+    "invoice_amount", "invoice_status", "invoice_due_date", "iban", "contract_end"
+)
+
+# Relative Datumswerte: "today", "now", "today+7d", "now-30d"
+_RELATIVE_DATE = re.compile(r"^(today|now)(?:([+-])(\d+)d)?$", re.IGNORECASE)
+
+
+class _Unknown(Exception):
+    """Bedingung ist für ein Dokument in Python nicht auswertbar"""
+
+
+_MISSING = object()
+
+
+# ==================== BEDINGUNGEN ====================
+
+def build_condition_tree(query_json: Optional[Dict] = None,
+                         filter_rules: Optional[Dict] = None,
+                         entity_id: Optional[int] = None) -> Dict:
+    """
+    Vereinheitlicht query_json, alte filter_rules und Entity-Verknüpfung.
+
+    query_json hat Vorrang; filter_rules werden nur ohne query_json verwendet.
+    """
+    conditions = []
+    if query_json:
+        conditions.append(query_json)
+    elif filter_rules:
+        conditions.extend(_legacy_conditions(filter_rules))
+    if entity_id:
+        conditions.append({"field": "entity_id", "op": "=", "value": entity_id})
+    return {"operator": "AND", "conditions": conditions}
+
+
+def _legacy_conditions(rules: Dict) -> List[Dict]:
+    """Übersetzt die alten Regel-Schlüssel in Bedingungen"""
+    conditions = []
+    if rules.get("category"):
+        conditions.append({"field": "category", "op": "=", "value": rules["category"]})
+    if rules.get("invoice_status"):
+        conditions.append({"field": "invoice_status", "op": "=", "value": rules["invoice_status"]})
+    if rules.get("contract_end_within_days"):
+        conditions.append({"field": "contract_end", "op": "IS NOT NULL"})
+        conditions.append({"field": "contract_end", "op": "<=",
+                           "value": f"now+{int(rules['contract_end_within_days'])}d"})
+    if rules.get("has_deadline"):
+        conditions.append({"field": "invoice_due_date", "op": "IS NOT NULL"})
+    if rules.get("deadline_within_days"):
+        conditions.append({"field": "invoice_due_date", "op": ">=", "value": "today"})
+        conditions.append({"field": "invoice_due_date", "op": "<=",
+                           "value": f"now+{int(rules['deadline_within_days'])}d"})
+    return conditions
+
+
+def _iter_leaves(node: Dict):
+    if "conditions" in node:
+        for child in node["conditions"]:
+            yield from _iter_leaves(child)
+    else:
+        yield node
+
+
+def is_incremental(tree: Dict) -> bool:
+    """Ob die Bedingungen pro Dokument in Python auswertbar sind"""
+    return all(leaf.get("field") != "entity_id" for leaf in _iter_leaves(tree))
+
+
+def _column(field: str):
+    """Dokument-Spalte zu einem Attributnamen (nur echte, nicht-binäre Spalten)"""
+    from database.models import Document
+
+    prop = inspect(Document).column_attrs.get(field)
+    if prop is None or isinstance(prop.columns[0].type, LargeBinary):
+        raise ValueError(f"Unbekanntes Feld: {field}")
+    return prop.columns[0]
+
+
+def _attribute(field: str):
+    """Gemapptes Document-Attribut zu einem Feldnamen (geprüft über _column)"""
+    from database.models import Document
+
+    _column(field)
+    return getattr(Document, field)
+
+
+def _parse_date(value: str) -> datetime:
+    """ISO-Datum oder relativer Wert wie "today+7d" """
+    match = _RELATIVE_DATE.match(value.strip())
+    if match:
+        base, sign, days = match.groups()
+        now = datetime.now()
+        result = datetime(now.year, now.month, now.day) if base.lower() == "today" else now
+        if days:
+            result += timedelta(days=int(days)) if sign == "+" else -timedelta(days=int(days))
+        return result
+    return datetime.fromisoformat(value)
+
+
+def _coerce(column, value: Any) -> Any:
+    """Wandelt JSON-Werte in den Spaltentyp um (Enums, Datumswerte)"""
+    if isinstance(value, (list, tuple)):
+        return [_coerce(column, v) for v in value]
+
+    enum_class = getattr(column.type, "enum_class", None)
+    if enum_class is not None and value is not None and not isinstance(value, enum_class):
+        text = str(value).lower()
+        for member in enum_class:
+            if text in (member.name.lower(), str(member.value).lower()):
+                return member
+        raise ValueError(f"Ungültiger Wert für {column.key}: {value}")
+
+    if isinstance(column.type, (sqltypes.DateTime, sqltypes.Date)) and isinstance(value, str):
+        parsed = _parse_date(value)
+        return parsed.date() if isinstance(column.type, sqltypes.Date) \
+            and not isinstance(column.type, sqltypes.DateTime) else parsed
+
+    return value
+
+
+def _entity_clause(values: List[Any]):
+    from database.models import Document, document_entities
+
+    return Document.id.in_(
+        select(document_entities.c.document_id).where(document_entities.c.entity_id.in_(values))
+    )
+
+
+def compile_conditions(node: Dict):
+    """Übersetzt einen Bedingungsbaum in einen SQLAlchemy-Ausdruck"""
+    if "conditions" in node:
+        operator = str(node.get("operator", "AND")).upper()
+        clauses = [compile_conditions(child) for child in node["conditions"]]
+        if operator == "AND":
+            return and_(true(), *clauses)
+        if operator == "OR":
+            return or_(false(), *clauses)
+        if operator == "NOT":
+            return not_(and_(true(), *clauses))
+        raise ValueError(f"Unbekannter Verknüpfungsoperator: {operator}")
+
+    field = node.get("field")
+    op = str(node.get("op", "=")).upper()
+    value = node.get("value")
+    if op not in OPERATORS:
+        raise ValueError(f"Unbekannter Operator: {op}")
+
+    if field == "entity_id":
+        ids = value if isinstance(value, list) else [value]
+        if op in ("=", "IN"):
+            return _entity_clause(ids)
+        if op in ("!=", "NOT IN"):
+            return not_(_entity_clause(ids))
+        raise ValueError(f"Operator {op} für entity_id nicht unterstützt")
+
+    column = _attribute(field)
+    if op == "IS NULL":
+        return column.is_(None)
+    if op == "IS NOT NULL":
+        return column.isnot(None)
+    if op == "CONTAINS":
+        return column.ilike(f"%{value}%")
+
+    value = _coerce(_column(field), value)
+    if op == "IN":
+        return column.in_(value if isinstance(value, list) else [value])
+    if op == "NOT IN":
+        return column.notin_(value if isinstance(value, list) else [value])
+    return {
+        "=": column == value, "!=": column != value,
+        ">": column > value, ">=": column >= value,
+        "<": column < value, "<=": column <= value,
+    }[op]
+
+
+def evaluate_conditions(node: Dict, values: Dict[str, Any]) -> bool:
+    """
+    Wertet einen Bedingungsbaum für ein Dokument in Python aus (gleiche
+    Semantik wie SQL, NULL-Vergleiche sind falsch).
+
+    Raises:
+        _Unknown: wenn ein benötigter Wert fehlt oder nicht vergleichbar ist
+    """
+    if "conditions" in node:
+        operator = str(node.get("operator", "AND")).upper()
+        results = [evaluate_conditions(child, values) for child in node["conditions"]]
+        if operator == "AND":
+            return all(results)
+        if operator == "OR":
+            return any(results)
+        return not all(results)
+
+    field = node.get("field")
+    if field == "entity_id":
+        raise _Unknown(field)
+
+    op = str(node.get("op", "=")).upper()
+    current = values.get(field, _MISSING)
+    if current is _MISSING:
+        raise _Unknown(field)
+
+    if op == "IS NULL":
+        return current is None
+    if op == "IS NOT NULL":
+        return current is not None
+    if current is None:
+        return False
+    if op == "CONTAINS":
+        return str(node.get("value", "")).lower() in str(current).lower()
+
+    value = _coerce(_column(field), node.get("value"))
+    try:
+        if op == "IN":
+            return current in (value if isinstance(value, list) else [value])
+        if op == "NOT IN":
+            return current not in (value if isinstance(value, list) else [value])
+        if isinstance(current, datetime) and type(value) is date:
+            current = current.date()
+        return {
+            "=": lambda: current == value, "!=": lambda: current != value,
+            ">": lambda: current > value, ">=": lambda: current >= value,
+            "<": lambda: current < value, "<=": lambda: current <= value,
+        }[op]()
+    except TypeError:
+        raise _Unknown(field)
+
+
+# ==================== SERVICE ====================
+
+def folder_definition(smart_folder) -> Dict[str, Any]:
+    """Definition eines SmartFolder-Objekts als einfaches Dict (für Session-State)"""
+    return {
+        "id": smart_folder.id,
+        "name": smart_folder.name,
+        "query_json": smart_folder.query_json,
+        "rules": smart_folder.filter_rules,
+        "entity_id": smart_folder.entity_id,
+        "aggregation_fields": smart_folder.aggregation_fields or [],
+        "sort_by": smart_folder.sort_by or "document_date",
+        "sort_order": smart_folder.sort_order or "desc",
+    }
+
+
+class SmartFolderService:
+    """Abfragen, Aggregationen und Zähler-Cache für intelligente Ordner"""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+
+    def _filtered_query(self, session, definition: Dict, *entities):
+        from database.models import Document
+
+        tree = build_condition_tree(
+            definition.get("query_json"), definition.get("rules"), definition.get("entity_id")
+        )
+        return session.query(*(entities or (Document,))).filter(
+            Document.user_id == self.user_id,
+            (Document.is_deleted == False) | (Document.is_deleted == None),
+            compile_conditions(tree)
+        )
+
+    def count(self, definition: Dict) -> int:
+        """Anzahl passender Dokumente (COUNT in SQL)"""
+        from database.db import get_db
+        from database.models import Document
+
+        with get_db() as session:
+            return self._filtered_query(session, definition, func.count(Document.id)).scalar() or 0
+
+    def fetch_page(self, definition: Dict, page: int = 0,
+                   page_size: int = SMART_FOLDER_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """
+        Eine Seite passender Dokumente (nur Listenspalten).
+
+        Returns:
+            Liste von Dicts mit den Spalten aus LIST_COLUMNS
+        """
+        from database.db import get_db
+        from database.models import Document
+        from database.projections import document_list_options
+
+        sort_column = _attribute(definition.get("sort_by") or "created_at")
+        order = sort_column.asc() if definition.get("sort_order") == "asc" else sort_column.desc()
+
+        with get_db() as session:
+            docs = self._filtered_query(session, definition).options(
+                document_list_options(*LIST_COLUMNS)
+            ).order_by(order.nullslast(), Document.id.desc()).offset(
+                max(page, 0) * page_size
+            ).limit(page_size).all()
+
+            return [{name: getattr(doc, name) for name in LIST_COLUMNS} for doc in docs]
+
+    def aggregate(self, definition: Dict, fields: List[str]) -> Dict[str, Any]:
+        """
+        Berechnet Aggregationen in SQL.
+
+        Args:
+            fields: z.B. ["sum:invoice_amount", "avg:invoice_amount", "count:category"]
+
+        Returns:
+            Dict Feldausdruck -> Wert; bei "count:feld" ein Dict Wert -> Anzahl
+        """
+        from database.db import get_db
+        from database.models import Document
+
+        scalar_fields = []
+        group_fields = []
+        for expression in fields or []:
+            function, _, field = expression.partition(":")
+            function = function.lower()
+            if function not in AGGREGATE_FUNCTIONS:
+                raise ValueError(f"Unbekannte Aggregation: {expression}")
+            if function == "count" and field and field != "*":
+                group_fields.append((expression, _attribute(field)))
+            elif function == "count":
+                scalar_fields.append((expression, func.count(Document.id)))
+            else:
+                scalar_fields.append((expression, getattr(func, function)(_attribute(field))))
+
+        result: Dict[str, Any] = {}
+        with get_db() as session:
+            if scalar_fields:
+                row = self._filtered_query(session, definition, *(expr for _, expr in scalar_fields)).one()
+                for (expression, _), value in zip(scalar_fields, row):
+                    result[expression] = value
+
+            for expression, attribute in group_fields:
+                count = func.count(Document.id)
+                rows = self._filtered_query(session, definition, attribute, count).group_by(
+                    attribute
+                ).order_by(count.desc()).limit(SMART_FOLDER_MAX_GROUPS).all()
+                result[expression] = {
+                    (getattr(value, "value", value) if value is not None else "—"): n for value, n in rows
+                }
+
+        return result
+
+    def get_counts(self) -> Dict[int, int]:
+        """
+        Dokumentanzahl aller Smart Folders des Benutzers.
+
+        Verwendet cached_count; fehlende oder veraltete Werte werden gezählt
+        und gespeichert.
+        """
+        from database.db import get_db
+        from database.models import Document, SmartFolder
+
+        max_age = datetime.now() - timedelta(hours=SMART_FOLDER_COUNT_MAX_AGE_HOURS)
+        counts = {}
+        with get_db() as session:
+            folders = session.query(SmartFolder).filter(SmartFolder.user_id == self.user_id).all()
+            for folder in folders:
+                if folder.cached_count is None or folder.cache_updated_at is None \
+                        or folder.cache_updated_at < max_age:
+                    try:
+                        folder.cached_count = self._filtered_query(
+                            session, folder_definition(folder), func.count(Document.id)
+                        ).scalar() or 0
+                    except ValueError as e:
+                        logger.warning(f"Smart Folder {folder.id} ungültig: {e}")
+                        continue
+                    folder.cache_updated_at = datetime.now()
+                counts[folder.id] = folder.cached_count
+        return counts
+
+
+# ==================== INKREMENTELLE ZÄHLER ====================
+
+def _document_values(obj, old: bool) -> Dict[str, Any]:
+    """Spaltenwerte eines Dokuments vor bzw. nach dem Flush (ohne Nachladen)"""
+    state = inspect(obj)
+    values = {}
+    for attr in state.mapper.column_attrs:
+        key = attr.key
+        if old:
+            history = state.attrs[key].history
+            if history.deleted:
+                values[key] = history.deleted[0]
+            elif history.unchanged:
+                values[key] = history.unchanged[0]
+        elif key in state.dict:
+            values[key] = state.dict[key]
+    return values
+
+
+def _matches(tree: Dict, values: Optional[Dict[str, Any]], user_id: int) -> bool:
+    """Ob ein Dokumentstand im Ordner liegt (inkl. Benutzer und Papierkorb)"""
+    if values is None:
+        return False
+    for key in ("user_id", "is_deleted"):
+        if key not in values:
+            raise _Unknown(key)
+    if values["user_id"] != user_id or values["is_deleted"]:
+        return False
+    return evaluate_conditions(tree, values)
+
+
+def _update_cached_counts(session: Session, flush_context):
+    """Passt cached_count für geänderte Dokumente an (after_flush)"""
+    from database.models import Document, SmartFolder
+
+    changes = []  # (alter Stand | None, neuer Stand | None)
+    for obj in session.new:
+        if isinstance(obj, Document):
+            changes.append((None, _document_values(obj, old=False)))
+    for obj in session.dirty:
+        if isinstance(obj, Document) and session.is_modified(obj, include_collections=False):
+            changes.append((_document_values(obj, old=True), _document_values(obj, old=False)))
+    for obj in session.deleted:
+        if isinstance(obj, Document):
+            changes.append((_document_values(obj, old=True), None))
+    if not changes:
+        return
+
+    user_ids = {v.get("user_id") for change in changes for v in change if v and v.get("user_id")}
+    if not user_ids:
+        return
+    table = SmartFolder.__table__
+    connection = session.connection()
+    folders = connection.execute(
+        select(table.c.id, table.c.user_id, table.c.query_json, table.c.filter_rules, table.c.entity_id)
+        .where(table.c.user_id.in_(user_ids), table.c.cached_count.isnot(None))
+    ).all()
+
+    for folder in folders:
+        tree = build_condition_tree(folder.query_json, folder.filter_rules, folder.entity_id)
+        delta = 0
+        try:
+            if not is_incremental(tree):
+                raise _Unknown("entity_id")
+            for old, new in changes:
+                delta += int(_matches(tree, new, folder.user_id)) - int(_matches(tree, old, folder.user_id))
+        except (_Unknown, ValueError):
+            connection.execute(update(table).where(table.c.id == folder.id).values(cached_count=None))
+            continue
+
+        if delta:
+            connection.execute(
+                update(table).where(table.c.id == folder.id)
+                .values(cached_count=table.c.cached_count + delta)
+            )
+
+
+def register_count_maintenance():
+    """Registriert den Session-Hook für cached_count (idempotent)"""
+    from sqlalchemy import event
+
+    if not event.contains(Session, "after_flush", _update_cached_counts):
+        event.listen(Session, "after_flush", _update_cached_counts)
@@ -227,6 +227,62 @@ class StorageService:
             logger.error(f"Lokaler Speicher Fehler: {e}")
             return False, str(e)
 
+    def store_local_file(
+        self,
+        source_path: Union[str, Path],
+        filename: str,
+        user_id: int,
+        subfolder: str = "",
+        content_type: str = "application/octet-stream"
+    ) -> Tuple[bool, str]:
+        """
+        Übernimmt eine bereits auf der Festplatte liegende Datei in den Storage.
+
+        Im Gegensatz zu upload_file wird der Inhalt nicht in den Speicher
+        geladen: Supabase liest die Datei selbst, lokal wird sie verschoben.
+        Die Quelldatei existiert danach nicht mehr.
+
+        Args:
+            source_path: Pfad der Quelldatei (z.B. Spool-Datei eines Downloads)
+            filename: Dateiname
+            user_id: Benutzer-ID
+            subfolder: Optionaler Unterordner
+            content_type: MIME-Type
+
+        Returns:
+            Tuple (success: bool, path_or_error: str)
+        """
+        import shutil
+
+        self._init_storage()
+        source_path = Path(source_path)
+        storage_path = self._get_storage_path(user_id, filename, subfolder)
+
+        # Cloud Storage (Supabase) - Upload direkt aus der Datei
+        if self._use_cloud and self._supabase_client:
+            try:
+                self._supabase_client.storage.from_(self._bucket_name).upload(
+                    path=storage_path,
+                    file=str(source_path),
+                    file_options={"content-type": content_type}
+                )
+                source_path.unlink(missing_ok=True)
+                logger.info(f"Datei in Cloud hochgeladen: {storage_path}")
+                return True, f"cloud://{self._bucket_name}/{storage_path}"
+            except Exception as e:
+                logger.error(f"Cloud Upload Fehler: {e}")
+                # Fallback auf lokal
+
+        # Lokaler Speicher (Fallback) - verschieben statt kopieren
+        try:
+            local_path = self._get_local_path(user_id, filename, subfolder)
+            shutil.move(str(source_path), str(local_path))
+            logger.info(f"Datei lokal gespeichert: {local_path}")
+            return True, str(local_path)
+        except Exception as e:
+            logger.error(f"Lokaler Speicher Fehler: {e}")
+            return False, str(e)
+
     def download_file(self, path: str, user_id: int = None) -> Tuple[bool, Union[bytes, str]]:
         """
         Lädt eine Datei aus dem Storage herunter.
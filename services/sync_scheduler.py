@@ -0,0 +1,242 @@
+"""
+Hintergrund-Scheduler für Cloud-Synchronisationen
+
+Läuft unabhängig von Streamlit als eigener Prozess und synchronisiert die
+fälligen Verbindungen aller Benutzer. Syncs laufen damit auch weiter, wenn
+der Browser-Tab geschlossen oder die Seite neu geladen wird.
+
+Verwendung:
+    python -m services.sync_scheduler            # Dauerbetrieb
+    python -m services.sync_scheduler --once     # Einmal alle fälligen Syncs
+    python -m services.sync_scheduler --workers 4 --interval 30
+
+Sperre und Fortschritt liegen in der Verbindung (siehe
+CloudSyncService._claim_connection), die UI liest sie über
+CloudSyncService.get_sync_status.
+"""
+import argparse
+import logging
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Abfrageintervall für fällige Verbindungen
+SCHEDULER_POLL_SECONDS = 60
+# Parallele Syncs (bei SQLite immer 1 - nur ein Schreiber gleichzeitig)
+SCHEDULER_MAX_WORKERS = 4
+
+
+def _default_worker_count() -> int:
+    """Parallele Syncs je nach Datenbank (SQLite erlaubt nur einen Schreiber)"""
+    try:
+        from database.db import engine
+        if engine.url.get_backend_name() == 'sqlite':
+            return 1
+    except Exception:
+        return 1
+    return SCHEDULER_MAX_WORKERS
+
+
+class SyncScheduler:
+    """Fragt fällige Cloud-Verbindungen ab und synchronisiert sie in einem Worker-Pool"""
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 poll_interval_seconds: int = SCHEDULER_POLL_SECONDS,
+                 process_documents: bool = True):
+        self.max_workers = max_workers or _default_worker_count()
+        self.poll_interval_seconds = poll_interval_seconds
+        self.process_documents = process_documents
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cloud-sync")
+        self._running: Dict[int, datetime] = {}  # Verbindungs-ID -> Startzeit (dieser Prozess)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._stats = {"polls": 0, "started": 0, "completed": 0, "failed": 0, "files_synced": 0}
+
+    def find_due_connections(self) -> List[Tuple[int, int]]:
+        """
+        Ermittelt fällige Verbindungen über alle Benutzer.
+
+        Laufende Syncs (auch aus anderen Prozessen, erkennbar am aktuellen
+        Heartbeat) werden ausgelassen; nach Fehlschlägen gilt ein Backoff.
+
+        Returns:
+            Liste von (user_id, connection_id)
+        """
+        from database.db import get_db
+        from database.extended_models import CloudSyncConnection, SyncStatus
+        from services.cloud_sync_service import SYNC_LOCK_STALE_MINUTES, next_sync_time
+
+        now = datetime.now()
+        stale_before = now - timedelta(minutes=SYNC_LOCK_STALE_MINUTES)
+        due = []
+
+        with get_db() as session:
+            connections = session.query(CloudSyncConnection).filter(
+                CloudSyncConnection.is_active == True,
+                CloudSyncConnection.auto_sync_enabled == True
+            ).order_by(CloudSyncConnection.last_sync_at.is_(None).desc(),
+                       CloudSyncConnection.last_sync_at).all()
+
+            for conn in connections:
+                if conn.status == SyncStatus.SYNCING and conn.sync_heartbeat_at \
+                        and conn.sync_heartbeat_at >= stale_before:
+                    continue
+                # Fehlgeschlagene Versuche zählen mit Backoff (siehe next_sync_time)
+                if now >= next_sync_time(conn, now):
+                    due.append((conn.user_id, conn.id))
+
+        return due
+
+    def run_once(self) -> int:
+        """
+        Startet Syncs für alle fälligen Verbindungen (kehrt sofort zurück).
+
+        Returns:
+            Anzahl neu gestarteter Syncs
+        """
+        self._count("polls")
+        try:
+            due = self.find_due_connections()
+        except Exception as e:
+            logger.error(f"Fällige Verbindungen konnten nicht geladen werden: {e}")
+            return 0
+
+        started = 0
+        for user_id, connection_id in due:
+            with self._lock:
+                if connection_id in self._running:
+                    continue
+                self._running[connection_id] = datetime.now()
+            self._pool.submit(self._run_connection, user_id, connection_id)
+            started += 1
+
+        if started:
+            logger.info(f"{started} Synchronisation(en) gestartet ({len(due)} fällig)")
+        return started
+
+    def _run_connection(self, user_id: int, connection_id: int):
+        """Führt einen Sync im Worker-Thread aus"""
+        from services.cloud_sync_service import CloudSyncService
+
+        self._count("started")
+        start = time.perf_counter()
+        try:
+            result = CloudSyncService(user_id).sync_connection(connection_id, self.process_documents)
+            self._count("completed" if result.get("success") else "failed")
+            self._count("files_synced", result.get("files_synced", 0))
+            logger.info(
+                f"Verbindung {connection_id} (Benutzer {user_id}): "
+                f"{result.get('files_synced', 0)} importiert, {result.get('files_error', 0)} Fehler, "
+                f"{result.get('files_unchanged', 0)} unverändert in {time.perf_counter() - start:.1f}s"
+                + (f" - {result['error']}" if result.get("error") else "")
+            )
+        except Exception as e:
+            self._count("failed")
+            logger.exception(f"Sync von Verbindung {connection_id} fehlgeschlagen: {e}")
+        finally:
+            with self._lock:
+                self._running.pop(connection_id, None)
+
+    def _count(self, key: str, amount: int = 1):
+        """Zählt Statistik threadsicher hoch"""
+        with self._lock:
+            self._stats[key] += amount
+
+    def run_forever(self):
+        """Pollt bis stop() aufgerufen wird"""
+        logger.info(
+            f"Sync-Scheduler gestartet ({self.max_workers} Worker, "
+            f"Intervall {self.poll_interval_seconds}s)"
+        )
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(self.poll_interval_seconds)
+
+    def wait_idle(self):
+        """Blockiert, bis alle gestarteten Syncs beendet sind"""
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+            time.sleep(0.5)
+
+    def request_stop(self):
+        """Beendet run_forever nach dem aktuellen Durchlauf (z.B. aus Signal-Handlern)"""
+        self._stop_event.set()
+
+    def stop(self, wait: bool = True):
+        """Beendet das Polling; laufende Syncs werden zu Ende geführt"""
+        self._stop_event.set()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def get_status(self) -> Dict:
+        """Status dieses Scheduler-Prozesses"""
+        with self._lock:
+            running = {conn_id: started.isoformat() for conn_id, started in self._running.items()}
+            stats = dict(self._stats)
+        return {
+            "workers": self.max_workers,
+            "poll_interval_seconds": self.poll_interval_seconds,
+            "running": running,
+            **stats
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Kommandozeilen-Einstieg"""
+    parser = argparse.ArgumentParser(description="Cloud-Sync im Hintergrund ausführen")
+    parser.add_argument("--once", action="store_true",
+                        help="Alle fälligen Verbindungen einmal synchronisieren und beenden")
+    parser.add_argument("--interval", type=int, default=SCHEDULER_POLL_SECONDS,
+                        help="Abfrageintervall in Sekunden (Standard: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallele Syncs (Standard: 1 bei SQLite, sonst %d)" % SCHEDULER_MAX_WORKERS)
+    parser.add_argument("--no-process", action="store_true",
+                        help="Dateien nur importieren, keine OCR/Analyse")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"
+    )
+
+    # Tabellen und Migrationen wie beim App-Start sicherstellen
+    from database.db import init_db
+    init_db()
+
+    scheduler = SyncScheduler(
+        max_workers=args.workers,
+        poll_interval_seconds=args.interval,
+        process_documents=not args.no_process
+    )
+
+    if args.once:
+        scheduler.run_once()
+        scheduler.wait_idle()
+        scheduler.stop()
+        status = scheduler.get_status()
+        logger.info(f"Fertig: {status['completed']} erfolgreich, {status['failed']} fehlgeschlagen")
+        return 0 if status["failed"] == 0 else 1
+
+    def _handle_signal(signum, frame):
+        logger.info("Beende Sync-Scheduler...")
+        scheduler.request_stop()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    scheduler.run_forever()
+    scheduler.stop(wait=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
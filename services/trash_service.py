@@ -180,10 +180,11 @@ class TrashService:
             Liste von Dokumenten im Papierkorb
         """
         from database.models import get_session, Document
+        from database.projections import document_list_query
 
         session = get_session()
         try:
-            docs = session.query(Document).filter_by(
+            docs = document_list_query(session).filter_by(
                 user_id=user_id,
                 is_deleted=True
             ).order_by(Document.deleted_at.desc()).all()
@@ -222,11 +223,12 @@ class TrashService:
         Returns:
             Dict mit Ergebnis
         """
-        from database.models import get_session, Document
+        from database.models import get_session
+        from database.projections import document_list_query
 
         session = get_session()
         try:
-            docs = session.query(Document).filter_by(
+            docs = document_list_query(session, "file_path").filter_by(
                 user_id=user_id,
                 is_deleted=True
             ).all()
@@ -265,6 +267,7 @@ class TrashService:
             Dict mit Ergebnis
         """
         from database.models import get_session, Document
+        from database.projections import document_list_query
 
         session = get_session()
         try:
@@ -272,7 +275,7 @@ class TrashService:
             expiry_threshold = datetime.now() - timedelta(hours=retention_hours)
 
             # Finde alle abgelaufenen Dokumente
-            expired_docs = session.query(Document).filter(
+            expired_docs = document_list_query(session, "file_path").filter(
                 Document.is_deleted == True,
                 Document.deleted_at < expiry_threshold
             ).all()
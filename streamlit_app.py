@@ -57,9 +57,10 @@ from datetime import datetime, timedelta
 sys.path.insert(0, str(Path(__file__).parent))
 
 from database.db import init_db, get_db, get_current_user_id
+from database.projections import document_list_query, reset_fetch_stats, format_fetch_stats
 from database.models import (
-    Document, Folder, CalendarEvent, Contact, InvoiceStatus,
-    Receipt, EventType, BankAccount
+    Document, CalendarEvent, Contact, InvoiceStatus,
+    EventType, BankAccount
 )
 from config.settings import get_settings, get_api_key_status
 from utils.components import render_sidebar_with_navigation, apply_custom_css
@@ -422,34 +423,43 @@ def render_dashboard():
     # =====================
     # HAUPT-KPIs (Zeile 1)
     # =====================
+    # Alle Kennzahlen aus einem gecachten Snapshot (wenige gruppierte Abfragen)
+    from services.dashboard_service import DashboardService
+    kpis = DashboardService(user_id).get_snapshot()
+
     col1, col2, col3, col4, col5 = st.columns(5)
 
     with col1:
-        doc_count = get_document_count(user_id)
-        inbox_count = get_inbox_count(user_id)
+        doc_count = kpis["document_count"]
+        inbox_count = kpis["inbox_count"]
         st.metric("📄 Dokumente", doc_count, f"+{inbox_count} im Posteingang" if inbox_count > 0 else None)
 
     with col2:
-        open_invoices = get_open_invoices_count(user_id)
-        open_amount = get_open_invoices_amount(user_id)
+        open_invoices = kpis["open_invoices_count"]
+        open_amount = kpis["open_invoices_amount"]
         st.metric("💰 Offene Rechnungen", open_invoices, format_currency(open_amount) if open_amount > 0 else None)
 
     with col3:
-        deadline_count = get_upcoming_deadlines_count(user_id)
-        urgent_count = get_urgent_deadlines_count(user_id)
+        deadline_count = kpis["upcoming_deadlines_count"]
+        urgent_count = kpis["urgent_deadlines_count"]
         delta_color = "inverse" if urgent_count > 0 else "off"
         st.metric("⏰ Fristen (30 Tage)", deadline_count, f"{urgent_count} dringend" if urgent_count > 0 else None, delta_color=delta_color)
 
     with col4:
-        contract_count = get_expiring_contracts_count(user_id)
+        contract_count = kpis["expiring_contracts_count"]
         st.metric("📋 Verträge", contract_count, "auslaufend" if contract_count > 0 else None, delta_color="inverse" if contract_count > 0 else "off")
 
     with col5:
-        month_expenses = get_month_expenses(user_id)
-        last_month = get_last_month_expenses(user_id)
+        month_expenses = kpis["month_expenses"]
+        last_month = kpis["last_month_expenses"]
         diff = month_expenses - last_month if last_month > 0 else 0
         st.metric("📈 Ausgaben (Monat)", format_currency(month_expenses), f"{'+' if diff >= 0 else ''}{format_currency(diff)}" if last_month > 0 else None)
 
+    st.caption(
+        f"Kennzahlen berechnet in {kpis['compute_ms']:.0f} ms"
+        + (" (aus dem Cache)" if kpis["from_cache"] else "")
+    )
+
     st.divider()
 
     # =====================
@@ -638,7 +648,7 @@ def render_dashboard():
         st.subheader("💰 Finanzübersicht")
 
         # Mini-Chart für Monatsausgaben
-        monthly_data = get_monthly_expenses_data(user_id, months=6)
+        monthly_data = kpis["monthly_expenses"]
         if monthly_data:
             import pandas as pd
             df = pd.DataFrame(monthly_data)
@@ -706,174 +716,6 @@ def get_category_icon(category: str) -> str:
     return icons.get(category, '📄')
 
 
-def get_document_count(user_id: int) -> int:
-    """Zählt alle Dokumente des Benutzers"""
-    with get_db() as session:
-        return session.query(Document).filter(Document.user_id == user_id).count()
-
-
-def get_inbox_count(user_id: int) -> int:
-    """Zählt Dokumente im Posteingang"""
-    with get_db() as session:
-        inbox = session.query(Folder).filter(
-            Folder.user_id == user_id,
-            Folder.name == "Posteingang"
-        ).first()
-        if inbox:
-            return session.query(Document).filter(
-                Document.user_id == user_id,
-                Document.folder_id == inbox.id
-            ).count()
-        return 0
-
-
-def get_upcoming_deadlines_count(user_id: int) -> int:
-    """Zählt anstehende Fristen (30 Tage)"""
-    with get_db() as session:
-        return session.query(CalendarEvent).filter(
-            CalendarEvent.user_id == user_id,
-            CalendarEvent.start_date >= datetime.now(),
-            CalendarEvent.start_date <= datetime.now() + timedelta(days=30)
-        ).count()
-
-
-def get_urgent_deadlines_count(user_id: int) -> int:
-    """Zählt dringende Fristen (7 Tage)"""
-    with get_db() as session:
-        return session.query(CalendarEvent).filter(
-            CalendarEvent.user_id == user_id,
-            CalendarEvent.start_date >= datetime.now(),
-            CalendarEvent.start_date <= datetime.now() + timedelta(days=7)
-        ).count()
-
-
-def get_open_invoices_count(user_id: int) -> int:
-    """Zählt offene Rechnungen"""
-    with get_db() as session:
-        return session.query(Document).filter(
-            Document.user_id == user_id,
-            Document.invoice_status == InvoiceStatus.OPEN
-        ).count()
-
-
-def get_open_invoices_amount(user_id: int) -> float:
-    """Summe aller offenen Rechnungen"""
-    with get_db() as session:
-        result = session.query(Document).filter(
-            Document.user_id == user_id,
-            Document.invoice_status == InvoiceStatus.OPEN,
-            Document.invoice_amount.isnot(None)
-        ).all()
-        return sum(doc.invoice_amount or 0 for doc in result)
-
-
-def get_expiring_contracts_count(user_id: int) -> int:
-    """Zählt auslaufende Verträge (90 Tage)"""
-    with get_db() as session:
-        return session.query(Document).filter(
-            Document.user_id == user_id,
-            Document.contract_end.isnot(None),
-            Document.contract_end >= datetime.now(),
-            Document.contract_end <= datetime.now() + timedelta(days=90)
-        ).count()
-
-
-def get_month_expenses(user_id: int) -> float:
-    """Ausgaben des aktuellen Monats"""
-    now = datetime.now()
-    month_start = datetime(now.year, now.month, 1)
-
-    with get_db() as session:
-        # Bons
-        receipts = session.query(Receipt).filter(
-            Receipt.user_id == user_id,
-            Receipt.date >= month_start
-        ).all()
-        receipt_total = sum(r.total_amount or 0 for r in receipts)
-
-        # Bezahlte Rechnungen
-        invoices = session.query(Document).filter(
-            Document.user_id == user_id,
-            Document.invoice_status == InvoiceStatus.PAID,
-            Document.invoice_paid_date >= month_start
-        ).all()
-        invoice_total = sum(i.invoice_amount or 0 for i in invoices)
-
-        return receipt_total + invoice_total
-
-
-def get_last_month_expenses(user_id: int) -> float:
-    """Ausgaben des letzten Monats"""
-    now = datetime.now()
-    if now.month == 1:
-        last_month_start = datetime(now.year - 1, 12, 1)
-        last_month_end = datetime(now.year, 1, 1)
-    else:
-        last_month_start = datetime(now.year, now.month - 1, 1)
-        last_month_end = datetime(now.year, now.month, 1)
-
-    with get_db() as session:
-        receipts = session.query(Receipt).filter(
-            Receipt.user_id == user_id,
-            Receipt.date >= last_month_start,
-            Receipt.date < last_month_end
-        ).all()
-        receipt_total = sum(r.total_amount or 0 for r in receipts)
-
-        invoices = session.query(Document).filter(
-            Document.user_id == user_id,
-            Document.invoice_status == InvoiceStatus.PAID,
-            Document.invoice_paid_date >= last_month_start,
-            Document.invoice_paid_date < last_month_end
-        ).all()
-        invoice_total = sum(i.invoice_amount or 0 for i in invoices)
-
-        return receipt_total + invoice_total
-
-
-def get_monthly_expenses_data(user_id: int, months: int = 6) -> list:
-    """Monatliche Ausgaben der letzten X Monate"""
-    data = []
-    now = datetime.now()
-
-    for i in range(months - 1, -1, -1):
-        if now.month - i <= 0:
-            year = now.year - 1
-            month = 12 + (now.month - i)
-        else:
-            year = now.year
-            month = now.month - i
-
-        month_start = datetime(year, month, 1)
-        if month == 12:
-            month_end = datetime(year + 1, 1, 1)
-        else:
-            month_end = datetime(year, month + 1, 1)
-
-        with get_db() as session:
-            receipts = session.query(Receipt).filter(
-                Receipt.user_id == user_id,
-                Receipt.date >= month_start,
-                Receipt.date < month_end
-            ).all()
-            receipt_total = sum(r.total_amount or 0 for r in receipts)
-
-            invoices = session.query(Document).filter(
-                Document.user_id == user_id,
-                Document.invoice_status == InvoiceStatus.PAID,
-                Document.invoice_paid_date >= month_start,
-                Document.invoice_paid_date < month_end
-            ).all()
-            invoice_total = sum(i.invoice_amount or 0 for i in invoices)
-
-        data.append({
-            'month': month_start.strftime('%b'),
-            'amount': receipt_total + invoice_total
-        })
-
-    return data
-
-
 def get_overdue_invoices(user_id: int) -> list:
     """Überfällige Rechnungen"""
     invoices = []
@@ -902,7 +744,7 @@ def get_open_invoices(user_id: int, limit: int = 10) -> list:
     """Offene Rechnungen"""
     invoices = []
     with get_db() as session:
-        docs = session.query(Document).filter(
+        docs = document_list_query(session).filter(
             Document.user_id == user_id,
             Document.invoice_status == InvoiceStatus.OPEN
         ).order_by(Document.invoice_due_date.asc().nullslast()).limit(limit).all()
@@ -958,7 +800,7 @@ def get_expiring_contracts(user_id: int, days: int = 90) -> list:
     """Auslaufende Verträge"""
     contracts = []
     with get_db() as session:
-        docs = session.query(Document).filter(
+        docs = document_list_query(session, "contract_notice_period").filter(
             Document.user_id == user_id,
             Document.contract_end.isnot(None),
             Document.contract_end >= datetime.now(),
@@ -981,7 +823,9 @@ def get_all_contracts(user_id: int) -> list:
     """Alle Verträge"""
     contracts = []
     with get_db() as session:
-        docs = session.query(Document).filter(
+        docs = document_list_query(
+            session, "contract_number", "contract_start", "contract_notice_period"
+        ).filter(
             Document.user_id == user_id,
             Document.contract_number.isnot(None) | Document.contract_start.isnot(None) | Document.contract_end.isnot(None)
         ).order_by(Document.contract_end.asc().nullslast()).all()
@@ -1007,7 +851,7 @@ def get_recent_documents(user_id: int, limit: int = 5) -> list:
     """Neueste Dokumente"""
     documents = []
     with get_db() as session:
-        docs = session.query(Document).filter(
+        docs = document_list_query(session).filter(
             Document.user_id == user_id
         ).order_by(Document.created_at.desc()).limit(limit).all()
 
@@ -1056,6 +900,7 @@ def get_upcoming_birthdays(user_id: int, limit: int = 5) -> list:
 def main():
     # Aktuelle Seite in Session speichern für Navigation-Highlighting
     st.session_state['_current_page'] = 'streamlit_app.py'
+    reset_fetch_stats()
 
     # Neue smarte Navigation rendern
     render_sidebar_with_navigation()
@@ -1063,6 +908,8 @@ def main():
     # Dashboard anzeigen
     render_dashboard()
 
+    st.caption(format_fetch_stats())
+
 
 if __name__ == "__main__":
     main()
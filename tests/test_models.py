@@ -0,0 +1,116 @@
+"""
+Tests für die SQLAlchemy-Modelle und den OCR-Content-Store
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("streamlit")
+pytest.importorskip("cryptography")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, Document, DocumentContent
+from services.document_content_service import find_documents_by_text, register_content_deduplication
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    register_content_deduplication()
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _content_texts(session):
+    return sorted(content.text for content in session.query(DocumentContent))
+
+
+def test_ocr_text_round_trip_without_session():
+    doc = Document(user_id=1, filename="a.pdf")
+    assert doc.ocr_text is None
+    assert not doc.has_ocr_text
+
+    doc.ocr_text = "Rechnung Nr. 42 über 19,99 €"
+    assert doc.ocr_text == "Rechnung Nr. 42 über 19,99 €"
+    assert doc.has_ocr_text
+    assert doc.ocr_content.compressed_size == len(doc.ocr_content.data)
+
+    doc.ocr_text = None
+    assert doc.ocr_text is None
+    assert doc.ocr_content is None
+
+
+def test_ocr_text_round_trip_through_database(session):
+    doc = Document(user_id=1, filename="a.pdf")
+    doc.ocr_text = "Kündigung zum 31.12."
+    session.add(doc)
+    session.commit()
+    doc_id = doc.id
+
+    session.expunge_all()
+    loaded = session.get(Document, doc_id)
+    assert loaded.ocr_text == "Kündigung zum 31.12."
+    assert loaded.ocr_text_legacy is None
+
+
+def test_legacy_text_is_used_until_migrated(session):
+    doc = Document(user_id=1, filename="alt.pdf", ocr_text_legacy="alter Text")
+    session.add(doc)
+    session.commit()
+
+    assert doc.ocr_text == "alter Text"
+    assert doc.has_ocr_text
+
+
+def test_identical_texts_share_one_content(session):
+    first = Document(user_id=1, filename="a.pdf")
+    second = Document(user_id=1, filename="b.pdf")
+    first.ocr_text = "gleicher Text"
+    second.ocr_text = "gleicher Text"
+    session.add_all([first, second])
+    session.commit()
+
+    assert session.query(DocumentContent).count() == 1
+    assert first.ocr_content_id == second.ocr_content_id
+
+
+def test_replaced_and_deleted_texts_are_removed(session):
+    first = Document(user_id=1, filename="a.pdf")
+    second = Document(user_id=1, filename="b.pdf")
+    first.ocr_text = "A"
+    second.ocr_text = "A"
+    session.add_all([first, second])
+    session.commit()
+
+    # A bleibt, solange first noch darauf verweist
+    second.ocr_text = "B"
+    session.commit()
+    assert _content_texts(session) == ["A", "B"]
+
+    first.ocr_text = "C"
+    session.commit()
+    assert _content_texts(session) == ["B", "C"]
+
+    session.delete(second)
+    session.commit()
+    assert _content_texts(session) == ["C"]
+
+
+def test_find_documents_by_text(session):
+    docs = [Document(user_id=1, filename=f"{i}.pdf") for i in range(3)]
+    docs[0].ocr_text = "Stromrechnung Januar"
+    docs[1].ocr_text = "Mietvertrag"
+    docs[2].ocr_text = "STROMRECHNUNG Februar"
+    other_user = Document(user_id=2, filename="x.pdf")
+    other_user.ocr_text = "Stromrechnung"
+    session.add_all(docs + [other_user])
+    session.commit()
+
+    assert find_documents_by_text(session, 1, "stromrechnung") == [docs[2].id, docs[0].id]
+
+    scope = session.query(Document.id).filter(Document.id == docs[0].id).scalar_subquery()
+    assert find_documents_by_text(session, 1, "stromrechnung", scope=scope) == [docs[0].id]
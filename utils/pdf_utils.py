@@ -2,12 +2,70 @@
 PDF-Verarbeitungsutilities
 """
 import io
-from typing import List, Tuple, Optional, Dict
+import os
+import mmap
+import importlib.util
+import hashlib
+from typing import List, Tuple, Optional, Dict, Union, Iterable
 from pathlib import Path
 from datetime import datetime
 from PIL import Image
 import streamlit as st
 
+# PDF-Quelle: Bytes, Dateipfad oder speicherabgebildete Datei (mmap)
+PdfSource = Union[bytes, bytearray, memoryview, mmap.mmap, str, os.PathLike]
+
+# Thumbnail-Größe für die Layoutwechsel-Erkennung
+LAYOUT_THUMB_SIZE = (200, 280)
+
+
+def open_pdf_document(source: PdfSource):
+    """
+    Öffnet ein PDF mit PyMuPDF ohne es vorher komplett zu rendern.
+
+    Dateipfade werden direkt geöffnet - MuPDF liest Seiten dann bei Bedarf
+    von der Festplatte. mmap/memoryview-Eingaben werden einmalig als
+    Puffer übergeben (keine Seitenbilder im Speicher).
+
+    Args:
+        source: Bytes, Dateipfad oder mmap
+
+    Returns:
+        fitz.Document (als Context Manager verwendbar)
+    """
+    import fitz  # PyMuPDF
+
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(os.fspath(source))
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    # bytearray, memoryview, mmap: PyMuPDF erwartet bytes
+    return fitz.open(stream=bytes(source), filetype="pdf")
+
+
+def read_pdf_source(source: PdfSource) -> bytes:
+    """Liest eine PDF-Quelle vollständig als Bytes (für Bibliotheken ohne Pfad-API)"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    if isinstance(source, bytes):
+        return source
+    return bytes(source)
+
+
+def hash_pdf_source(source: PdfSource, chunk_size: int = 1024 * 1024) -> str:
+    """Berechnet den SHA-256 einer PDF-Quelle blockweise"""
+    sha = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha.update(chunk)
+    else:
+        view = memoryview(source)
+        for offset in range(0, len(view), chunk_size):
+            sha.update(view[offset:offset + chunk_size])
+    return sha.hexdigest()
+
 
 class PDFProcessor:
     """Verarbeitet PDF-Dateien und trennt mehrseitige Dokumente"""
@@ -64,19 +122,25 @@ class PDFProcessor:
         """Extrahiert eine einzelne Seite als neues PDF"""
         return self.split_pdf(pdf_bytes, [(page_num, page_num + 1)])[0]
 
-    def split_and_remove_separators(self, pdf_bytes: bytes) -> List[bytes]:
+    def split_and_remove_separators(self, pdf_bytes: bytes,
+                                    boundaries: Optional[List[int]] = None,
+                                    separator_pages: Optional[List[int]] = None) -> List[bytes]:
         """
         Teilt ein PDF an Trennseiten und entfernt die Trennseiten selbst.
 
         Args:
             pdf_bytes: Original-PDF mit Trennseiten
+            boundaries: Bereits erkannte Dokumentgrenzen (sonst neu erkannt)
+            separator_pages: Bereits erkannte Trennseiten
 
         Returns:
             Liste von PDF-Bytes (ohne Trennseiten)
         """
         from PyPDF2 import PdfReader, PdfWriter
 
-        boundaries, separator_pages = self.detect_document_boundaries(pdf_bytes)
+        if boundaries is None:
+            boundaries, separator_pages = self.detect_document_boundaries(pdf_bytes)
+        separator_pages = separator_pages or []
         reader = PdfReader(io.BytesIO(pdf_bytes))
         page_count = len(reader.pages)
 
@@ -162,63 +226,130 @@ class PDFProcessor:
             return reader.pages[page_num].extract_text() or ""
         return ""
 
-    def detect_document_boundaries(self, pdf_bytes: bytes) -> Tuple[List[int], List[int]]:
+    def detect_document_boundaries(self, source: PdfSource,
+                                   page_texts: Optional[Iterable[Tuple[int, str, float]]] = None
+                                   ) -> Tuple[List[int], List[int]]:
         """
         Erkennt Dokumentgrenzen in einem mehrseitigen PDF.
 
-        Verwendet text-basierte Erkennung (kein Poppler erforderlich).
+        Die Seiten werden einzeln nacheinander verarbeitet - es liegt immer
+        nur die aktuelle Seite und das Thumbnail der Vorseite im Speicher.
 
         Methoden:
-        1. Textextraktion mit PyPDF2
+        1. Seitentext (eingebetteter Text oder page_texts, z.B. aus
+           OCRService.iter_text_from_pdf)
         2. Suche nach "Trennseite" auf fast leeren Seiten
-        3. Optional: Layoutwechsel-Erkennung (wenn pdf2image verfügbar)
+        3. Optional: Layoutwechsel-Erkennung über kleine Seiten-Thumbnails
+           (wie bisher nur, wenn pdf2image verfügbar ist; gerendert wird
+           mit PyMuPDF)
 
         Args:
-            pdf_bytes: PDF-Bytes
+            source: PDF als Bytes, Dateipfad oder mmap
+            page_texts: Optionaler Iterator von (Seite, Text, Konfidenz)
 
         Returns:
             Tuple von:
             - Liste von Seitennummern, die neue Dokumente beginnen (immer mit 0)
             - Liste von Trennseiten-Nummern (zum Entfernen)
         """
-        from PyPDF2 import PdfReader
-
         boundaries = [0]  # Erstes Dokument beginnt bei Seite 0
         separator_pages = []  # Seiten die entfernt werden sollen
 
+        if importlib.util.find_spec("fitz") is None:  # PyMuPDF
+            return self._detect_document_boundaries_pypdf(read_pdf_source(source))
+
+        detect_layout = self.pdf2image_available
+
+        try:
+            with open_pdf_document(source) as doc:
+                page_count = len(doc)
+                texts = iter(page_texts) if page_texts is not None else None
+                prev_thumb = None
+
+                for i in range(page_count):
+                    page = doc[i]
+
+                    if texts is not None:
+                        _, page_text, _ = next(texts, (i, "", 0.0))
+                    else:
+                        page_text = page.get_text() or ""
+
+                    is_separator = self._is_separator_page_text(page_text)
+                    if is_separator:
+                        # Diese Seite ist eine Trennseite
+                        separator_pages.append(i)
+                        # Nächste Seite (nach Trennseite) ist neuer Dokumentanfang
+                        if i + 1 < page_count:
+                            boundaries.append(i + 1)
+
+                    # Layoutwechsel-Erkennung mit kleinem Thumbnail
+                    thumb = self._render_thumbnail(page) if detect_layout and page_count > 1 else None
+                    if (
+                        prev_thumb is not None and thumb is not None
+                        and not is_separator and (i - 1) not in separator_pages
+                        and self._detect_layout_change(prev_thumb, thumb)
+                        and i not in boundaries
+                    ):
+                        boundaries.append(i)
+                    prev_thumb = thumb
+
+        except Exception as e:
+            st.warning(f"Dokumenttrennung fehlgeschlagen: {e}")
+
+        return sorted(set(boundaries)), sorted(set(separator_pages))
+
+    @staticmethod
+    def _render_thumbnail(page) -> Optional[Image.Image]:
+        """Rendert eine Seite als kleines Graustufen-Thumbnail"""
+        try:
+            import fitz  # PyMuPDF
+
+            rect = page.rect
+            zoom = min(LAYOUT_THUMB_SIZE[0] / rect.width, LAYOUT_THUMB_SIZE[1] / rect.height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+            return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        except Exception:
+            # Layoutwechsel-Erkennung ist optional
+            return None
+
+    def _detect_document_boundaries_pypdf(self, pdf_bytes: bytes) -> Tuple[List[int], List[int]]:
+        """Fallback ohne PyMuPDF: PyPDF2-Text und seitenweises pdf2image"""
+        from PyPDF2 import PdfReader
+
+        boundaries = [0]
+        separator_pages = []
+
         try:
             reader = PdfReader(io.BytesIO(pdf_bytes))
             page_count = len(reader.pages)
+            prev_image = None
 
             for i in range(page_count):
                 page_text = reader.pages[i].extract_text() or ""
 
                 if self._is_separator_page_text(page_text):
-                    # Diese Seite ist eine Trennseite
                     separator_pages.append(i)
-                    # Nächste Seite (nach Trennseite) ist neuer Dokumentanfang
                     if i + 1 < page_count:
                         boundaries.append(i + 1)
 
-            # Optional: Layoutwechsel-Erkennung mit pdf2image (wenn verfügbar)
-            if self.pdf2image_available and page_count > 1:
-                try:
-                    from pdf2image import convert_from_bytes
-                    images = convert_from_bytes(pdf_bytes, dpi=100)  # Niedrigere DPI für Geschwindigkeit
-
-                    for i in range(1, len(images)):
-                        # Überspringe bereits erkannte Trennseiten
-                        if i in separator_pages or i - 1 in separator_pages:
-                            continue
-
-                        # Prüfe auf starken Layoutwechsel
-                        if self._detect_layout_change(images[i-1], images[i]):
-                            if i not in boundaries:
-                                boundaries.append(i)
-
-                except Exception:
-                    # Layoutwechsel-Erkennung ist optional, ignoriere Fehler
-                    pass
+                # Optional: Layoutwechsel-Erkennung, immer nur eine Seite rendern
+                if self.pdf2image_available and page_count > 1:
+                    try:
+                        from pdf2image import convert_from_bytes
+                        image = convert_from_bytes(pdf_bytes, dpi=100, first_page=i + 1, last_page=i + 1)[0]
+                        image = image.convert('L').resize(LAYOUT_THUMB_SIZE)
+
+                        if (
+                            prev_image is not None
+                            and i not in separator_pages and i - 1 not in separator_pages
+                            and self._detect_layout_change(prev_image, image)
+                            and i not in boundaries
+                        ):
+                            boundaries.append(i)
+                        prev_image = image
+                    except Exception:
+                        # Layoutwechsel-Erkennung ist optional, ignoriere Fehler
+                        pass
 
         except Exception as e:
             st.warning(f"Dokumenttrennung fehlgeschlagen: {e}")
@@ -240,7 +371,7 @@ class PDFProcessor:
         Eine einfache Heuristik basierend auf Bildunterschieden.
         """
         # Bilder auf gleiche Größe bringen
-        size = (200, 280)  # Thumbnail-Größe
+        size = LAYOUT_THUMB_SIZE
         prev_thumb = prev_image.convert('L').resize(size)
         curr_thumb = curr_image.convert('L').resize(size)
 
@@ -0,0 +1,296 @@
+"""
+Streamender ZIP-Schreiber für Backups
+
+Schreibt Einträge direkt aus den Quelldateien ins Archiv (ohne temporäre
+Kopie), speichert bereits komprimierte Formate unverändert und komprimiert
+die übrigen Einträge parallel in Worker-Threads (zlib/zstd geben dabei den
+GIL frei). Die Reihenfolge der Einträge bleibt erhalten.
+
+Das Archiv nutzt immer ZIP64-Felder und ist damit auch für Archive und
+Einträge über 4 GB gültig. Lesbar mit zipfile, unzip, 7-Zip usw.; mit
+zstd komprimierte Einträge (Methode 93) erst ab Python 3.14 bzw. 7-Zip 23.
+"""
+import io
+import os
+import struct
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Union
+
+# Kompressionsmethoden (APPNOTE 4.4.5)
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_ZSTANDARD = 93
+
+# Formate, die bereits komprimiert sind - Deflate spart hier nichts
+COMPRESSED_EXTENSIONS = {
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".heif", ".tif", ".tiff",
+    ".zip", ".gz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp",
+    ".mp3", ".m4a", ".ogg", ".mp4", ".mov", ".webm",
+    ".enc",  # verschlüsselte Dokumente sind nicht komprimierbar
+}
+
+CHUNK_SIZE = 1024 * 1024
+# Komprimierte Einträge bis zu dieser Größe bleiben im RAM, größere gehen in eine Temp-Datei
+SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+
+_ZIP64_VERSION = 45
+_UTF8_FLAG = 0x800
+_MAX_32 = 0xFFFFFFFF
+_MAX_16 = 0xFFFF
+
+
+def _zstd_compressor(level: int):
+    """zstd-Kompressor (zstandard-Paket oder Python 3.14+) oder None"""
+    try:
+        import zstandard
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    except ImportError:
+        pass
+    try:
+        from compression import zstd
+        return zstd.ZstdCompressor(level=level)
+    except ImportError:
+        return None
+
+
+def zstd_available() -> bool:
+    """Prüft, ob zstd-Kompression verfügbar ist"""
+    return _zstd_compressor(3) is not None
+
+
+def _dos_datetime(timestamp: float) -> tuple:
+    """Zeitstempel als DOS-Datum/-Zeit"""
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    return (
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+        ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    )
+
+
+def _open_source(source: Union[bytes, Path]) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return open(source, "rb")
+
+
+class StreamingZipWriter:
+    """
+    ZIP-Archiv mit paralleler Kompression pro Eintrag.
+
+    Verwendung:
+        with StreamingZipWriter(path) as zipw:
+            zipw.add_bytes(b"...", "metadata.json")
+            zipw.add_file(Path("a.pdf"), "files/a.pdf")
+    """
+
+    def __init__(self, target: Union[str, Path], max_workers: Optional[int] = None,
+                 compresslevel: int = 6, use_zstd: bool = False):
+        """
+        Args:
+            target: Pfad des Archivs
+            max_workers: Kompressions-Threads (Standard: CPU-Anzahl)
+            compresslevel: Kompressionsstufe (Deflate 1-9, zstd 1-22)
+            use_zstd: zstd statt Deflate verwenden, falls verfügbar
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.compresslevel = compresslevel
+        self.method = ZIP_ZSTANDARD if use_zstd and zstd_available() else ZIP_DEFLATED
+
+        self._fp = open(target, "wb")
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="zip")
+        # Einträge in Archivreihenfolge: (Eintrag, Future oder None für "speichern")
+        self._pending = deque()
+        self._max_pending = self.max_workers * 2
+        self._central_directory: List[bytes] = []
+        self._closed = False
+
+        self.stats: Dict[str, int] = {
+            "entries": 0, "stored": 0, "compressed": 0, "bytes_in": 0, "bytes_out": 0
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def should_store(self, arcname: str) -> bool:
+        """Bereits komprimierte Formate unverändert speichern"""
+        return Path(arcname).suffix.lower() in COMPRESSED_EXTENSIONS
+
+    def add_file(self, source: Union[str, Path], arcname: str):
+        """Fügt eine Datei hinzu (wird erst beim Schreiben gelesen)"""
+        source = Path(source)
+        self._add({"arcname": arcname, "source": source, "mtime": source.stat().st_mtime})
+
+    def add_bytes(self, data: bytes, arcname: str):
+        """Fügt Daten aus dem Speicher hinzu"""
+        self._add({"arcname": arcname, "source": data, "mtime": time.time()})
+
+    def _add(self, entry: Dict):
+        future = None
+        if not self.should_store(entry["arcname"]):
+            future = self._pool.submit(self._compress, entry["source"])
+        self._pending.append((entry, future))
+
+        # Begrenzt RAM/Temp-Platz für fertig komprimierte, noch nicht geschriebene Einträge
+        while len(self._pending) > self._max_pending:
+            self._write_next()
+
+    def _compress(self, source: Union[bytes, Path]) -> Optional[Dict]:
+        """
+        Komprimiert einen Eintrag in einen Spool (Worker-Thread).
+
+        Returns:
+            Dict mit spool, crc, size, compressed_size oder None, wenn die
+            Kompression nichts bringt (dann wird gespeichert)
+        """
+        if self.method == ZIP_ZSTANDARD:
+            compressor = _zstd_compressor(self.compresslevel)
+        else:
+            compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        crc = 0
+        size = 0
+        with _open_source(source) as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                spool.write(compressor.compress(chunk))
+        spool.write(compressor.flush())
+
+        compressed_size = spool.tell()
+        if compressed_size >= size:
+            spool.close()
+            return None
+
+        spool.seek(0)
+        return {"spool": spool, "crc": crc, "size": size, "compressed_size": compressed_size}
+
+    def _write_next(self):
+        """Schreibt den ältesten ausstehenden Eintrag"""
+        entry, future = self._pending.popleft()
+        compressed = future.result() if future is not None else None
+
+        if compressed is None:
+            self._write_stored(entry)
+            return
+
+        try:
+            offset = self._write_local_header(entry["arcname"], self.method, entry["mtime"],
+                                              compressed["crc"], compressed["size"],
+                                              compressed["compressed_size"])
+            for chunk in iter(lambda: compressed["spool"].read(CHUNK_SIZE), b""):
+                self._fp.write(chunk)
+        finally:
+            compressed["spool"].close()
+
+        self._add_central_entry(entry["arcname"], self.method, entry["mtime"], compressed["crc"],
+                                compressed["size"], compressed["compressed_size"], offset)
+        self.stats["compressed"] += 1
+        self.stats["bytes_in"] += compressed["size"]
+        self.stats["bytes_out"] += compressed["compressed_size"]
+
+    def _write_stored(self, entry: Dict):
+        """Kopiert einen Eintrag unkomprimiert; CRC und Größe werden danach nachgetragen"""
+        offset = self._write_local_header(entry["arcname"], ZIP_STORED, entry["mtime"], 0, 0, 0)
+        crc = 0
+        size = 0
+        with _open_source(entry["source"]) as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                self._fp.write(chunk)
+
+        end = self._fp.tell()
+        name_length = len(entry["arcname"].encode("utf-8"))
+        self._fp.seek(offset + 14)
+        self._fp.write(struct.pack("<I", crc))
+        self._fp.seek(offset + 30 + name_length + 4)
+        self._fp.write(struct.pack("<QQ", size, size))
+        self._fp.seek(end)
+
+        self._add_central_entry(entry["arcname"], ZIP_STORED, entry["mtime"], crc, size, size, offset)
+        self.stats["stored"] += 1
+        self.stats["bytes_in"] += size
+        self.stats["bytes_out"] += size
+
+    def _write_local_header(self, arcname: str, method: int, mtime: float,
+                            crc: int, size: int, compressed_size: int) -> int:
+        """Schreibt einen lokalen Header mit ZIP64-Größen und gibt dessen Offset zurück"""
+        offset = self._fp.tell()
+        name = arcname.encode("utf-8")
+        dos_time, dos_date = _dos_datetime(mtime)
+        extra = struct.pack("<HHQQ", 0x0001, 16, size, compressed_size)
+        self._fp.write(struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, _ZIP64_VERSION, _UTF8_FLAG, method,
+            dos_time, dos_date, crc, _MAX_32, _MAX_32, len(name), len(extra)
+        ))
+        self._fp.write(name)
+        self._fp.write(extra)
+        return offset
+
+    def _add_central_entry(self, arcname: str, method: int, mtime: float, crc: int,
+                           size: int, compressed_size: int, offset: int):
+        name = arcname.encode("utf-8")
+        dos_time, dos_date = _dos_datetime(mtime)
+        extra = struct.pack("<HHQQQ", 0x0001, 24, size, compressed_size, offset)
+        self._central_directory.append(struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | _ZIP64_VERSION, _ZIP64_VERSION,
+            _UTF8_FLAG, method, dos_time, dos_date, crc, _MAX_32, _MAX_32,
+            len(name), len(extra), 0, 0, 0, 0o100644 << 16, _MAX_32
+        ) + name + extra)
+        self.stats["entries"] += 1
+
+    def close(self):
+        """Schreibt ausstehende Einträge und das zentrale Verzeichnis"""
+        if self._closed:
+            return
+        try:
+            while self._pending:
+                self._write_next()
+
+            cd_offset = self._fp.tell()
+            for record in self._central_directory:
+                self._fp.write(record)
+            cd_size = self._fp.tell() - cd_offset
+            count = len(self._central_directory)
+
+            zip64_end_offset = self._fp.tell()
+            self._fp.write(struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, _ZIP64_VERSION, _ZIP64_VERSION,
+                0, 0, count, count, cd_size, cd_offset
+            ))
+            self._fp.write(struct.pack("<IIQI", 0x07064B50, 0, zip64_end_offset, 1))
+            self._fp.write(struct.pack(
+                "<IHHHHIIH", 0x06054B50, 0, 0, min(count, _MAX_16), min(count, _MAX_16),
+                min(cd_size, _MAX_32), min(cd_offset, _MAX_32), 0
+            ))
+        finally:
+            self._closed = True
+            self._pool.shutdown(wait=True)
+            self._fp.close()
+
+    def abort(self):
+        """Bricht ab, ohne ein gültiges Archiv zu schreiben"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        for _, future in self._pending:
+            if future is not None and future.done() and not future.cancelled() \
+                    and future.exception() is None and future.result():
+                future.result()["spool"].close()
+        self._pending.clear()
+        self._fp.close()